@@ -1,11 +1,25 @@
 # backend/chat/admin.py
 
 from django.contrib import admin
-from .models import ChatMessage
+from .models import ArchivedChatMessage, ChatMessage, Conversation
 
 @admin.register(ChatMessage)
 class ChatMessageAdmin(admin.ModelAdmin):
     list_display = ('sender', 'recipient', 'room_name', 'content', 'timestamp', 'is_read')
     list_filter = ('sender', 'recipient', 'room_name', 'is_read')
     search_fields = ('content', 'sender__email', 'recipient__email', 'room_name')
-    date_hierarchy = 'timestamp'
\ No newline at end of file
+    date_hierarchy = 'timestamp'
+
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ('room_name', 'participant_one', 'participant_two', 'last_message_at', 'unread_one', 'unread_two')
+    search_fields = ('room_name', 'participant_one__email', 'participant_two__email')
+    raw_id_fields = ('last_message',)
+
+
+@admin.register(ArchivedChatMessage)
+class ArchivedChatMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'sender', 'recipient', 'room_name', 'timestamp', 'archived_at')
+    search_fields = ('room_name',)
+    raw_id_fields = ('sender', 'recipient')
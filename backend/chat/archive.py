@@ -0,0 +1,96 @@
+# backend/chat/archive.py
+# Hot/cold split of chat messages.
+#
+# ChatMessage only holds the last CHAT_HOT_MONTHS calendar months (plus the last message of every
+# room, which the inbox points at); older months are moved to ArchivedChatMessage in batches by
+# `python manage.py archive_chat_messages`. Within a room every archived message is older than every
+# hot one, and Conversation.archived_through says whether the room has archived messages at all, so
+# sending, reading and the newest history page of an active room never look at the archive.
+#
+# Batches are taken in (timestamp, id) order and wait for rows locked by live traffic instead of
+# skipping them, so wherever a run stops, each room's archived messages are a prefix of its history
+# in that order. Only the room's last message is held back, and it is the newest one anyway.
+
+from datetime import datetime
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from .models import ArchivedChatMessage, ChatMessage, Conversation
+from .pagination import decode_cursor, encode_cursor, keyset_page
+
+
+def hot_cutoff(months=None):
+    """Start of the oldest calendar month that stays hot."""
+    months = settings.CHAT_HOT_MONTHS if months is None else months
+    now = timezone.localtime()
+    year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+    return timezone.make_aware(datetime(year, month + 1, 1))
+
+
+_FIELDS = 'id, sender_id, recipient_id, room_name, content, timestamp, is_read, read_at, search_vector'
+
+# one statement: pick the oldest batch, delete it from the hot table and insert it into the archive
+_MOVE_SQL = f"""
+    WITH batch AS (
+        SELECT m.id FROM {ChatMessage._meta.db_table} m
+        WHERE m.timestamp < %(cutoff)s
+          AND NOT EXISTS (SELECT 1 FROM {Conversation._meta.db_table} c WHERE c.last_message_id = m.id)
+        ORDER BY m.timestamp, m.id
+        LIMIT %(limit)s
+        FOR UPDATE
+    ), moved AS (
+        DELETE FROM {ChatMessage._meta.db_table} m USING batch WHERE m.id = batch.id
+        RETURNING {', '.join(f'm.{field}' for field in _FIELDS.split(', '))}
+    ), archived AS (
+        INSERT INTO {ArchivedChatMessage._meta.db_table} ({_FIELDS}, archived_at)
+        SELECT {_FIELDS}, now() FROM moved
+        ON CONFLICT (id) DO NOTHING
+        RETURNING room_name, timestamp
+    )
+    SELECT room_name, max(timestamp), count(*) FROM archived GROUP BY room_name
+"""
+
+
+def archive_batch(cutoff, limit=5000):
+    """Move up to `limit` messages older than `cutoff` to the archive; returns the number moved."""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(_MOVE_SQL, {'cutoff': cutoff, 'limit': limit})
+            rooms = cursor.fetchall()
+        for room_name, newest, _ in rooms:
+            Conversation.objects.filter(room_name=room_name).update(
+                archived_through=Greatest(Coalesce('archived_through', Value(newest)), Value(newest))
+            )
+    return sum(count for _, _, count in rooms)
+
+
+def room_history(room_name, archived_through=None, before=None, after=None, limit=50):
+    """keyset_page() over both tiers of a room. Returns (messages, has_older, has_newer)."""
+    hot = ChatMessage.objects.filter(room_name=room_name)
+    if archived_through is None:
+        return keyset_page(hot, before=before, after=after, limit=limit)
+    cold = ArchivedChatMessage.objects.filter(room_name=room_name)
+
+    if after:
+        if decode_cursor(after)[0] > archived_through:
+            # the archived messages are all older than this page
+            rows, _, has_newer = keyset_page(hot, after=after, limit=limit)
+            return rows, True, has_newer
+        rows, has_older, has_newer = keyset_page(cold, after=after, limit=limit)
+        if has_newer:
+            return rows, has_older, True
+        # the archive ran out: carry on with the oldest hot messages
+        more, _, has_newer = keyset_page(hot, after=encode_cursor(rows[-1]) if rows else after, limit=limit - len(rows))
+        return rows + more, has_older, has_newer
+
+    # at archived_through itself both tiers can hold messages: the hot path below goes on into the archive
+    if before and decode_cursor(before)[0] < archived_through:
+        return keyset_page(cold, before=before, limit=limit)
+    rows, has_older, has_newer = keyset_page(hot, before=before, limit=limit)
+    if has_older:
+        return rows, has_older, has_newer
+    # the hot tier ran out: fill the page from the newest archived messages
+    older, has_older, _ = keyset_page(cold, before=encode_cursor(rows[0]) if rows else before, limit=limit - len(rows))
+    return older + rows, has_older, has_newer
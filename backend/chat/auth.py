@@ -0,0 +1,70 @@
+# backend/chat/auth.py
+# Websocket authentication from the same `access_token` cookie the REST API reads
+# (users.authentication.CookieJWTAuthentication), replacing channels' AuthMiddlewareStack.
+#
+# The token is checked statelessly (signature, expiry, token type) and the user comes from the
+# identity cache (chat/identity.py), so a connect only touches the database when the user isn't
+# cached in this process yet; AuthMiddlewareStack read the session and the user row on every connect.
+# scope['user'] is a User stand-in carrying id, email and is_active, enough for the consumers and
+# for ChatMessage foreign keys; code that needs other fields has to load the user itself.
+# A deactivated user is refused once their cache entry is dropped (at once in this process through
+# chat/signals.py, within CHAT_IDENTITY_CACHE_TTL in others).
+
+import logging
+from channels.middleware import BaseMiddleware
+from channels.sessions import CookieMiddleware
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .db import chat_db
+from .identity import identity_cache
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+ACCESS_COOKIE = 'access_token'
+
+_jwt = JWTAuthentication()
+
+
+def token_user_id(raw_token):
+    """User id claim of a valid access token, None if the token doesn't validate. Doesn't query."""
+    try:
+        token = _jwt.get_validated_token(raw_token)
+    except InvalidToken as e:
+        logger.debug(f"Websocket token rejected: {e}")
+        return None
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    # simplejwt writes the claim as a string, the cache is keyed by the primary key value
+    return None if user_id is None else User._meta.pk.to_python(user_id)
+
+
+@chat_db
+def load_identity(user_id):
+    return identity_cache.get(user_id)
+
+
+async def resolve_user(raw_token):
+    user_id = token_user_id(raw_token) if raw_token else None
+    if user_id is None:
+        return AnonymousUser()
+    identity = identity_cache.cached(user_id) or await load_identity(user_id)
+    if identity is None or not identity['is_active']:
+        return AnonymousUser()
+    return User(id=identity['id'], email=identity['email'], is_active=True)
+
+
+class JWTCookieAuthMiddleware(BaseMiddleware):
+    """Puts the user of the access_token cookie (or AnonymousUser) in scope['user']. Needs CookieMiddleware."""
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        scope['user'] = await resolve_user(scope.get('cookies', {}).get(ACCESS_COOKIE))
+        return await super().__call__(scope, receive, send)
+
+
+def JWTCookieAuthMiddlewareStack(inner):
+    return CookieMiddleware(JWTCookieAuthMiddleware(inner))
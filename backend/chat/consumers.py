@@ -1,49 +1,121 @@
 # backend/chat/consumers.py
 
-import json
+import asyncio
 import logging
-from channels.generic.websocket import WebsocketConsumer
-from asgiref.sync import async_to_sync
-from channels.db import database_sync_to_async # For wrapping synchronous DB ops
+import time
+import redis
+from urllib.parse import parse_qs
+from channels.generic.websocket import AsyncWebsocketConsumer
 from django.contrib.auth import get_user_model
 from mentorship.models import SessionBooking
-from .models import ChatMessage
-from django.utils import timezone
+from mentorship.utils import complete_session, queue_payment_capture
+from .db import chat_db
+from .delivery import delivery_log, sequence
+from .models import ChatMessage, Conversation
+from .identity import identity_cache
+from .presence import presence, presence_group
+from .protocol import WireProtocolMixin, encode_all
+from .search import search_document
+from .typing import TokenBucket, typing_coalescer
+from .write_behind import message_buffer
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Q
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
-class SignalingConsumer(WebsocketConsumer):
-    def connect(self):
+
+
+class SignalingConsumer(WireProtocolMixin, AsyncWebsocketConsumer):
+    # Direct relay: each peer learns the other's channel name when it joins (peer_joined/peer_hello)
+    # and SDP/ICE frames, once they parse, are forwarded to that one channel as received instead of being
+    # re-encoded and broadcast to the whole room, sender included. ICE candidates arriving within ice_batch_ms of each
+    # other travel through the channel layer as one message. Until exactly one peer is known the
+    # frames still go through the group, minus the echo. Frames are relayed in the format the sender
+    # negotiated (chat/protocol.py) and only converted if the other peer speaks a different one.
+    direct_relay = getattr(settings, 'SIGNALING_DIRECT_RELAY', True)
+    ice_batch_ms = getattr(settings, 'SIGNALING_ICE_BATCH_MS', 10)
+
+    async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
         self.room_group_name = f"webrtc_{self.room_name}"
-        async_to_sync(self.channel_layer.group_add)(
+        self.peers = set()       # channel names of the other connections in the room
+        self.ice_batch = []
+        self.ice_flush = None    # pending flush of ice_batch, a task
+        self.tasks = set()       # references to the tasks we started, the event loop only keeps weak ones
+        self.joined = False
+
+        # the room is a SessionBooking id, only its mentor and learner may signal in it
+        current_user = self.scope.get('user')
+        if current_user is None or not current_user.is_authenticated:
+            logger.warning(f"Anonymous user attempted to join signaling room {self.room_name}. Disconnecting.")
+            await self.close(code=4001)
+            return
+        self.session_id = await self.participant_session(self.room_name, current_user.id)
+        if self.session_id is None:
+            logger.warning(f"User {current_user.id} attempted to join signaling room {self.room_name} of a session they aren't part of. Disconnecting.")
+            await self.close(code=4003)
+            return
+
+        self.joined = True
+        await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
-        self.accept()
+        await self.accept_negotiated()
+        if self.direct_relay:
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {'type': 'peer_joined', 'channel': self.channel_name}
+            )
 
-    def disconnect(self, close_code):
-        async_to_sync(self.channel_layer.group_discard)(
+    async def disconnect(self, close_code):
+        if not self.joined:
+            return
+        if self.direct_relay:
+            await self.flush_ice()
+            if self.tasks:
+                # a flush that was already sending
+                await asyncio.gather(*self.tasks, return_exceptions=True)
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {'type': 'peer_left', 'channel': self.channel_name}
+            )
+        await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
 
-    def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
+        raw = text_data if text_data is not None else bytes_data
         try:
-            data = json.loads(text_data)
+            data = self.codec.decode(raw)
+        except ValueError as e:
+            logger.error(f"Error processing message: {e}")
+            await self.send_frame({'error': 'Invalid signal data'})
+            return
 
-            if data.get("type") == "end-session":
-                self.mark_session_completed(self.room_name)
-                async_to_sync(self.channel_layer.group_send)(
-                    self.room_group_name,
-                    {
-                        'type': 'session_completed'
-                    }
-                )
+        # a well-formed frame is relayed as received (parsed once, here); end-session takes the path below
+        frame_type = data.get('type')
+        if self.direct_relay and isinstance(frame_type, str) and frame_type != 'end-session':
+            await self.relay(raw, frame_type)
+            return
+
+        try:
+            if frame_type == "end-session":
+                # only a session in progress can be ended; both peers are told once it is completed
+                if await self.mark_session_completed(self.session_id):
+                    await self.channel_layer.group_send(
+                        self.room_group_name,
+                        {
+                            'type': 'session_completed'
+                        }
+                    )
+                else:
+                    await self.send_frame({'error': 'Session is not in progress.'})
             else:
-                async_to_sync(self.channel_layer.group_send)(
+                await self.channel_layer.group_send(
                     self.room_group_name,
                     {
                         'type': 'signal_message',
@@ -52,80 +124,149 @@ class SignalingConsumer(WebsocketConsumer):
                 )
         except Exception as e:
             logger.error(f"Error processing message: {e}")
-            self.send(text_data=json.dumps({'error': 'Invalid signal data'}))
+            await self.send_frame({'error': 'Invalid signal data'})
+
+    # ------------------------------
+    # Direct relay
+    # ------------------------------
+    async def relay(self, raw, frame_type):
+        if self.ice_batch_ms and frame_type == 'ice-candidate':
+            self.ice_batch.append(raw)
+            if self.ice_flush is None:
+                self.ice_flush = self.start_task(self.flush_ice_later())
+            return
+        # candidates already queued must not overtake e.g. a renegotiation offer
+        await self.flush_ice()
+        await self.forward([raw])
+
+    def start_task(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def flush_ice_later(self):
+        await asyncio.sleep(self.ice_batch_ms / 1000)
+        self.ice_flush = None  # this task is past the point where cancelling it would drop frames
+        await self.flush_ice()
+
+    async def flush_ice(self):
+        if self.ice_flush is not None:
+            self.ice_flush.cancel()  # still sleeping, the batch goes out now instead
+            self.ice_flush = None
+        if self.ice_batch:
+            frames, self.ice_batch = self.ice_batch, []
+            await self.forward(frames)
+
+    async def forward(self, frames):
+        if len(self.peers) == 1:
+            peer, = self.peers
+            await self.channel_layer.send(peer, {'type': 'signal_relay', 'frames': frames})
+        else:
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {'type': 'signal_relay', 'frames': frames, 'sender': self.channel_name}
+            )
+
+    async def signal_relay(self, event):
+        if event.get('sender') == self.channel_name:
+            return
+        for frame in event['frames']:
+            await self.send_raw(frame)
 
-    def signal_message(self, event):
-        self.send(text_data=json.dumps(event['message']))
+    async def peer_joined(self, event):
+        if event['channel'] == self.channel_name:
+            return
+        self.peers.add(event['channel'])
+        await self.channel_layer.send(event['channel'], {'type': 'peer_hello', 'channel': self.channel_name})
+
+    async def peer_hello(self, event):
+        self.peers.add(event['channel'])
+
+    async def peer_left(self, event):
+        self.peers.discard(event['channel'])
+
+    async def signal_message(self, event):
+        await self.send_frame(event['message'])
 
-    def session_completed(self, event): 
-        self.send(text_data=json.dumps({'type': 'session-completed'})) # send session-completed event to frontend.
+    async def session_completed(self, event): 
+        await self.send_frame({'type': 'session-completed'}) # send session-completed event to frontend.
 
+    @chat_db
+    def participant_session(self, room_name, user_id):
+        # id of the booking the room belongs to if the user is its mentor or learner, else None
+        if not room_name.isdigit():
+            return None
+        return SessionBooking.objects.filter(
+            Q(mentor_id=user_id) | Q(learner_id=user_id), id=int(room_name)
+        ).values_list('id', flat=True).first()
+
+    @chat_db
     def mark_session_completed(self, session_id):
-        try:
-            session = SessionBooking.objects.get(id=session_id)
-            session.status = 'completed'
-            session.save()
-            logger.info(f"Session {session_id} marked as completed.")
-        except SessionBooking.DoesNotExist:
-            logger.warning(f"Session {session_id} does not exist.")
+        # True once the session is completed; only a confirmed session that has started can be.
+        # Idempotent: the second peer's end-session (or a retry) finds it completed already
+        if not complete_session(session_id):
+            completed = SessionBooking.objects.filter(id=session_id, status=SessionBooking.Status.COMPLETED).exists()
+            if not completed:
+                logger.info(f"Session {session_id} is not in progress (not confirmed or not started yet).")
+            return completed
+        logger.info(f"Session {session_id} marked as completed.")
+        if settings.SESSION_CAPTURE_ON_COMPLETE:
+            queue_payment_capture(session_id)
+        return True
 
 
 
 
 
-class ChatConsumer(WebsocketConsumer):
-    # Helper to get recipient user (now a method)
-    @database_sync_to_async
-    def get_recipient_user_sync(self, rec_id): # Renamed to avoid clash, explicitly sync
-        try:
-            return User.objects.get(id=rec_id)
-        except User.DoesNotExist:
-            return None
+class ChatConsumer(WireProtocolMixin, AsyncWebsocketConsumer):
+    # Helper to resolve a user's {id, email} payload, cached across consumers
+    @chat_db
+    def get_user_identity_sync(self, user_id):
+        return identity_cache.get(user_id)
 
     # Helper to create chat message (now a method)
-    @database_sync_to_async
+    @chat_db
     @transaction.atomic
     def create_chat_message_sync(self, sender, recipient, room_name, content): # Renamed to avoid clash, explicitly sync
-        return ChatMessage.objects.create(
+        message = ChatMessage.objects.create(
             sender=sender,
             recipient=recipient,
             room_name=room_name,
             content=content,
+            search_vector=search_document(content),
         )
+        Conversation.objects.record_message(message)  # same transaction as the message
+        return message
 
     # Helper to mark messages as read (now a method)
-    @database_sync_to_async
-    @transaction.atomic
+    @chat_db
     def mark_messages_as_read_sync(self, user_id, room_name): # Renamed to avoid clash, explicitly sync
-        unread_messages = ChatMessage.objects.filter(
-            room_name=room_name,
-            recipient_id=user_id,
-            is_read=False
-        )
-        
-        senders_of_unread_messages = list(unread_messages.values_list('sender_id', flat=True).distinct())
-
-        if unread_messages.exists():
-            updated_count = unread_messages.update(
-                is_read=True,
-                read_at=timezone.now()
-            )
-            logger.info(f"Marked {updated_count} messages as read for user {user_id} in room {room_name}.")
-        
-        return senders_of_unread_messages
+        # moves the reader's watermark on the room's Conversation; the ChatMessage rows aren't touched
+        marked, conversation = Conversation.objects.mark_read(room_name, user_id)
+        if not marked:
+            return None
+        logger.info(f"Marked {marked} messages as read for user {user_id} in room {room_name}.")
+        return conversation.read_watermark(user_id)
 
 
-    def connect(self):
+    async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
         self.room_group_name = 'chat_%s' % self.room_name
 
         current_user = self.scope["user"]
+        self.partner_id = None  # the other participant of a private room
+        self.partner = None     # their {id, email} payload
+        self.recipient = None   # stand-in User for ChatMessage.recipient, no query needed
 
         if not current_user.is_authenticated:
             logger.warning(f"Anonymous user attempted to connect to room {self.room_name}. Disconnecting.")
-            self.close(code=4001)
+            await self.close(code=4001)
             return
 
+        self.identity = identity_cache.payload(current_user)
+        self.typing_limiter = TokenBucket(settings.CHAT_TYPING_RATE, settings.CHAT_TYPING_BURST)
+
         if self.room_name.startswith('private_chat_'):
             parts = self.room_name.split('_')
             if len(parts) == 4:
@@ -134,60 +275,80 @@ class ChatConsumer(WebsocketConsumer):
                     user2_id = int(parts[3])
                 except ValueError:
                     logger.warning(f"Invalid user ID format in room name: {self.room_name}. Disconnecting.")
-                    self.close(code=4004)
+                    await self.close(code=4004)
                     return
 
                 if current_user.id not in [user1_id, user2_id]:
                     logger.warning(f"User {current_user.email} (ID: {current_user.id}) attempted to join unauthorized room {self.room_name}. Disconnecting.")
-                    self.close(code=4003)
+                    await self.close(code=4003)
                     return
+                self.partner_id = user2_id if current_user.id == user1_id else user1_id
             else:
                 logger.warning(f"Invalid private chat room format: {self.room_name}. Disconnecting.")
-                self.close(code=4004)
+                await self.close(code=4004)
                 return
 
-        async_to_sync(self.channel_layer.group_add)(
+        await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
 
-        self.accept()
+        await self.accept_negotiated()
         logger.info(f"WebSocket connected for authenticated user: {current_user.email} to room {self.room_name} ({self.channel_name})")
 
-        # LOGIC ON CONNECT: Mark messages as read and broadcast status
-        # Call the synchronous method using async_to_sync wrapper
-        senders_affected = async_to_sync(self.mark_messages_as_read_sync)(current_user.id, self.room_name)
-
-        for sender_id in senders_affected:
-            async_to_sync(self.channel_layer.group_send)(
+        # the participants are fixed for the room, resolve the recipient once instead of on every message
+        if self.partner_id is not None:
+            self.partner = await self.get_user_identity_sync(self.partner_id)
+            if self.partner:
+                self.recipient = User(id=self.partner['id'], email=self.partner['email'])
+
+        if settings.CHAT_PRESENCE:
+            await self.start_presence()
+
+        # a reconnecting client (?since=<seq>) first gets what it missed, see chat/delivery.py
+        since = self.resume_from()
+        if since is not None:
+            await self.resume(since)
+
+        # LOGIC ON CONNECT: Mark messages as read and broadcast status, once per read event
+        watermark = await self.mark_messages_as_read_sync(current_user.id, self.room_name)
+        if watermark is not None:
+            last_read_id, _, read_at = watermark
+            frame = await sequence(self.room_group_name, {
+                'type': 'message_read_status',
+                'reader_id': current_user.id,
+                'reader_email': current_user.email,
+                'room_name': self.room_name,
+                'last_read_message_id': last_read_id,
+                'timestamp': read_at.isoformat(),
+            })
+            await self.channel_layer.group_send(
                 self.room_group_name,
-                {
-                    'type': 'message_read_status',
-                    'reader_id': current_user.id,
-                    'reader_email': current_user.email,
-                    'room_name': self.room_name,
-                    'timestamp': timezone.now().isoformat(),
-                }
+                {'type': 'message_read_status', 'frames': encode_all(frame)}
             )
 
 
-    def disconnect(self, close_code):
-        async_to_sync(self.channel_layer.group_discard)(
+    async def disconnect(self, close_code):
+        if hasattr(self, 'identity'):
+            # don't leave the other side looking at "is typing..." (unless another tab still types)
+            typing_coalescer.reset(self.room_group_name, self.identity['id'], channel=self.channel_name, notify=True)
+            await self.stop_presence()
+        await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
         user_info = self.scope["user"].email if self.scope["user"].is_authenticated else "Anonymous"
         logger.info(f"WebSocket disconnected for user: {user_info} from room {self.room_name}, Code: {close_code}")
 
-    def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         try:
-            text_data_json = json.loads(text_data)
+            text_data_json = self.codec.decode(text_data if text_data is not None else bytes_data)
             message_type = text_data_json.get('type')
             
             current_user = self.scope["user"]
             if not current_user.is_authenticated:
-                logger.warning(f"Received message from unauthenticated user: {text_data}. Rejecting.")
-                self.send(text_data=json.dumps({"error": "Authentication required to send messages."}))
+                logger.warning(f"Received message from unauthenticated user: {text_data_json}. Rejecting.")
+                await self.send_frame({"error": "Authentication required to send messages."})
                 return
 
             if message_type == 'chat_message':
@@ -196,104 +357,173 @@ class ChatConsumer(WebsocketConsumer):
 
                 if not recipient_id:
                     logger.error(f"Message from {current_user.email} missing recipient_id. Rejecting.")
-                    self.send(text_data=json.dumps({"error": "Recipient ID is required."}))
+                    await self.send_frame({"error": "Recipient ID is required."})
                     return
 
-                room_participants_ids_str = sorted([str(current_user.id), str(recipient_id)])
-                expected_room_name = f"private_chat_{room_participants_ids_str[0]}_{room_participants_ids_str[1]}"
-
-                if self.room_name != expected_room_name:
-                    logger.warning(f"User {current_user.email} (ID: {current_user.id}) attempted to send message to incorrect room {self.room_name} for recipient {recipient_id}. Expected {expected_room_name}. Rejecting.")
-                    self.send(text_data=json.dumps({"error": "Mismatched room and recipient. Message not sent."}))
+                if self.partner_id is None or str(recipient_id) != str(self.partner_id):
+                    logger.warning(f"User {current_user.email} (ID: {current_user.id}) attempted to send message to incorrect room {self.room_name} for recipient {recipient_id}. Expected recipient {self.partner_id}. Rejecting.")
+                    await self.send_frame({"error": "Mismatched room and recipient. Message not sent."})
                     return
 
-                # Fetch recipient user using helper method
-                recipient_user = async_to_sync(self.get_recipient_user_sync)(recipient_id) # <--- MODIFIED CALL
+                recipient_user = self.recipient
 
                 if not recipient_user:
                     logger.error(f"Recipient user with ID {recipient_id} not found. Message from {current_user.email} rejected.")
-                    self.send(text_data=json.dumps({"error": "Recipient not found. Message not sent."}))
+                    await self.send_frame({"error": "Recipient not found. Message not sent."})
                     return
 
-                # Create chat message using helper method
-                new_message = async_to_sync(self.create_chat_message_sync)( # <--- MODIFIED CALL
-                    current_user,
-                    recipient_user,
-                    self.room_name,
-                    message_content
-                )
-
-                logger.info(f"Saved message from {current_user.email} to {recipient_user.email} in room {self.room_name}")
-
-                async_to_sync(self.channel_layer.group_send)(
+                if settings.CHAT_WRITE_BEHIND:
+                    # id and timestamp are assigned now, the row is written with the next batch
+                    new_message = await message_buffer.add(
+                        current_user,
+                        recipient_user,
+                        self.room_name,
+                        message_content
+                    )
+                else:
+                    # Create chat message using helper method
+                    new_message = await self.create_chat_message_sync(
+                        current_user,
+                        recipient_user,
+                        self.room_name,
+                        message_content
+                    )
+
+                    logger.info(f"Saved message from {current_user.email} to {recipient_user.email} in room {self.room_name}")
+
+                frame = await sequence(self.room_group_name, {
+                    'type': 'chat_message',
+                    'message': message_content,
+                    'sender_id': self.identity['id'],
+                    'sender_email': self.identity['email'],
+                    'recipient_id': self.partner['id'],
+                    'recipient_email': self.partner['email'],
+                    'timestamp': new_message.timestamp.isoformat(),
+                    'is_read': new_message.is_read,
+                    'read_at': new_message.read_at.isoformat() if new_message.read_at else None,
+                })
+                # encoded here once, every subscriber sends these bytes as they are
+                await self.channel_layer.group_send(
                     self.room_group_name,
-                    {
-                        'type': 'chat_message',
-                        'message': message_content,
-                        'sender_id': current_user.id,
-                        'sender_email': current_user.email,
-                        'recipient_id': recipient_user.id,
-                        'recipient_email': recipient_user.email,
-                        'timestamp': new_message.timestamp.isoformat(),
-                        'is_read': new_message.is_read,
-                        'read_at': new_message.read_at.isoformat() if new_message.read_at else None,
-                    }
+                    {'type': 'chat_message', 'frames': encode_all(frame)}
                 )
+                # receiving the message clears the indicator on the client, no typing_stop needed
+                typing_coalescer.reset(self.room_group_name, self.identity['id'])
             elif message_type in ['typing_start', 'typing_stop']:
-                logger.info(f"Received typing event '{message_type}' from {current_user.email} in room {self.room_name}")
-                async_to_sync(self.channel_layer.group_send)(
+                # coalesced and rate limited, see chat/typing.py; deliberately not logged per frame
+                typing_coalescer.update(
+                    self.channel_layer,
                     self.room_group_name,
-                    {
-                        'type': 'typing_status',
-                        'sender_id': current_user.id,
-                        'sender_email': current_user.email,
-                        'is_typing': (message_type == 'typing_start'),
-                    }
+                    self.identity,
+                    message_type == 'typing_start',
+                    limiter=self.typing_limiter,
+                    channel=self.channel_name,
                 )
             else:
                 logger.warning(f"Received unknown message type: {message_type} from {current_user.email}")
 
 
-        except json.JSONDecodeError:
-            logger.error(f"Received invalid JSON: {text_data}")
-            self.send(text_data=json.dumps({"error": "Invalid JSON format"}))
+        except ValueError:
+            logger.error(f"Received invalid {self.codec.name} frame: {text_data if text_data is not None else bytes_data!r}")
+            await self.send_frame({"error": self.codec.invalid})
         except KeyError:
-            logger.error(f"Received JSON without 'message' key or invalid structure: {text_data}")
-            self.send(text_data=json.dumps({"error": "Message key missing or invalid structure in JSON"}))
+            logger.error(f"Received frame without 'message' key or invalid structure: {text_data_json}")
+            await self.send_frame({"error": "Message key missing or invalid structure in JSON"})
         except Exception as e:
             logger.exception(f"An unexpected error occurred in receive: {e}")
-            self.send(text_data=json.dumps({"error": "An internal server error occurred"}))
-
-    def chat_message(self, event):
-        self.send(text_data=json.dumps({
-            'type': 'chat_message',
-            'message': event['message'],
-            'sender_id': event['sender_id'],
-            'sender_email': event['sender_email'],
-            'recipient_id': event['recipient_id'],
-            'recipient_email': event['recipient_email'],
-            'timestamp': event['timestamp'],
-            'is_read': event['is_read'],
-            'read_at': event['read_at'],
-        }))
-
-    def message_read_status(self, event):
-        self.send(text_data=json.dumps({
-            'type': 'message_read_status',
-            'reader_id': event['reader_id'],
-            'reader_email': event['reader_email'],
-            'room_name': event['room_name'],
-            'timestamp': event['timestamp'],
-        }))
-
-    def typing_status(self, event):
+            await self.send_frame({"error": "An internal server error occurred"})
+
+    async def chat_message(self, event):
+        await self.send_encoded(event)
+
+    async def message_read_status(self, event):
+        await self.send_encoded(event)
+
+    async def typing_status(self, event):
         if self.scope["user"].id != event['sender_id']:
-            self.send(text_data=json.dumps({
-                'type': 'typing_status',
-                'sender_id': event['sender_id'],
-                'sender_email': event['sender_email'],
-                'is_typing': event['is_typing'],
-            }))
+            await self.send_encoded(event)
+
+    # ------------------------------
+    # Resuming (chat/delivery.py)
+    # ------------------------------
+    def resume_from(self):
+        since = parse_qs(self.scope.get('query_string', b'').decode()).get('since')
+        try:
+            return int(since[0]) if since else None
+        except ValueError:
+            return None
+
+    async def resume(self, since):
+        try:
+            current, frames = await delivery_log.replay(self.room_group_name, since)
+        except redis.RedisError as e:
+            logger.warning(f"Delivery log unavailable, {self.identity['email']} resyncs {self.room_name}: {e}")
+            current, frames = None, None
+        if frames is None:
+            # too far behind (or no log): the client reloads the room through MessageHistoryView
+            await self.send_frame({'type': 'resync', 'since': since, 'seq': current})
+            return
+        for frame in frames:
+            if frame['type'] == 'typing_status' and frame['sender_id'] == self.identity['id']:
+                continue
+            await self.send_frame(frame)
+
+    # ------------------------------
+    # Presence (chat/presence.py)
+    # ------------------------------
+    async def start_presence(self):
+        user_id = self.identity['id']
+        try:
+            if await presence.connect(user_id, self.channel_name):
+                await self.broadcast_presence(user_id, True)
+            if self.partner_id is not None:
+                # only connections chatting with a user hear about that user going on/offline
+                await self.channel_layer.group_add(presence_group(self.partner_id), self.channel_name)
+                state = await presence.get(self.partner_id)
+                await self.send_frame({'type': 'presence', 'user_id': self.partner_id, **state})
+        except redis.RedisError as e:
+            logger.warning(f"Presence unavailable for user {user_id}: {e}")
+            return
+        self.presence_task = asyncio.get_running_loop().create_task(self.presence_heartbeat())
+
+    async def presence_heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.CHAT_PRESENCE_HEARTBEAT)
+            try:
+                await presence.heartbeat(self.identity['id'], self.channel_name)
+            except redis.RedisError as e:
+                logger.warning(f"Presence heartbeat failed for user {self.identity['id']}: {e}")
+
+    async def stop_presence(self):
+        task = getattr(self, 'presence_task', None)
+        if task is None:
+            return
+        task.cancel()
+        user_id = self.identity['id']
+        try:
+            if self.partner_id is not None:
+                await self.channel_layer.group_discard(presence_group(self.partner_id), self.channel_name)
+            if await presence.disconnect(user_id, self.channel_name):
+                await self.broadcast_presence(user_id, False)
+        except redis.RedisError as e:
+            logger.warning(f"Presence unavailable for user {user_id}: {e}")
+
+    async def broadcast_presence(self, user_id, online):
+        await self.channel_layer.group_send(
+            presence_group(user_id),
+            {
+                'type': 'presence_update',
+                'frames': encode_all({
+                    'type': 'presence',
+                    'user_id': user_id,
+                    'online': online,
+                    'last_seen': int(time.time()),
+                }),
+            }
+        )
+
+    async def presence_update(self, event):
+        await self.send_encoded(event)
 
 
 
@@ -0,0 +1,18 @@
+# backend/chat/db.py
+
+from concurrent.futures import ThreadPoolExecutor
+from channels.db import DatabaseSyncToAsync
+from django.conf import settings
+
+# Dedicated, bounded pool for the websocket consumers' ORM work. The default database_sync_to_async is
+# thread sensitive, which funnels every consumer's queries through one shared thread; this pool lets a
+# fixed number of queries run side by side without a thread per connection.
+chat_db_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'CHAT_DB_THREADS', 8),
+    thread_name_prefix='chat-db',
+)
+
+
+def chat_db(func):
+    """database_sync_to_async on the chat pool; closes stale connections around each call like the original."""
+    return DatabaseSyncToAsync(func, thread_sensitive=False, executor=chat_db_executor)
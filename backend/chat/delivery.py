@@ -0,0 +1,118 @@
+# backend/chat/delivery.py
+# Resumable delivery of chat room events (CHAT_DELIVERY_LOG = True), in the channel layer's Redis.
+#
+#   chat:{<group>}:seq     counter, the last sequence number handed out in the room
+#   chat:{<group>}:stream  stream of the room's recent frames (chat_message, message_read_status,
+#                          typing_status), entry id <seq>-0, capped at about CHAT_STREAM_MAXLEN
+#                          entries
+#
+# Both keys are dropped CHAT_STREAM_TTL seconds after the last append, so an idle room costs nothing;
+# its seq then starts over at 1 and a client coming back with a higher ?since gets a resync.
+#
+# Sequences are kept per room, not per user: every room is a private two-party room, so both members
+# get the same frames in the same order and one counter and one stream serve them both. Per-user
+# sequences would mean a counter and a copy of every frame per recipient for no extra information.
+#
+# Each of those frames gets the next 'seq' of its room before it is broadcast, so the seqs a client
+# sees in a room only ever grow (its own typing frames leave gaps). A client that reconnects with
+# ?since=<last seq it saw> is sent what it missed straight from the stream; when that has been
+# trimmed already it gets {'type': 'resync', 'seq': <current seq>} and reloads the room through the
+# REST history instead. Around a reconnect a frame can arrive twice, clients drop seqs they have seen.
+
+import json
+import logging
+import time
+import redis
+from django.conf import settings
+from .redis_clients import RedisService
+
+logger = logging.getLogger(__name__)
+
+SEQ_KEY = 'chat:{{{}}}:seq'          # the braces keep both keys of a room in one cluster slot
+STREAM_KEY = 'chat:{{{}}}:stream'
+
+# INCR and XADD in one step, so entries are appended in seq order whatever the number of writers
+APPEND_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[1], seq .. '-0', 'frame', ARGV[2], 'at', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return seq
+"""
+
+
+class DeliveryLog(RedisService):
+    def __init__(self, maxlen=500, ttl=86400, typing_ttl=6):
+        super().__init__()
+        self.maxlen = maxlen
+        self.ttl = ttl
+        self.typing_ttl = typing_ttl  # typing frames older than this aren't worth replaying
+
+    def _args(self, group, frame):
+        return [SEQ_KEY.format(group), STREAM_KEY.format(group)], [self.maxlen, json.dumps(frame), time.time(), self.ttl]
+
+    async def append(self, group, frame):
+        """Log a frame of the room and return its seq."""
+        keys, args = self._args(group, frame)
+        return await self._async_redis().eval(APPEND_SCRIPT, len(keys), *keys, *args)
+
+    def append_sync(self, group, frame):
+        keys, args = self._args(group, frame)
+        return self._redis().eval(APPEND_SCRIPT, len(keys), *keys, *args)
+
+    async def replay(self, group, since):
+        """
+        (current seq, frames after `since` oldest first), frames None if some of them were trimmed
+        from the stream (or the counter was lost) and the client has to fall back to the REST history.
+        """
+        async with self._async_redis().pipeline(transaction=True) as pipe:
+            pipe.get(SEQ_KEY.format(group))
+            pipe.xrange(STREAM_KEY.format(group), f"{since + 1}-0", '+')
+            current, entries = await pipe.execute()
+        current = int(current or 0)
+        if current == since:
+            return current, []
+        if current < since or not entries or int(entries[0][0].split(b'-')[0]) != since + 1:
+            return current, None
+
+        frames = []
+        typing = {}  # sender id -> index of their latest typing frame
+        now = time.time()
+        for entry_id, fields in entries:
+            frame = json.loads(fields[b'frame'])
+            frame['seq'] = int(entry_id.split(b'-')[0])
+            if frame.get('type') == 'typing_status':
+                # only the latest state of each typist, and only while it could still be current
+                if now - float(fields[b'at']) > self.typing_ttl:
+                    continue
+                if frame['sender_id'] in typing:
+                    frames[typing[frame['sender_id']]] = None
+                typing[frame['sender_id']] = len(frames)
+            frames.append(frame)
+        return current, [frame for frame in frames if frame is not None]
+
+
+delivery_log = DeliveryLog(
+    maxlen=getattr(settings, 'CHAT_STREAM_MAXLEN', 500),
+    ttl=getattr(settings, 'CHAT_STREAM_TTL', 86400),
+    typing_ttl=getattr(settings, 'CHAT_TYPING_TTL', 6),
+)
+
+
+async def sequence(group, frame):
+    """Stamp a frame with the next seq of its room; it goes out without one if the log is off or unavailable."""
+    if settings.CHAT_DELIVERY_LOG:
+        try:
+            frame['seq'] = await delivery_log.append(group, frame)
+        except redis.RedisError as e:
+            logger.warning(f"Delivery log unavailable for {group}: {e}")
+    return frame
+
+
+def sequence_sync(group, frame):
+    if settings.CHAT_DELIVERY_LOG:
+        try:
+            frame['seq'] = delivery_log.append_sync(group, frame)
+        except redis.RedisError as e:
+            logger.warning(f"Delivery log unavailable for {group}: {e}")
+    return frame
@@ -0,0 +1,73 @@
+# backend/chat/identity.py
+# Process-wide LRU of the small user payloads ({'id', 'email', 'is_active'}) the chat consumers put on
+# every broadcast, so a connection resolves its chat partner once instead of querying on each message.
+# The websocket auth middleware (chat/auth.py) resolves the connecting user from it as well.
+#
+# Entries are dropped by the User/UserProfile signals in chat/signals.py when this process saves a
+# user. Saves made by another process are picked up when the entry expires (CHAT_IDENTITY_CACHE_TTL).
+
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+
+class UserIdentityCache:
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user id -> (expires at, payload), least recently used first
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def payload(user):
+        return {'id': user.id, 'email': user.email, 'is_active': user.is_active}
+
+    def put(self, user):
+        payload = self.payload(user)
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, payload)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return payload
+
+    def cached(self, user_id):
+        """Payload if it is cached and fresh, else None; never queries, safe to call from async code."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    return entry[1]
+                del self._entries[user_id]
+        return None
+
+    def get(self, user_id):
+        """Cached payload, loading it from the database on a miss; None if the user doesn't exist. Sync, use from chat_db."""
+        payload = self.cached(user_id)
+        if payload is not None:
+            return payload
+
+        user = get_user_model().objects.filter(id=user_id).only('id', 'email', 'is_active').first()
+        if user is None:
+            return None
+        return self.put(user)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = UserIdentityCache(
+    maxsize=getattr(settings, 'CHAT_IDENTITY_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'CHAT_IDENTITY_CACHE_TTL', 300),
+)
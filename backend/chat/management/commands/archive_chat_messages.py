@@ -0,0 +1,57 @@
+# chat/management/commands/archive_chat_messages.py
+# python manage.py archive_chat_messages [--months 6] [--batch-size 5000] [--sleep 0.1]
+#
+# Moves chat messages older than the last --months calendar months (CHAT_HOT_MONTHS) from
+# ChatMessage to ArchivedChatMessage, oldest first, in short batches in (timestamp, id) order that wait
+# for rows locked by live traffic. The last message of every room stays hot. Meant to run from cron,
+# e.g. nightly; it is safe to interrupt and re-run, an interrupted run leaves every room's archived
+# messages older than its hot ones.
+
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+from chat.archive import archive_batch, hot_cutoff
+from chat.models import ChatMessage
+
+
+def next_month(moment):
+    year, month = divmod(moment.year * 12 + moment.month, 12)
+    return timezone.make_aware(datetime(year, month + 1, 1))
+
+
+class Command(BaseCommand):
+    help = "Move chat messages older than CHAT_HOT_MONTHS to the archive table, a month at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=None, help="Calendar months to keep hot (default CHAT_HOT_MONTHS).")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Messages per batch.")
+        parser.add_argument('--sleep', type=float, default=0.0, help="Seconds to pause between batches.")
+
+    def handle(self, *args, **options):
+        cutoff = hot_cutoff(options['months'])
+        oldest = ChatMessage.objects.filter(timestamp__lt=cutoff).aggregate(oldest=Min('timestamp'))['oldest']
+        if oldest is None:
+            self.stdout.write(self.style.SUCCESS(f"Nothing older than {cutoff:%Y-%m-%d} to archive."))
+            return
+
+        total = 0
+        oldest = timezone.localtime(oldest)
+        month = timezone.make_aware(datetime(oldest.year, oldest.month, 1))
+        while month < cutoff:
+            month_end = min(next_month(month), cutoff)
+            moved = 0
+            start = time.perf_counter()
+            while True:
+                count = archive_batch(month_end, options['batch_size'])
+                if not count:
+                    break
+                moved += count
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+            total += moved
+            self.stdout.write(f"{month:%Y-%m}: archived {moved} messages in {time.perf_counter() - start:.1f}s")
+            month = month_end
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} messages archived, everything before {cutoff:%Y-%m-%d} is cold."))
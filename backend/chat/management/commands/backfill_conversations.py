@@ -0,0 +1,77 @@
+# chat/management/commands/backfill_conversations.py
+# python manage.py backfill_conversations [--batch-size 500]
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from chat.models import ChatMessage, Conversation
+
+
+class Command(BaseCommand):
+    help = "Create or refresh the Conversation summary of every private chat room from ChatMessage history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Rooms per batch.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        messages = ChatMessage.objects.filter(recipient__isnull=False)
+        rooms = messages.order_by('room_name').values_list('room_name', flat=True).distinct()
+
+        total = 0
+        last_room = ''
+        while True:
+            batch = list(rooms.filter(room_name__gt=last_room)[:batch_size])
+            if not batch:
+                break
+            last_room = batch[-1]
+
+            latest = (
+                messages.filter(room_name__in=batch)
+                .order_by('room_name', '-timestamp', '-id')
+                .distinct('room_name')
+                .only('id', 'room_name', 'sender_id', 'recipient_id', 'timestamp')
+            )
+            # unread = neither flagged by the legacy is_read nor covered by the recipient's watermark
+            read_up_to = Q()
+            for conversation in Conversation.objects.filter(room_name__in=batch):
+                for side in ('one', 'two'):
+                    last_read_id, last_read_at = getattr(conversation, f'last_read_{side}_id'), getattr(conversation, f'last_read_{side}_at')
+                    if last_read_at is not None:
+                        read_up_to |= Q(room_name=conversation.room_name, recipient_id=getattr(conversation, f'participant_{side}_id')) & (
+                            Q(timestamp__lt=last_read_at) | Q(timestamp=last_read_at, id__lte=last_read_id)
+                        )
+            unread_messages = messages.filter(room_name__in=batch, is_read=False)
+            if read_up_to:
+                unread_messages = unread_messages.exclude(read_up_to)
+            unread = {
+                (row['room_name'], row['recipient_id']): row['total']
+                for row in unread_messages
+                .values('room_name', 'recipient_id')
+                .annotate(total=Count('id'))
+            }
+
+            summaries = []
+            for message in latest:
+                first_id, second_id = sorted([message.sender_id, message.recipient_id])
+                summaries.append(Conversation(
+                    room_name=message.room_name,
+                    participant_one_id=first_id,
+                    participant_two_id=second_id,
+                    last_message_id=message.id,
+                    last_message_at=message.timestamp,
+                    unread_one=unread.get((message.room_name, first_id), 0),
+                    unread_two=unread.get((message.room_name, second_id), 0),
+                ))
+
+            with transaction.atomic():
+                Conversation.objects.bulk_create(
+                    summaries,
+                    update_conflicts=True,
+                    unique_fields=['room_name'],
+                    update_fields=['participant_one', 'participant_two', 'last_message', 'last_message_at', 'unread_one', 'unread_two'],
+                )
+            total += len(summaries)
+            self.stdout.write(f"Backfilled {total} conversations (up to {last_room})")
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} conversations up to date."))
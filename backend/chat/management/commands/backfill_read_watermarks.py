@@ -0,0 +1,65 @@
+# chat/management/commands/backfill_read_watermarks.py
+# python manage.py backfill_read_watermarks [--batch-size 500]
+#
+# One-off migration from the per-message ChatMessage.is_read flags to the read watermarks on
+# Conversation: per room and recipient, the newest message flagged as read becomes the watermark.
+# Watermarks that are already further along are left alone, so it is safe to re-run. Run
+# backfill_conversations first if some rooms don't have a Conversation yet.
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from chat.models import ChatMessage, Conversation
+
+
+class Command(BaseCommand):
+    help = "Set the Conversation read watermarks from the legacy per-message is_read flags, in batches of rooms."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Rooms per batch.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rooms = Conversation.objects.order_by('room_name').values_list('room_name', flat=True)
+
+        total = 0
+        last_room = ''
+        while True:
+            batch = list(rooms.filter(room_name__gt=last_room)[:batch_size])
+            if not batch:
+                break
+            last_room = batch[-1]
+
+            # newest read message per (room, recipient)
+            newest_read = (
+                ChatMessage.objects.filter(room_name__in=batch, recipient__isnull=False, is_read=True)
+                .order_by('room_name', 'recipient_id', '-timestamp', '-id')
+                .distinct('room_name', 'recipient_id')
+                .only('id', 'room_name', 'recipient_id', 'timestamp', 'read_at')
+            )
+            watermarks = {(message.room_name, message.recipient_id): message for message in newest_read}
+
+            with transaction.atomic():
+                changed = []
+                for conversation in Conversation.objects.select_for_update().filter(room_name__in=batch):
+                    moved = False
+                    for side in ('one', 'two'):
+                        message = watermarks.get((conversation.room_name, getattr(conversation, f'participant_{side}_id')))
+                        if message is None:
+                            continue
+                        current_id, current_at = getattr(conversation, f'last_read_{side}_id'), getattr(conversation, f'last_read_{side}_at')
+                        if current_at is not None and (current_at, current_id) >= (message.timestamp, message.id):
+                            continue
+                        setattr(conversation, f'last_read_{side}_id', message.id)
+                        setattr(conversation, f'last_read_{side}_at', message.timestamp)
+                        setattr(conversation, f'read_{side}_at', message.read_at or message.timestamp)
+                        moved = True
+                    if moved:
+                        changed.append(conversation)
+                Conversation.objects.bulk_update(changed, [
+                    'last_read_one_id', 'last_read_one_at', 'read_one_at',
+                    'last_read_two_id', 'last_read_two_at', 'read_two_at',
+                ])
+            total += len(changed)
+            self.stdout.write(f"Moved the watermarks of {total} conversations (up to {last_room})")
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} conversations updated."))
@@ -0,0 +1,44 @@
+# chat/management/commands/backfill_search_vectors.py
+# python manage.py backfill_search_vectors [--batch-size 5000] [--all]
+#
+# Fills ChatMessage.search_vector for rows saved before full-text search existed, walking the
+# table in id order, one short transaction per batch so live traffic is never blocked for long.
+# New messages already get their vector on insert. Use --all after changing CHAT_SEARCH_CONFIG.
+
+import time
+from django.contrib.postgres.search import SearchVector
+from django.core.management.base import BaseCommand
+from chat.models import ChatMessage
+from chat.search import SEARCH_CONFIG
+
+
+class Command(BaseCommand):
+    help = "Compute the full-text search vector of existing chat messages in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Messages per batch.")
+        parser.add_argument('--all', action='store_true', help="Recompute every row, not only the missing ones.")
+        parser.add_argument('--sleep', type=float, default=0.0, help="Seconds to pause between batches.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        messages = ChatMessage.objects.all() if options['all'] else ChatMessage.objects.filter(search_vector__isnull=True)
+
+        total = 0
+        last_id = 0
+        start = time.perf_counter()
+        while True:
+            ids = list(messages.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            total += ChatMessage.objects.filter(id__in=ids).update(
+                search_vector=SearchVector('content', config=SEARCH_CONFIG)
+            )
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"Indexed {total} messages (up to id {last_id}), {total / elapsed:.0f} rows/s")
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} messages indexed."))
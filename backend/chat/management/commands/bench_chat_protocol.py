@@ -0,0 +1,96 @@
+# chat/management/commands/bench_chat_protocol.py
+# python manage.py bench_chat_protocol [--subscribers 2 10 100] [--iterations 20000]
+#
+# Compares the JSON text frames with the MessagePack subprotocol (chat/protocol.py) on typical
+# frames: bytes on the wire, plain and after deflate (what permessage-deflate would send, each frame
+# compressed on its own), and CPU per broadcast when every subscriber encodes the event itself (the
+# old consumers) against encoding it once in the sender. Runs without a database or channel layer;
+# for a full run through ChatConsumer use chat_load_test with and without --msgpack.
+
+import json
+import time
+import zlib
+from django.core.management.base import BaseCommand
+from chat.protocol import JSON, MSGPACK, encode_all
+
+SAMPLE_FRAMES = {
+    'chat_message': {
+        'type': 'chat_message',
+        'message': "Sure, let's move tomorrow's session to 6 pm, I'll share the notes before.",
+        'sender_id': 1843,
+        'sender_email': 'mentor.anjali@example.com',
+        'recipient_id': 20417,
+        'recipient_email': 'learner.rahul.k@example.com',
+        'timestamp': '2025-07-14T12:31:07.482913+00:00',
+        'is_read': False,
+        'read_at': None,
+    },
+    'message_read_status': {
+        'type': 'message_read_status',
+        'reader_id': 20417,
+        'reader_email': 'learner.rahul.k@example.com',
+        'room_name': 'private_chat_1843_20417',
+        'last_read_message_id': 9812734,
+        'timestamp': '2025-07-14T12:31:09.102331+00:00',
+    },
+    'typing_status': {'type': 'typing_status', 'sender_id': 1843, 'sender_email': 'mentor.anjali@example.com', 'is_typing': True},
+    'presence': {'type': 'presence', 'user_id': 20417, 'online': True, 'last_seen': 1752496267},
+    'ice-candidate': {
+        'type': 'ice-candidate',
+        'candidate': {
+            'candidate': 'candidate:842163049 1 udp 1677729535 203.0.113.7 54321 typ srflx raddr 192.168.1.23 rport 54321 generation 0 ufrag eP2x network-cost 999',
+            'sdpMid': '0',
+            'sdpMLineIndex': 0,
+        },
+        'from': 'learner',
+    },
+}
+
+
+def deflated(payload):
+    data = payload.encode() if isinstance(payload, str) else payload
+    compressor = zlib.compressobj(wbits=-15)
+    return len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4  # RFC 7692 drops the 00 00 ff ff tail
+
+
+class Command(BaseCommand):
+    help = "Bytes per frame and CPU per broadcast of the JSON and MessagePack chat wire formats."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', nargs='+', type=int, default=[2, 10, 100])
+        parser.add_argument('--iterations', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'frame':<20} | {'json':>6} | {'msgpack':>7} | {'json+deflate':>12} | {'msgpack+deflate':>15}")
+        for name, frame in SAMPLE_FRAMES.items():
+            as_json, as_msgpack = JSON.encode(frame), MSGPACK.encode(frame)
+            self.stdout.write(
+                f"{name:<20} | {len(as_json.encode()):>6} | {len(as_msgpack):>7} | "
+                f"{deflated(as_json):>12} | {deflated(as_msgpack):>15}"
+            )
+
+        frame = SAMPLE_FRAMES['chat_message']
+        iterations = options['iterations']
+        for subscribers in options['subscribers']:
+            rounds = max(1, iterations // subscribers)
+
+            # before: the event carries the fields, every subscriber rebuilds the dict and dumps it
+            event = dict(frame)
+            start = time.process_time()
+            for _ in range(rounds):
+                for _ in range(subscribers):
+                    json.dumps({key: event[key] for key in frame})
+            per_subscriber = (time.process_time() - start) / rounds
+
+            # after: encoded once per format by the sender, subscribers pick their copy
+            start = time.process_time()
+            for _ in range(rounds):
+                event = {'type': 'chat_message', 'frames': encode_all(frame)}
+                for i in range(subscribers):
+                    event['frames']['msgpack' if i % 2 else 'json']
+            once = (time.process_time() - start) / rounds
+
+            self.stdout.write(
+                f"broadcast to {subscribers:>4} subscribers | encode per subscriber {per_subscriber * 1e6:8.1f} us | "
+                f"encode once {once * 1e6:8.1f} us"
+            )
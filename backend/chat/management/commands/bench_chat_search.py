@@ -0,0 +1,152 @@
+# chat/management/commands/bench_chat_search.py
+# python manage.py bench_chat_search --user-ids 3 7 12 --messages 3000000 [--keep] [--cleanup]
+#
+# Generates a synthetic chat corpus (rooms bench_search_<n> between the given users, messages made of
+# a skewed vocabulary plus ~10% rare "term<n>" tokens) with INSERT ... SELECT in Postgres, then times
+# search_messages() for common, mid-frequency, rare, multi-word and phrase queries (the first page, and
+# walking five pages with the cursor) against an unranked ILIKE for the newest 20 matches in the same
+# rooms. Searches run as the first user. Every match of a query is ranked, so very common words cost
+# the most; ILIKE is the other way round, quick for common words and a full scan for rare ones.
+# Synthetic rows are deleted at the end unless --keep; --cleanup only deletes leftovers.
+
+import random
+import statistics
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from chat.models import ChatMessage, Conversation
+from chat.search import SEARCH_CONFIG, search_messages
+
+User = get_user_model()
+
+ROOM_PREFIX = 'bench_search_'
+
+VOCABULARY = (
+    "the a to and you i is it for of we can on in this that be at with session tomorrow today thanks "
+    "okay sure please time class mentor learner lesson python javascript react django database course "
+    "question answer doubt explain example code error bug fix help project deadline meeting call video "
+    "link share screen notes assignment practice interview resume career job salary topic chapter module "
+    "quiz test exam score review feedback payment refund booking slot schedule reschedule cancel confirm "
+    "available busy morning evening weekend monday friday hour minute late early great good nice awesome "
+    "problem solution function class variable loop array string object api server deploy docker git branch"
+).split()
+
+
+class Command(BaseCommand):
+    help = "Benchmark chat full-text search on a synthetic corpus of a few million messages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-ids', nargs='+', type=int, help="At least two existing users to own the synthetic rooms.")
+        parser.add_argument('--messages', type=int, default=3000000)
+        parser.add_argument('--rooms', type=int, default=20000)
+        parser.add_argument('--chunk', type=int, default=250000, help="Rows per INSERT.")
+        parser.add_argument('--runs', type=int, default=20, help="Timed runs per query.")
+        parser.add_argument('--keep', action='store_true', help="Leave the corpus in place for another run.")
+        parser.add_argument('--cleanup', action='store_true', help="Only delete a corpus left by --keep.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Full-text search needs PostgreSQL.")
+        if options['cleanup']:
+            self.cleanup()
+            return
+        user_ids = options['user_ids'] or []
+        if len(user_ids) < 2 or User.objects.filter(id__in=user_ids).count() != len(set(user_ids)):
+            raise CommandError("--user-ids needs at least two existing users.")
+
+        if not ChatMessage.objects.filter(room_name__startswith=ROOM_PREFIX).exists():
+            self.generate(user_ids, options['messages'], options['rooms'], options['chunk'])
+        total = ChatMessage.objects.filter(room_name__startswith=ROOM_PREFIX).count()
+        user = User.objects.get(id=user_ids[0])
+        scope = Conversation.objects.for_user(user).filter(room_name__startswith=ROOM_PREFIX).count()
+        self.stdout.write(f"Corpus: {total} messages in {options['rooms']} rooms, user {user.id} is in {scope} of them")
+
+        queries = ['session', 'reschedule', f"term{random.randrange(50000)}", 'python error', '"code review"']
+        for text in queries:
+            self.report(text, 'fts page 1', lambda: search_messages(user, text), options['runs'])
+            self.report(text, 'fts 5 pages', lambda: self.deep(user, text, 5), options['runs'])
+            self.report(text, 'ilike', lambda: self.ilike(user, text), max(1, options['runs'] // 5))
+
+        if not options['keep']:
+            self.cleanup()
+
+    def generate(self, user_ids, messages, rooms, chunk):
+        self.stdout.write(f"Generating {messages} messages...")
+        start = time.perf_counter()
+        pairs = [sorted((user_ids[i % len(user_ids)], user_ids[(i + 1) % len(user_ids)])) for i in range(rooms)]
+        Conversation.objects.bulk_create([
+            Conversation(room_name=f"{ROOM_PREFIX}{i}", participant_one_id=first, participant_two_id=second)
+            for i, (first, second) in enumerate(pairs)
+        ], ignore_conflicts=True)
+
+        # words skewed towards the start of the vocabulary (random()^3), every 10th word a rare term
+        sql = f"""
+            INSERT INTO {ChatMessage._meta.db_table}
+                (sender_id, recipient_id, room_name, content, timestamp, is_read, search_vector)
+            SELECT m.sender_id, m.recipient_id, m.room_name, m.content,
+                   now() - make_interval(secs => %(total)s - g), true, to_tsvector(%(config)s::regconfig, m.content)
+            FROM generate_series(%(first)s, %(last)s) AS g
+            CROSS JOIN LATERAL (
+                SELECT %(users)s::bigint[] AS users, g %% %(rooms)s AS room
+            ) r
+            CROSS JOIN LATERAL (
+                SELECT r.users[1 + r.room %% cardinality(r.users)] AS sender_id,
+                       r.users[1 + (r.room + 1) %% cardinality(r.users)] AS recipient_id,
+                       %(prefix)s || r.room AS room_name,
+                       (SELECT string_agg(
+                            CASE WHEN random() < 0.1 THEN 'term' || floor(random() * 50000)::int
+                                 ELSE (%(words)s::text[])[1 + floor(power(random(), 3) * %(vocabulary)s)::int] END,
+                            ' ')
+                        FROM generate_series(1, 4 + g %% 12)) AS content
+            ) m
+        """
+        for first in range(1, messages + 1, chunk):
+            last = min(first + chunk - 1, messages)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, {
+                    'total': messages, 'config': SEARCH_CONFIG, 'first': first, 'last': last, 'users': user_ids,
+                    'rooms': rooms, 'prefix': ROOM_PREFIX, 'words': VOCABULARY, 'vocabulary': len(VOCABULARY),
+                })
+            self.stdout.write(f"  {last} rows, {last / (time.perf_counter() - start):.0f} rows/s")
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {ChatMessage._meta.db_table}")
+            cursor.execute(f"ANALYZE {Conversation._meta.db_table}")
+
+    @staticmethod
+    def deep(user, text, pages):
+        cursor = None
+        for _ in range(pages):
+            rows, cursor = search_messages(user, text, cursor=cursor)
+            if cursor is None:
+                break
+        return rows
+
+    @staticmethod
+    def ilike(user, text):
+        # what a search without the index looks like: substring match over the user's rooms
+        rooms = Conversation.objects.for_user(user).values('room_name')
+        return list(
+            ChatMessage.objects.filter(room_name__in=rooms, content__icontains=text.strip('"').split()[0])
+            .order_by('-id')[:20]
+        )
+
+    def report(self, text, label, run, runs):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f"{text:>16} | {label:<11} | p50 {statistics.median(timings):8.1f} ms | "
+            f"p95 {timings[min(len(timings) - 1, int(len(timings) * 0.95))]:8.1f} ms"
+        )
+
+    def cleanup(self):
+        # plain DELETE: the ORM would load millions of rows to run the on_delete handlers
+        Conversation.objects.filter(room_name__startswith=ROOM_PREFIX).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {ChatMessage._meta.db_table} WHERE room_name LIKE %s", [ROOM_PREFIX + '%'])
+            deleted = cursor.rowcount
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} synthetic rows."))
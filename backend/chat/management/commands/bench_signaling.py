@@ -0,0 +1,146 @@
+# chat/management/commands/bench_signaling.py
+# python manage.py bench_signaling --rooms 100 --candidates 12
+#
+# Simulates WebRTC call setup in many rooms at once (offer, answer, then a burst of trickle-ICE
+# candidates from both sides) against SignalingConsumer, once with the group broadcast and once with
+# the direct peer relay, on the in-memory channel layer. Reports how long it takes until both peers
+# hold every remote candidate, plus the number of channel layer operations. The in-memory layer gets
+# slower as the number of channels grows, so compare the two modes at the same --rooms.
+# Each room is a synthetic SessionBooking between two bench users (bench_signal_*@example.com), since
+# only a booking's mentor and learner may join its room; they are deleted at the end.
+
+import asyncio
+import json
+import statistics
+import time
+from datetime import time as time_of_day, timedelta
+from channels.layers import InMemoryChannelLayer, channel_layers
+from channels.routing import URLRouter
+from channels.testing.websocket import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from chat.consumers import SignalingConsumer
+from core.routing import websocket_urlpatterns
+from mentorship.models import SessionBooking
+
+User = get_user_model()
+
+EMAIL_PREFIX = 'bench_signal_'
+
+
+class CountingLayer(InMemoryChannelLayer):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.operations = 0
+
+    async def send(self, channel, message):
+        self.operations += 1
+        await super().send(channel, message)
+
+    async def group_send(self, group, message):
+        self.operations += 1
+        await super().group_send(group, message)
+
+
+def as_user(app, user):
+    # stands in for the auth middleware
+    async def wrapped(scope, receive, send):
+        return await app(dict(scope, user=user), receive, send)
+    return wrapped
+
+
+def frame(message_type, sender, **fields):
+    # same key order as the frontend's JSON.stringify
+    return json.dumps({'type': message_type, **fields, 'from': sender}, separators=(',', ':'))
+
+
+class Command(BaseCommand):
+    help = "Measure WebRTC call-setup signaling latency with group broadcast vs. direct peer relay."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=100)
+        parser.add_argument('--candidates', type=int, default=12, help="ICE candidates sent by each peer.")
+        parser.add_argument('--ice-batch-ms', type=int, default=SignalingConsumer.ice_batch_ms)
+
+    def handle(self, *args, **options):
+        SignalingConsumer.ice_batch_ms = options['ice_batch_ms']
+        self.cleanup()
+        mentor, learner = User.objects.bulk_create([
+            User(email=f"{EMAIL_PREFIX}mentor@example.com", password='!', is_active=True),
+            User(email=f"{EMAIL_PREFIX}learner@example.com", password='!', is_active=True),
+        ])
+        today = timezone.localdate()
+        bookings = SessionBooking.objects.bulk_create([
+            SessionBooking(
+                mentor=mentor, learner=learner, date=today + timedelta(days=room),
+                start_time=time_of_day(9), end_time=time_of_day(10), status=SessionBooking.Status.CONFIRMED,
+            )
+            for room in range(options['rooms'])
+        ])
+        try:
+            for direct in (False, True):
+                SignalingConsumer.direct_relay = direct
+                layer = CountingLayer(capacity=100000)
+                channel_layers.set('default', layer)
+                latencies = asyncio.run(self.run(mentor, learner, [booking.id for booking in bookings], options['candidates']))
+                latencies.sort()
+                self.stdout.write(
+                    f"{'direct relay' if direct else 'group send':>12} | {options['rooms']} calls | "
+                    f"p50 {statistics.median(latencies):7.2f} ms | p95 {latencies[int(len(latencies) * 0.95) - 1]:7.2f} ms | "
+                    f"max {latencies[-1]:7.2f} ms | layer ops {layer.operations}"
+                )
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        bench = User.objects.filter(email__startswith=EMAIL_PREFIX)
+        SessionBooking.objects.filter(mentor__in=bench).delete()
+        bench.delete()
+
+    async def run(self, mentor, learner, rooms, candidates):
+        router = URLRouter(websocket_urlpatterns)
+        apps = as_user(router, mentor), as_user(router, learner)
+        return await asyncio.gather(*(self.call(apps, room, candidates) for room in rooms))
+
+    async def call(self, apps, room, candidates):
+        mentor = WebsocketCommunicator(apps[0], f"/ws/signaling/{room}/")
+        learner = WebsocketCommunicator(apps[1], f"/ws/signaling/{room}/")
+        await mentor.connect()
+        await learner.connect()
+        await asyncio.sleep(0.05)  # let the peers find each other
+
+        async def receive_from(communicator, me, until):
+            # skip echoes of our own frames (group mode) until a frame matching `until` arrives
+            while True:
+                data = json.loads(await communicator.receive_from(10))
+                if data.get('from') != me and until(data):
+                    return data
+
+        async def mentor_side():
+            await mentor.send_to(frame('offer', 'mentor', sdp='v=0 offer'))
+            await receive_from(mentor, 'mentor', lambda data: data['type'] == 'answer')
+            for i in range(candidates):
+                await mentor.send_to(frame('ice-candidate', 'mentor', candidate={'candidate': f"c{i}"}))
+            remote = 0
+            while remote < candidates:
+                await receive_from(mentor, 'mentor', lambda data: data['type'] == 'ice-candidate')
+                remote += 1
+
+        async def learner_side():
+            await receive_from(learner, 'learner', lambda data: data['type'] == 'offer')
+            await learner.send_to(frame('answer', 'learner', sdp='v=0 answer'))
+            for i in range(candidates):
+                await learner.send_to(frame('ice-candidate', 'learner', candidate={'candidate': f"c{i}"}))
+            remote = 0
+            while remote < candidates:
+                await receive_from(learner, 'learner', lambda data: data['type'] == 'ice-candidate')
+                remote += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(mentor_side(), learner_side())
+        elapsed = (time.perf_counter() - start) * 1000
+
+        await mentor.disconnect()
+        await learner.disconnect()
+        return elapsed
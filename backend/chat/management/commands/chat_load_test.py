@@ -0,0 +1,157 @@
+# chat/management/commands/chat_load_test.py
+# python manage.py chat_load_test --user-ids 3 7 --pairs 200 --messages 20
+#
+# Opens `pairs` x 2 websocket connections to the chat room of two existing users, then has every
+# connection send `messages` frames and waits until every member of the room has received all of
+# them. Run it once on the current tree and once with --consumer pointing at another consumer class
+# (or on an older checkout) to get before/after numbers. chat_message frames write real ChatMessage
+# rows; use --typing to measure the fan-out path without touching the database (in typing mode the
+# elapsed time includes the final second of silence used to detect the end of the run). --msgpack
+# negotiates the compact binary subprotocol (chat/protocol.py) instead of JSON text frames; compare
+# the bytes and CPU time reported for both. --jwt authenticates every connection through the
+# access_token cookie and the production middleware (chat/auth.py) instead of injecting the user.
+
+import asyncio
+import time
+from channels.layers import InMemoryChannelLayer, channel_layers
+from channels.testing.websocket import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.tokens import AccessToken
+from chat.auth import JWTCookieAuthMiddlewareStack
+from chat.protocol import JSON, MSGPACK, SUBPROTOCOL
+
+User = get_user_model()
+
+
+def with_route(app, user=None):
+    # the room kwarg URLRouter would extract; with a user it also stands in for the auth middleware
+    async def wrapped(scope, receive, send):
+        scope = dict(scope, url_route={'kwargs': {'room_name': scope['path'].strip('/').split('/')[-1]}, 'args': ()})
+        if user is not None:
+            scope['user'] = user
+        return await app(scope, receive, send)
+    return wrapped
+
+
+def communicator_for(consumer, user, path, subprotocols, jwt=False):
+    if not jwt:
+        return WebsocketCommunicator(with_route(consumer.as_asgi(), user), path, subprotocols=subprotocols)
+    cookie = f"access_token={AccessToken.for_user(user)}".encode()
+    app = JWTCookieAuthMiddlewareStack(with_route(consumer.as_asgi()))
+    return WebsocketCommunicator(app, path, headers=[(b'cookie', cookie)], subprotocols=subprotocols)
+
+
+class Command(BaseCommand):
+    help = "Measure concurrent connections and message throughput of the chat websocket consumer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-ids', nargs=2, type=int, required=True, help="Two existing users to chat as.")
+        parser.add_argument('--pairs', type=int, default=100, help="Connections per user.")
+        parser.add_argument('--messages', type=int, default=10, help="Frames sent by every connection.")
+        parser.add_argument('--consumer', default='chat.consumers.ChatConsumer')
+        parser.add_argument('--typing', action='store_true', help="Send typing_start frames instead of chat messages.")
+        parser.add_argument('--msgpack', action='store_true', help="Negotiate the MessagePack subprotocol.")
+        parser.add_argument('--jwt', action='store_true', help="Authenticate through the access_token cookie middleware.")
+        parser.add_argument('--in-memory', action='store_true', help="Use the in-memory channel layer instead of CHANNEL_LAYERS.")
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(id__in=options['user_ids']))
+        if len(users) != 2:
+            raise CommandError("Both --user-ids must exist.")
+        if options['in_memory']:
+            channel_layers.set('default', InMemoryChannelLayer(capacity=100000))
+
+        consumer = import_string(options['consumer'])
+        asyncio.run(self.run(consumer, users, options))
+
+    async def run(self, consumer, users, options):
+        low, high = sorted(users, key=lambda user: user.id)
+        room_name = f"private_chat_{low.id}_{high.id}"
+        path = f"/ws/chat/{room_name}/"
+        pairs, per_connection, timeout = options['pairs'], options['messages'], options['timeout']
+        codec = MSGPACK if options['msgpack'] else JSON
+        subprotocols = [SUBPROTOCOL] if options['msgpack'] else None
+
+        communicators = [
+            (user, communicator_for(consumer, user, path, subprotocols, jwt=options['jwt']))
+            for _ in range(pairs) for user in (low, high)
+        ]
+
+        # ------------------------------
+        # Connections
+        # ------------------------------
+        start = time.perf_counter()
+        results = await asyncio.gather(*(communicator.connect(timeout) for _, communicator in communicators))
+        connect_s = time.perf_counter() - start
+        connected = sum(1 for ok, _ in results if ok)
+        self.stdout.write(
+            f"{consumer.__module__}.{consumer.__name__}: {connected}/{len(communicators)} connected in "
+            f"{connect_s * 1000:.0f} ms ({connected / connect_s:.0f} connects/s)"
+        )
+        if connected != len(communicators):
+            raise CommandError("Some connections were refused, check the user ids and room format.")
+
+        # connect() broadcasts read receipts, drain them so they are not counted below
+        await asyncio.sleep(0.5)
+        for _, communicator in communicators:
+            while not await communicator.receive_nothing(0.01):
+                await communicator.receive_from()
+
+        # ------------------------------
+        # Throughput
+        # ------------------------------
+        sent = len(communicators) * per_connection
+        received = {}
+        received_bytes = 0
+
+        async def send_frame(communicator, frame):
+            await communicator.send_to(**{codec.frame_kwarg: codec.encode(frame)})
+
+        async def receive_frame(communicator, timeout=1):
+            nonlocal received_bytes
+            data = await communicator.receive_from(timeout)
+            received_bytes += len(data.encode() if isinstance(data, str) else data)
+
+        async def send_all(user, communicator):
+            other = high if user is low else low
+            for i in range(per_connection):
+                if options['typing']:
+                    await send_frame(communicator, {'type': 'typing_start'})
+                else:
+                    await send_frame(communicator, {'type': 'chat_message', 'message': f"load {i}", 'recipient_id': other.id})
+
+        async def receive_all(communicator):
+            received[id(communicator)] = 0
+            if options['typing']:
+                # typing frames are coalesced server side, so just count what arrives until the room goes quiet
+                while not await communicator.receive_nothing(1.0):
+                    await receive_frame(communicator)
+                    received[id(communicator)] += 1
+            else:
+                for _ in range(sent):
+                    await receive_frame(communicator, timeout)
+                    received[id(communicator)] += 1
+
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        await asyncio.gather(
+            *(send_all(user, communicator) for user, communicator in communicators),
+            *(receive_all(communicator) for _, communicator in communicators),
+        )
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        delivered = sum(received.values())
+        self.stdout.write(
+            f"sent {sent} frames, delivered {delivered} in {elapsed * 1000:.0f} ms | "
+            f"{sent / elapsed:.0f} frames/s in, {delivered / elapsed:.0f} frames/s out"
+        )
+        if delivered:
+            self.stdout.write(
+                f"{codec.name}: {received_bytes} bytes out, {received_bytes / delivered:.1f} bytes/frame | "
+                f"CPU {cpu * 1000:.0f} ms, {cpu * 1e6 / delivered:.1f} us per delivered frame"
+            )
+
+        await asyncio.gather(*(communicator.disconnect() for _, communicator in communicators))
@@ -1,6 +1,10 @@
 # backend/chat/models.py
 
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
 from django.conf import settings # Import settings to get AUTH_USER_MODEL
 from django.contrib.auth import get_user_model # Also good practice for direct User access if needed
 
@@ -35,25 +39,216 @@ class ChatMessage(models.Model):
         help_text="The actual text content of the message."
     )
     timestamp = models.DateTimeField(
-        auto_now_add=True, # Automatically sets the timestamp when the message is created
+        default=timezone.now, editable=False, # set on creation; a default rather than auto_now_add so write-behind can assign it up front
         help_text="The date and time the message was sent."
     )
     is_read = models.BooleanField(
-        default=False, # Flag to indicate if the recipient has read the message
-        help_text="True if the recipient has read this message, False otherwise."
+        default=False, # Legacy flag, no longer written: read state lives in the Conversation watermarks
+        help_text="True if the recipient has read this message (legacy, see Conversation.apply_read_state)."
     )
     read_at = models.DateTimeField( # Timestamp when the message was read
         null=True,
         blank=True,
         help_text="The timestamp when the message was marked as read by the recipient."
     )
+    search_vector = SearchVectorField( # to_tsvector of content, written with the row (see chat/search.py)
+        null=True, editable=False,
+        help_text="Full-text search document of the content; NULL until backfilled for older rows."
+    )
 
     class Meta:
         ordering = ['timestamp'] # Default ordering for messages in a chat
+        indexes = [
+            # keyset pagination of a room's history: WHERE room_name = ... AND (timestamp, id) < ...
+            models.Index(fields=['room_name', 'timestamp', 'id'], name='chat_room_timestamp_id_idx'),
+            # archive_chat_messages takes the oldest messages of all rooms first (see chat/archive.py)
+            models.Index(fields=['timestamp', 'id'], name='chat_timestamp_id_idx'),
+            GinIndex(fields=['search_vector'], name='chat_message_search_idx'),
+        ]
         verbose_name = "Chat Message"
         verbose_name_plural = "Chat Messages"
 
     def __str__(self):
         if self.recipient:
             return f"From {self.sender.email} to {self.recipient.email} in {self.room_name} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
-        return f"From {self.sender.email} in {self.room_name} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"From {self.sender.email} in {self.room_name} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+class ArchivedChatMessage(models.Model):
+    """
+    Cold tier of ChatMessage: messages older than CHAT_HOT_MONTHS are moved here, a calendar month at a
+    time, by `python manage.py archive_chat_messages`, keeping their id. Read through chat/archive.py,
+    which stitches the two tiers together for history and search; nothing on the live path touches it.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', null=True, blank=True)
+    room_name = models.CharField(max_length=255)
+    content = models.TextField()
+    timestamp = models.DateTimeField()
+    is_read = models.BooleanField(default=False)
+    read_at = models.DateTimeField(null=True, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    archived_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['room_name', 'timestamp', 'id'], name='chat_archive_room_ts_id_idx'),
+            GinIndex(fields=['search_vector'], name='chat_archive_search_idx'),
+        ]
+        verbose_name = "Archived Chat Message"
+        verbose_name_plural = "Archived Chat Messages"
+
+    def __str__(self):
+        return f"Archived message {self.id} in {self.room_name} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+class ConversationManager(models.Manager):
+    def record_message(self, message):
+        """Point the room's summary at a newly saved message and bump the recipient's unread counter."""
+        return self.record_messages([message])[message.room_name]
+
+    def record_messages(self, messages):
+        """
+        Batched record_message: one UPDATE per room however many of its messages are in the batch.
+        Returns {room_name: conversation}.
+        """
+        rooms = {}
+        for message in messages:
+            rooms.setdefault(message.room_name, []).append(message)
+
+        conversations = {}
+        for room_name, room_messages in rooms.items():
+            first_id, second_id = sorted([room_messages[0].sender_id, room_messages[0].recipient_id])
+            conversation, _ = self.get_or_create(
+                room_name=room_name,
+                defaults={'participant_one_id': first_id, 'participant_two_id': second_id},
+            )
+            conversations[room_name] = conversation
+
+            latest = max(room_messages, key=lambda message: (message.timestamp, message.id))
+            unread_one = sum(1 for message in room_messages if message.recipient_id == conversation.participant_one_id)
+            unread_two = len(room_messages) - unread_one
+
+            # single UPDATE; never moves last_message backwards if two sends race
+            is_newer = Q(last_message_at__isnull=True) | Q(last_message_at__lte=latest.timestamp)
+            self.filter(pk=conversation.pk).update(
+                last_message_id=Case(
+                    When(is_newer, then=Value(latest.id)), default=F('last_message_id'), output_field=models.BigIntegerField()
+                ),
+                last_message_at=Case(When(is_newer, then=Value(latest.timestamp)), default=F('last_message_at')),
+                unread_one=F('unread_one') + unread_one,
+                unread_two=F('unread_two') + unread_two,
+            )
+        return conversations
+
+    def mark_read(self, room_name, user_id):
+        """
+        Move the reader's watermark to the room's last message and reset their unread counter; two queries
+        whatever the number of unread messages, no ChatMessage rows are touched.
+        Returns (number of messages that became read, conversation), (0, None) if there was nothing to read.
+        """
+        with transaction.atomic():
+            conversation = self.select_for_update().filter(room_name=room_name).first()
+            if conversation is None or user_id not in (conversation.participant_one_id, conversation.participant_two_id):
+                return 0, None
+            side = 'one' if conversation.participant_one_id == user_id else 'two'
+            marked = getattr(conversation, f'unread_{side}')
+            if not marked:
+                return 0, None
+            setattr(conversation, f'unread_{side}', 0)
+            setattr(conversation, f'last_read_{side}_id', conversation.last_message_id)
+            setattr(conversation, f'last_read_{side}_at', conversation.last_message_at)
+            setattr(conversation, f'read_{side}_at', timezone.now())
+            conversation.save(update_fields=[
+                f'unread_{side}', f'last_read_{side}_id', f'last_read_{side}_at', f'read_{side}_at',
+            ])
+        return marked, conversation
+
+    def for_user(self, user):
+        return self.filter(Q(participant_one=user) | Q(participant_two=user))
+
+
+class Conversation(models.Model):
+    """
+    Denormalized summary of a private chat room, kept up to date whenever a message is written or read
+    so inbox and unread badge reads don't have to scan ChatMessage.
+    Rebuild with: python manage.py backfill_conversations
+    Convert legacy per-message read flags into watermarks with: python manage.py backfill_read_watermarks
+    """
+    room_name = models.CharField(max_length=255, unique=True)
+    participant_one = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='conversations_as_first',
+        help_text="The participant with the lower user id."
+    )
+    participant_two = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='conversations_as_second',
+        help_text="The participant with the higher user id."
+    )
+    last_message = models.ForeignKey(
+        ChatMessage,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='+',
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    unread_one = models.PositiveIntegerField(default=0, help_text="Messages participant_one hasn't read yet.")
+    unread_two = models.PositiveIntegerField(default=0, help_text="Messages participant_two hasn't read yet.")
+    # Read watermarks: everything up to and including (last_read_X_at, last_read_X_id) has been read by
+    # participant X, at read_X_at. Plain ids rather than foreign keys so deleting a message doesn't move them.
+    last_read_one_id = models.BigIntegerField(null=True, blank=True, help_text="Newest message participant_one has read.")
+    last_read_one_at = models.DateTimeField(null=True, blank=True, help_text="Timestamp of that message.")
+    read_one_at = models.DateTimeField(null=True, blank=True, help_text="When participant_one last read the room.")
+    last_read_two_id = models.BigIntegerField(null=True, blank=True, help_text="Newest message participant_two has read.")
+    last_read_two_at = models.DateTimeField(null=True, blank=True, help_text="Timestamp of that message.")
+    read_two_at = models.DateTimeField(null=True, blank=True, help_text="When participant_two last read the room.")
+    archived_through = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Timestamp of the newest message moved to ArchivedChatMessage; NULL if the room has none there."
+    )
+
+    objects = ConversationManager()
+
+    class Meta:
+        ordering = ['-last_message_at']
+        indexes = [
+            models.Index(fields=['participant_one', '-last_message_at']),
+            models.Index(fields=['participant_two', '-last_message_at']),
+        ]
+
+    def partner_of(self, user_id):
+        return self.participant_two if self.participant_one_id == user_id else self.participant_one
+
+    def unread_for(self, user_id):
+        return self.unread_one if self.participant_one_id == user_id else self.unread_two
+
+    def read_watermark(self, user_id):
+        """(last read message id, its timestamp, read at) of a participant; all None if they never read the room."""
+        if self.participant_one_id == user_id:
+            return self.last_read_one_id, self.last_read_one_at, self.read_one_at
+        return self.last_read_two_id, self.last_read_two_at, self.read_two_at
+
+    def apply_read_state(self, messages):
+        """
+        Compatibility path for the legacy ChatMessage.is_read/read_at fields, which are no longer written:
+        fills them in from the recipient's watermark. Rows flagged before the watermarks existed keep their flag.
+        """
+        watermarks = {}
+        for message in messages:
+            if message.is_read:
+                continue
+            if message.recipient_id not in watermarks:
+                watermarks[message.recipient_id] = self.read_watermark(message.recipient_id)
+            last_read_id, last_read_at, read_at = watermarks[message.recipient_id]
+            if last_read_at is not None and (message.timestamp, message.id) <= (last_read_at, last_read_id):
+                message.is_read = True
+                message.read_at = read_at
+        return messages
+
+    def __str__(self):
+        return f"{self.room_name} (last message at {self.last_message_at})"
\ No newline at end of file
@@ -0,0 +1,82 @@
+# backend/chat/pagination.py
+
+import base64
+import binascii
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.pagination import CursorPagination
+
+
+class ConversationCursorPagination(CursorPagination):
+    page_size = 20
+    ordering = ('-last_message_at', '-id')
+
+
+# ----------------------------
+# Keyset (timestamp, id) cursors for message lists
+# ----------------------------
+def encode_cursor(message):
+    raw = f"{message.timestamp.isoformat()}|{message.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Returns (timestamp, id); raises ValueError for anything that isn't a cursor we issued."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, message_id = raw.rsplit('|', 1)
+        parsed = parse_datetime(timestamp)
+        if parsed is None:
+            raise ValueError
+        return parsed, int(message_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError("Invalid cursor.")
+
+
+def keyset_page(queryset, before=None, after=None, limit=50):
+    """
+    One page of messages in ascending (timestamp, id) order, found through the (room_name, timestamp, id)
+    index instead of OFFSET. Without a cursor the newest page is returned.
+    Returns (messages, has_older, has_newer).
+    """
+    if after:
+        timestamp, message_id = decode_cursor(after)
+        rows = list(
+            queryset.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=message_id))
+            .order_by('timestamp', 'id')[:limit + 1]
+        )
+        # anything before the page: before its first row, or at/before the cursor when the page is empty
+        if rows:
+            older = Q(timestamp__lt=rows[0].timestamp) | Q(timestamp=rows[0].timestamp, id__lt=rows[0].id)
+        else:
+            older = Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lte=message_id)
+        has_older = queryset.filter(older).exists()
+        return rows[:limit], has_older, len(rows) > limit
+
+    qs = queryset
+    if before:
+        timestamp, message_id = decode_cursor(before)
+        qs = qs.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=message_id))
+    rows = list(qs.order_by('-timestamp', '-id')[:limit + 1])
+    has_older = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return rows, has_older, bool(before)
+
+
+# ----------------------------
+# Keyset (rank, id) cursors for search results
+# ----------------------------
+def encode_search_cursor(message):
+    raw = f"{message.rank!r}|{message.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_search_cursor(cursor):
+    """Returns (rank, id); raises ValueError for anything that isn't a cursor we issued."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        rank, message_id = raw.rsplit('|', 1)
+        return float(rank), int(message_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError("Invalid cursor.")
@@ -0,0 +1,105 @@
+# backend/chat/presence.py
+# Online / last-seen tracking in the channel layer's Redis, no database involved.
+#
+#   presence:conns:<user id>  sorted set of the user's open chat connections (channel names), scored by
+#                             the time their heartbeat runs out; online = at least one unexpired member
+#   presence:last_seen        hash user id -> unix time the user was last online
+#
+# ChatConsumer registers a connection in connect(), refreshes it every CHAT_PRESENCE_HEARTBEAT seconds
+# and removes it in disconnect(). A worker that dies without disconnecting just stops heartbeating and
+# its connections fall out after CHAT_PRESENCE_TTL. When a user goes online or offline the change is
+# sent to the group presence_<user id>, which only the connections chatting with that user join.
+
+import logging
+import time
+from django.conf import settings
+from .redis_clients import RedisService
+
+logger = logging.getLogger(__name__)
+
+CONNECTIONS_KEY = 'presence:conns:{}'
+LAST_SEEN_KEY = 'presence:last_seen'
+
+
+def presence_group(user_id):
+    return f"presence_{user_id}"
+
+
+class PresenceService(RedisService):
+    def __init__(self, ttl=60):
+        super().__init__()
+        self.ttl = ttl
+
+    # ------------------------------
+    # Connections (async, called from ChatConsumer)
+    # ------------------------------
+    async def connect(self, user_id, connection):
+        """Register a connection; True if the user was offline until now."""
+        now = time.time()
+        key = CONNECTIONS_KEY.format(user_id)
+        async with self._async_redis().pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(key, '-inf', now)
+            pipe.zcard(key)
+            pipe.zadd(key, {connection: now + self.ttl})
+            pipe.expire(key, self.ttl)
+            pipe.hset(LAST_SEEN_KEY, user_id, int(now))
+            _, online_before, *_ = await pipe.execute()
+        return online_before == 0
+
+    async def heartbeat(self, user_id, connection):
+        now = time.time()
+        key = CONNECTIONS_KEY.format(user_id)
+        async with self._async_redis().pipeline(transaction=True) as pipe:
+            pipe.zadd(key, {connection: now + self.ttl})
+            pipe.expire(key, self.ttl)
+            pipe.hset(LAST_SEEN_KEY, user_id, int(now))
+            await pipe.execute()
+
+    async def disconnect(self, user_id, connection):
+        """Drop a connection; True if it was the user's last one."""
+        now = time.time()
+        key = CONNECTIONS_KEY.format(user_id)
+        async with self._async_redis().pipeline(transaction=True) as pipe:
+            pipe.zrem(key, connection)
+            pipe.zremrangebyscore(key, '-inf', now)
+            pipe.zcard(key)
+            pipe.hset(LAST_SEEN_KEY, user_id, int(now))
+            _, _, online_after, _ = await pipe.execute()
+        return online_after == 0
+
+    async def get(self, user_id):
+        return (await self._fetch_async([user_id]))[user_id]
+
+    async def _fetch_async(self, user_ids):
+        async with self._async_redis().pipeline(transaction=False) as pipe:
+            self._queue_lookups(pipe, user_ids)
+            return self._parse(user_ids, await pipe.execute())
+
+    # ------------------------------
+    # Bulk lookups (sync, for the REST views)
+    # ------------------------------
+    def bulk(self, user_ids):
+        """{user id: {'online': bool, 'last_seen': unix time or None}} in one round trip."""
+        if not user_ids:
+            return {}
+        with self._redis().pipeline(transaction=False) as pipe:
+            self._queue_lookups(pipe, user_ids)
+            return self._parse(user_ids, pipe.execute())
+
+    @staticmethod
+    def _queue_lookups(pipe, user_ids):
+        now = time.time()
+        for user_id in user_ids:
+            pipe.zcount(CONNECTIONS_KEY.format(user_id), now, '+inf')
+        pipe.hmget(LAST_SEEN_KEY, list(user_ids))
+
+    @staticmethod
+    def _parse(user_ids, results):
+        *counts, last_seen = results
+        return {
+            user_id: {'online': count > 0, 'last_seen': int(seen) if seen is not None else None}
+            for user_id, count, seen in zip(user_ids, counts, last_seen)
+        }
+
+
+presence = PresenceService(ttl=getattr(settings, 'CHAT_PRESENCE_TTL', 60))
@@ -0,0 +1,128 @@
+# backend/chat/protocol.py
+# Wire formats of the chat and signaling websockets.
+#
+# JSON text frames stay the default. A client that offers the subprotocol SUBPROTOCOL in its
+# handshake (new WebSocket(url, ['learnometer.msgpack.v1'])) gets binary MessagePack frames
+# instead, in which the known field names and message types are replaced by small integers
+# (FIELDS / TYPES, append-only: an id is never reused). Unknown keys and values pass through as is.
+#
+# Broadcasts are encoded once, by the connection that triggers them, in every format (the 'frames'
+# of the group event, see encode_all()); each subscriber sends the copy its client negotiated
+# instead of building and encoding the same dict again.
+#
+# permessage-deflate is negotiated by the ASGI server, not by the consumers: uvicorn with the
+# websockets implementation offers it by default, daphne has no support for it.
+
+import json
+import msgpack
+
+SUBPROTOCOL = 'learnometer.msgpack.v1'
+
+FIELDS = (
+    'type', 'message', 'sender_id', 'sender_email', 'recipient_id', 'recipient_email', 'timestamp',
+    'is_read', 'read_at', 'reader_id', 'reader_email', 'room_name', 'last_read_message_id', 'is_typing',
+    'user_id', 'online', 'last_seen', 'error', 'from', 'sdp', 'candidate', 'seq', 'since',
+)
+TYPES = (
+    'chat_message', 'message_read_status', 'typing_status', 'typing_start', 'typing_stop', 'presence',
+    'offer', 'answer', 'ice-candidate', 'end-session', 'session-completed', 'resync',
+)
+_FIELD_IDS = {name: i for i, name in enumerate(FIELDS)}
+_TYPE_IDS = {name: i for i, name in enumerate(TYPES)}
+
+
+def compact(frame):
+    data = {}
+    for key, value in frame.items():
+        if key == 'type':
+            value = _TYPE_IDS.get(value, value)
+        data[_FIELD_IDS.get(key, key)] = value
+    return data
+
+
+def expand(data):
+    frame = {}
+    for key, value in data.items():
+        if isinstance(key, int) and 0 <= key < len(FIELDS):
+            key = FIELDS[key]
+        if key == 'type' and isinstance(value, int) and 0 <= value < len(TYPES):
+            value = TYPES[value]
+        frame[key] = value
+    return frame
+
+
+class JsonCodec:
+    name = 'json'
+    subprotocol = None
+    frame_kwarg = 'text_data'
+    invalid = "Invalid JSON format"
+
+    def encode(self, frame):
+        return json.dumps(frame)
+
+    def decode(self, raw):
+        """dict of a received frame; ValueError if it isn't one."""
+        if not isinstance(raw, str):
+            raise ValueError(self.invalid)
+        data = json.loads(raw)
+        if not isinstance(data, dict):
+            raise ValueError(self.invalid)
+        return data
+
+
+class MsgPackCodec:
+    name = 'msgpack'
+    subprotocol = SUBPROTOCOL
+    frame_kwarg = 'bytes_data'
+    invalid = "Invalid MessagePack frame"
+
+    def encode(self, frame):
+        return msgpack.packb(compact(frame))
+
+    def decode(self, raw):
+        if not isinstance(raw, bytes):
+            raise ValueError(self.invalid)
+        try:
+            data = msgpack.unpackb(raw, strict_map_key=False)
+        except Exception:
+            raise ValueError(self.invalid)
+        if not isinstance(data, dict):
+            raise ValueError(self.invalid)
+        return expand(data)
+
+
+JSON = JsonCodec()
+MSGPACK = MsgPackCodec()
+CODECS = {codec.name: codec for codec in (JSON, MSGPACK)}
+
+
+def negotiate(scope):
+    return MSGPACK if SUBPROTOCOL in scope.get('subprotocols', ()) else JSON
+
+
+def encode_all(frame):
+    """The frame in every wire format, to put in a group event as 'frames'."""
+    return {name: codec.encode(frame) for name, codec in CODECS.items()}
+
+
+class WireProtocolMixin:
+    """For websocket consumers: negotiate the codec on connect and send frames in it."""
+    codec = JSON
+
+    async def accept_negotiated(self):
+        self.codec = negotiate(self.scope)
+        await self.accept(subprotocol=self.codec.subprotocol)
+
+    async def send_frame(self, frame):
+        await self.send(**{self.codec.frame_kwarg: self.codec.encode(frame)})
+
+    async def send_encoded(self, event):
+        # a group event built with encode_all()
+        await self.send(**{self.codec.frame_kwarg: event['frames'][self.codec.name]})
+
+    async def send_raw(self, raw):
+        # a frame received from another client, passed on untouched when both sides speak the same format
+        own = isinstance(raw, str) == (self.codec is JSON)
+        if not own:
+            raw = self.codec.encode((MSGPACK if self.codec is JSON else JSON).decode(raw))
+        await self.send(**{self.codec.frame_kwarg: raw})
@@ -0,0 +1,36 @@
+# backend/chat/redis_clients.py
+# Redis connections of the chat features that keep their state next to the channel layer (presence,
+# the delivery log), on the server configured in CHANNEL_LAYERS.
+
+import asyncio
+import weakref
+import redis
+import redis.asyncio
+from django.conf import settings
+
+
+def redis_url():
+    host = settings.CHANNEL_LAYERS['default'].get('CONFIG', {}).get('hosts', [('127.0.0.1', 6379)])[0]
+    if isinstance(host, dict):
+        host = host['address']
+    if isinstance(host, str):
+        return host
+    return f"redis://{host[0]}:{host[1]}/0"
+
+
+class RedisService:
+    def __init__(self):
+        self._async_clients = weakref.WeakKeyDictionary()  # event loop -> client, pools are bound to a loop
+        self._client = None
+
+    def _async_redis(self):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = redis.asyncio.Redis.from_url(redis_url())
+        return client
+
+    def _redis(self):
+        if self._client is None:
+            self._client = redis.Redis.from_url(redis_url())
+        return self._client
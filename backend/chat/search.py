@@ -0,0 +1,82 @@
+# backend/chat/search.py
+# Full-text search over chat messages (Postgres).
+#
+# ChatMessage.search_vector holds to_tsvector(CHAT_SEARCH_CONFIG, content) and has a GIN index. New
+# messages get it in the same INSERT (search_document()); rows written before the column existed are
+# filled by `python manage.py backfill_search_vectors`. Results are ordered by (rank, id) descending
+# and paged with a keyset cursor on those two values, so a deep page costs the same as the first one.
+# The archive tier (ArchivedChatMessage) carries its search_vector over and has the same GIN index.
+#
+# Headlines are user-written text: ts_headline marks the matches with control characters (removed
+# from the content first), then the text is HTML-escaped and only those marks become <mark> tags.
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db.models import F, FloatField, Q, TextField, Value
+from django.db.models.functions import Cast, Replace
+from django.utils.html import escape
+from .models import ArchivedChatMessage, ChatMessage, Conversation
+from .pagination import decode_search_cursor, encode_search_cursor
+
+SEARCH_CONFIG = getattr(settings, 'CHAT_SEARCH_CONFIG', 'english')
+
+MARK_START, MARK_STOP = '\x02', '\x03'
+
+
+def search_document(content):
+    """Expression for the search_vector of a message about to be inserted."""
+    return SearchVector(Value(content, output_field=TextField()), config=SEARCH_CONFIG)
+
+
+def search_query(text):
+    # websearch syntax: plain words are ANDed, "quoted phrases", OR, -excluded
+    return SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+
+
+def highlight(headline):
+    """HTML of a headline: the text escaped, the marked matches in <mark> tags."""
+    return escape(headline).replace(MARK_START, '<mark>').replace(MARK_STOP, '</mark>')
+
+
+def _matches(model, rooms, query, room_name, cursor, limit):
+    messages = (
+        model.objects.filter(room_name__in=rooms, search_vector=query)
+        # ts_rank is a float4; as a double it survives the trip through the cursor exactly
+        .annotate(rank=Cast(SearchRank(F('search_vector'), query), FloatField()))
+    )
+    if room_name:
+        messages = messages.filter(room_name=room_name)
+    if cursor:
+        rank, message_id = decode_search_cursor(cursor)
+        messages = messages.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=message_id))
+
+    # the headline is only computed for the rows on the page, after the sort and LIMIT
+    return list(
+        messages.annotate(headline=SearchHeadline(
+            Replace(Replace('content', Value(MARK_START), Value('')), Value(MARK_STOP), Value('')),
+            query, config=SEARCH_CONFIG, start_sel=MARK_START, stop_sel=MARK_STOP, max_fragments=2,
+        ))
+        .only('id', 'sender_id', 'recipient_id', 'room_name', 'timestamp')
+        .order_by('-rank', '-id')[:limit + 1]
+    )
+
+
+def search_messages(user, text, room_name=None, cursor=None, limit=20):
+    """
+    One page of the messages in `user`'s rooms matching `text`, best match first, with a highlighted
+    `headline` and the `rank` annotated. Rooms with archived messages are searched in both tiers
+    (chat/archive.py). Returns (messages, next cursor or None).
+    """
+    query = search_query(text)
+    conversations = Conversation.objects.for_user(user)
+    rows = _matches(ChatMessage, conversations.values('room_name'), query, room_name, cursor, limit)
+    archived_rooms = conversations.filter(archived_through__isnull=False)
+    if archived_rooms.exists():
+        rows += _matches(ArchivedChatMessage, archived_rooms.values('room_name'), query, room_name, cursor, limit)
+        rows.sort(key=lambda message: (message.rank, message.id), reverse=True)
+
+    next_cursor = encode_search_cursor(rows[limit - 1]) if len(rows) > limit else None
+    rows = rows[:limit]
+    for message in rows:
+        message.headline = highlight(message.headline)
+    return rows, next_cursor
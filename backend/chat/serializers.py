@@ -3,7 +3,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from users.models import UserProfile 
-from . models import ChatMessage
+from . models import ChatMessage, Conversation
 
 User = get_user_model()
 
@@ -44,4 +44,49 @@ class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ChatMessage
         fields = ['id', 'sender', 'recipient', 'room_name', 'content', 'timestamp', 'is_read', 'read_at']
-        read_only_fields = ['sender', 'recipient', 'room_name', 'timestamp', 'is_read', 'read_at'] # These are set by backend
\ No newline at end of file
+        read_only_fields = ['sender', 'recipient', 'room_name', 'timestamp', 'is_read', 'read_at'] # These are set by backend
+
+
+class CompactMessageSerializer(serializers.ModelSerializer):
+    # Used by the paginated history: users are sent once per response, messages only carry their ids
+    sender_id = serializers.IntegerField(read_only=True)
+    recipient_id = serializers.IntegerField(read_only=True)
+    timestamp = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%S.%fZ", read_only=True)
+    read_at = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%S.%fZ", read_only=True)
+
+    class Meta:
+        model = ChatMessage
+        fields = ['id', 'sender_id', 'recipient_id', 'content', 'timestamp', 'is_read', 'read_at']
+
+
+class ConversationSerializer(serializers.ModelSerializer):
+    """
+    One row per chat room, read from the denormalized Conversation summary.
+    Keeps the partner fields of ChatUserSerializer at the top level and adds the last message and unread count.
+    """
+    unread_count = serializers.SerializerMethodField()
+    last_message = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Conversation
+        fields = ['room_name', 'unread_count', 'last_message']
+
+    def get_unread_count(self, obj):
+        return obj.unread_for(self.context['request'].user.id)
+
+    def get_last_message(self, obj):
+        message = obj.last_message
+        if message is None:
+            return None
+        return {
+            'id': message.id,
+            'sender_id': message.sender_id,
+            'preview': obj.preview,
+            'timestamp': serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%S.%fZ").to_representation(message.timestamp),
+            'is_read': obj.apply_read_state([message])[0].is_read,
+        }
+
+    def to_representation(self, obj):
+        data = ChatUserSerializer(obj.partner_of(self.context['request'].user.id)).data
+        data.update(super().to_representation(obj))
+        return data
\ No newline at end of file
@@ -0,0 +1,25 @@
+# backend/chat/signals.py
+# Keeps the chat identity cache (chat/identity.py) from serving stale emails.
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from users.models import UserProfile
+from .identity import identity_cache
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_identity(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: identity_cache.invalidate(user_id))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def forget_profile_identity(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: identity_cache.invalidate(user_id))
@@ -1,3 +1,109 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import UserProfile
+from .models import ChatMessage, Conversation
+from .pagination import encode_cursor, keyset_page
 
-# Create your tests here.
+User = get_user_model()
+
+
+class ConversationListQueryTests(TestCase):
+    """The conversation list reads the Conversation summaries: one query per page, whatever the number of rooms."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='pass', is_active=True)
+        UserProfile.objects.create(user=cls.user, full_name='Owner')
+
+    def add_conversations(self, count):
+        first = User.objects.count()
+        partners = User.objects.bulk_create([
+            User(email=f'partner{first + n}@example.com', password='!', is_active=True) for n in range(count)
+        ])
+        UserProfile.objects.bulk_create([UserProfile(user=partner, full_name=partner.email) for partner in partners])
+        for partner in partners:
+            low, high = sorted([self.user.id, partner.id])
+            for sender, recipient in ((partner, self.user), (self.user, partner)):
+                message = ChatMessage.objects.create(
+                    sender=sender, recipient=recipient, room_name=f'private_chat_{low}_{high}', content='hello ' * 50
+                )
+                Conversation.objects.record_message(message)
+
+    def fetch(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        return client.get(reverse('conversation-list'))
+
+    def test_query_count_does_not_grow_with_conversations(self):
+        self.add_conversations(3)
+        with self.assertNumQueries(1):
+            response = self.fetch()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+
+        self.add_conversations(15)
+        with self.assertNumQueries(1):
+            response = self.fetch()
+        self.assertEqual(len(response.data['results']), 18)
+
+    def test_rows_carry_partner_preview_and_unread_count(self):
+        self.add_conversations(1)
+        row = self.fetch().data['results'][0]
+        self.assertEqual(row['unread_count'], 1)
+        self.assertEqual(row['last_message']['sender_id'], self.user.id)
+        self.assertEqual(len(row['last_message']['preview']), 100)
+
+
+class KeysetPaginationTests(TestCase):
+    """Pages follow (timestamp, id), so messages sharing a timestamp are neither skipped nor repeated at a page boundary."""
+
+    @classmethod
+    def setUpTestData(cls):
+        sender = User.objects.create_user(email='sender@example.com', password='pass', is_active=True)
+        recipient = User.objects.create_user(email='recipient@example.com', password='pass', is_active=True)
+        cls.room = f'private_chat_{sender.id}_{recipient.id}'
+        ChatMessage.objects.bulk_create([
+            ChatMessage(sender=sender, recipient=recipient, room_name=cls.room, content=f'message {n}') for n in range(11)
+        ])
+        # three groups of messages sent in the same instant: 4 + 4 + 3
+        start = timezone.now()
+        ids = list(ChatMessage.objects.filter(room_name=cls.room).order_by('id').values_list('id', flat=True))
+        for group, first in enumerate(range(0, len(ids), 4)):
+            ChatMessage.objects.filter(id__in=ids[first:first + 4]).update(timestamp=start + timedelta(seconds=group))
+        cls.ids = ids
+
+    def messages(self):
+        return ChatMessage.objects.filter(room_name=self.room)
+
+    def test_walking_back_from_the_newest_page(self):
+        rows, has_older, has_newer = keyset_page(self.messages(), limit=3)
+        self.assertEqual([row.id for row in rows], self.ids[-3:])
+        self.assertFalse(has_newer)
+        seen = [row.id for row in rows]
+        while has_older:
+            rows, has_older, has_newer = keyset_page(self.messages(), before=encode_cursor(rows[0]), limit=3)
+            self.assertTrue(has_newer)
+            seen = [row.id for row in rows] + seen
+        self.assertEqual(seen, self.ids)
+
+    def test_walking_forward_from_the_oldest_message(self):
+        first = self.messages().order_by('timestamp', 'id').first()
+        seen = [first.id]
+        rows, has_older, has_newer = [first], False, True
+        while has_newer:
+            rows, has_older, has_newer = keyset_page(self.messages(), after=encode_cursor(rows[-1]), limit=3)
+            self.assertTrue(has_older)
+            seen += [row.id for row in rows]
+        self.assertEqual(seen, self.ids)
+
+    def test_cursor_inside_a_shared_timestamp(self):
+        # the cursor sits on the second of four messages with the same timestamp
+        cursor = encode_cursor(ChatMessage.objects.get(id=self.ids[5]))
+        older, _, _ = keyset_page(self.messages(), before=cursor, limit=2)
+        newer, _, _ = keyset_page(self.messages(), after=cursor, limit=2)
+        self.assertEqual([row.id for row in older], self.ids[3:5])
+        self.assertEqual([row.id for row in newer], self.ids[6:8])
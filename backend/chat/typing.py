@@ -0,0 +1,164 @@
+# backend/chat/typing.py
+# Server-side coalescing of typing indicators.
+#
+# Clients send typing_start/typing_stop at keystroke rate; only changes of state need to reach the
+# room. Per (room, sender) the coalescer
+#   - forwards the first typing_start and drops repeated ones,
+#   - holds a typing_stop back for CHAT_TYPING_STOP_DELAY_MS, so a stop followed by a new start
+#     (the user paused briefly) never leaves the server,
+#   - sends the stop itself when no frame arrived for CHAT_TYPING_TTL seconds (tab closed, client bug),
+#   - tracks which connections (channel names) of the sender are typing, so a stop or a disconnect of
+#     one tab says nothing while another tab of the same user in the room is still typing.
+# On top of that every connection has a token bucket (CHAT_TYPING_RATE frames/s, CHAT_TYPING_BURST).
+#
+# State and counters are per process and live on the event loop thread; tabs connected to different
+# processes are tracked separately.
+
+import asyncio
+import time
+from collections import Counter
+from django.conf import settings
+from .delivery import sequence
+from .protocol import encode_all
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def allow(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class _TypingState:
+    __slots__ = ('channel_layer', 'sender', 'channels', 'pending_stop', 'expiry')
+
+    def __init__(self, channel_layer, sender):
+        self.channel_layer = channel_layer
+        self.sender = sender       # {id, email} payload of the typing user
+        self.channels = set()      # their connections that are typing
+        self.pending_stop = None   # delayed typing_stop, cancelled if typing resumes
+        self.expiry = None
+
+    def cancel(self):
+        for handle in (self.pending_stop, self.expiry):
+            if handle is not None:
+                handle.cancel()
+
+
+class TypingCoalescer:
+    def __init__(self, stop_delay=1.0, ttl=6.0):
+        self.stop_delay = stop_delay
+        self.ttl = ttl
+        self.counters = Counter()  # received, fanned_out, redundant, debounced, expired, rate_limited
+        self._states = {}          # (group, sender id) -> _TypingState; present while the sender is "typing"
+        self._tasks = set()
+
+    def __len__(self):
+        return len(self._states)
+
+    def stats(self):
+        return {'active': len(self._states), **self.counters}
+
+    def update(self, channel_layer, group, sender, is_typing, limiter=None, channel=None):
+        """Feed one typing_start/typing_stop frame from `sender` ({id, email}) in `group`, sent by connection `channel`."""
+        self.counters['received'] += 1
+        if limiter is not None and not limiter.allow():
+            self.counters['rate_limited'] += 1
+            return
+        key = (group, sender['id'])
+        state = self._states.get(key)
+        loop = asyncio.get_running_loop()
+
+        if is_typing:
+            if state is None:
+                state = self._states[key] = _TypingState(channel_layer, sender)
+                state.channels.add(channel)
+                self._fan_out(state, group, True)
+            else:
+                state.channels.add(channel)
+                if state.pending_stop is not None:
+                    # stopped and started again within the delay: the room never hears about the pause
+                    state.pending_stop.cancel()
+                    state.pending_stop = None
+                    self.counters['debounced'] += 1
+                else:
+                    self.counters['redundant'] += 1
+            if state.expiry is not None:
+                state.expiry.cancel()
+            state.expiry = loop.call_later(self.ttl, self._expire, key)
+        elif state is None or channel not in state.channels:
+            self.counters['redundant'] += 1
+        else:
+            state.channels.discard(channel)
+            if state.channels:
+                self.counters['redundant'] += 1  # still typing in another tab
+            else:
+                state.pending_stop = loop.call_later(self.stop_delay, self._stop, key)
+
+    def reset(self, group, sender_id, channel=None, notify=False):
+        # A sent message ends the typing state of every tab (clients clear the indicator themselves).
+        # A disconnect passes its channel and notifies, but only once no other tab is still typing.
+        key = (group, sender_id)
+        state = self._states.get(key)
+        if state is None:
+            return
+        if channel is not None:
+            state.channels.discard(channel)
+            if state.channels:
+                return
+        del self._states[key]
+        state.cancel()
+        if notify:
+            self._fan_out(state, group, False)
+
+    def _stop(self, key):
+        state = self._states.pop(key, None)
+        if state is not None:
+            state.cancel()
+            self._fan_out(state, key[0], False)
+
+    def _expire(self, key):
+        if key in self._states:
+            self.counters['expired'] += 1
+            self._stop(key)
+
+    def _fan_out(self, state, group, is_typing):
+        self.counters['fanned_out'] += 1
+        task = asyncio.get_running_loop().create_task(self._send(state.channel_layer, group, {
+            'type': 'typing_status',
+            'sender_id': state.sender['id'],
+            'sender_email': state.sender['email'],
+            'is_typing': is_typing,
+        }))
+        self._tasks.add(task)  # keep a reference until the send is done
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _send(channel_layer, group, frame):
+        frame = await sequence(group, frame)
+        await channel_layer.group_send(
+            group,
+            {
+                'type': 'typing_status',
+                'sender_id': frame['sender_id'],  # receivers skip their own
+                'frames': encode_all(frame),
+            }
+        )
+
+
+typing_coalescer = TypingCoalescer(
+    stop_delay=getattr(settings, 'CHAT_TYPING_STOP_DELAY_MS', 1000) / 1000,
+    ttl=getattr(settings, 'CHAT_TYPING_TTL', 6),
+)
@@ -1,11 +1,15 @@
 # backend/chat/urls.py
 
 from django.urls import path
-from .views import ConversationListView, MessageHistoryView, MarkMessagesAsReadView
+from .views import ConversationListView, MessageHistoryView, MarkMessagesAsReadView, MessageSearchView, PresenceView, TypingStatsView, UnreadCountView
 
 urlpatterns = [
     path('conversations/', ConversationListView.as_view(), name='conversation-list'),
+    path('unread-count/', UnreadCountView.as_view(), name='unread-count'),
     path('history/<str:room_name>/', MessageHistoryView.as_view(), name='message-history'),     
     path('read/<str:room_name>/', MarkMessagesAsReadView.as_view(), name='mark-messages-as-read'), # <--- NEW URL
+    path('search/', MessageSearchView.as_view(), name='message-search'),
+    path('presence/', PresenceView.as_view(), name='presence'),
+    path('typing-stats/', TypingStatsView.as_view(), name='typing-stats'),
 
 ]
\ No newline at end of file
@@ -3,69 +3,68 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
 from django.contrib.auth import get_user_model
-from django.db.models import Q, Max # Import Max for ordering
-from django.utils import timezone # For handling potential None timestamps
-from .models import ChatMessage
-from .serializers import ChatUserSerializer, MessageSerializer
+from django.db.models import Case, F, Q, Sum, When
+from django.db.models.functions import Left
+from .models import Conversation
+from .archive import room_history
+from .delivery import sequence_sync
+from .pagination import ConversationCursorPagination, encode_cursor
+from .serializers import ChatUserSerializer, CompactMessageSerializer, ConversationSerializer
+from .presence import presence
+from .protocol import encode_all
+from .search import search_messages
+from .typing import typing_coalescer
+import redis
 
 User = get_user_model()
 
 class ConversationListView(APIView):
     permission_classes = [IsAuthenticated]
+    preview_length = 100
 
     def get(self, request, *args, **kwargs):
-        current_user = request.user
-
-        # Get IDs of all users current_user has exchanged messages with
-        # This covers both messages sent by current_user and messages received by current_user
-
-        # Get IDs of recipients of messages sent by current_user
-        recipients_of_my_messages = ChatMessage.objects.filter(
-            sender=current_user
-        ).values_list('recipient_id', flat=True)
-
-        # Get IDs of senders of messages received by current_user
-        senders_to_me = ChatMessage.objects.filter(
-            recipient=current_user
-        ).values_list('sender_id', flat=True)
-
-        # Combine all unique partner IDs using a Python set
-        all_partner_ids = set(list(recipients_of_my_messages) + list(senders_to_me))
-
-        # Filter out the current user's own ID from the set of partners
-        partner_ids_final = [uid for uid in all_partner_ids if uid != current_user.id]
-
-        # Fetch the actual User objects for these partners
-        conversation_partners = User.objects.filter(id__in=partner_ids_final)
-
-        # Annotate each partner with the timestamp of the latest message in their conversation
-        annotated_partners = []
-        for partner in conversation_partners:
-            # Find the latest message between current_user and this partner
-            latest_message = ChatMessage.objects.filter(
-                (Q(sender=current_user, recipient=partner) | Q(sender=partner, recipient=current_user))
-            ).order_by('-timestamp').first()
-
-            if latest_message:
-                partner.latest_message_time = latest_message.timestamp
-                annotated_partners.append(partner)
-
-        # Sort the partners by their latest message time, most recent first
-        # Handle cases where latest_message_time might be None (though it shouldn't be if latest_message exists)
-        sorted_partners = sorted(
-            annotated_partners,
-            key=lambda p: p.latest_message_time if hasattr(p, 'latest_message_time') and p.latest_message_time else timezone.datetime.min.replace(tzinfo=timezone.utc),
-            reverse=True
+        # Read straight from the Conversation summaries (kept current by ChatConsumer), one query per page
+        conversations = (
+            Conversation.objects.for_user(request.user)
+            .filter(last_message__isnull=False)
+            .select_related(
+                'participant_one__user_profile',
+                'participant_two__user_profile',
+                'last_message',
+            )
+            .annotate(preview=Left('last_message__content', self.preview_length))
+            .defer('last_message__content')
         )
 
-        serializer = ChatUserSerializer(sorted_partners, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = ConversationCursorPagination()
+        page = paginator.paginate_queryset(conversations, request, view=self)
+        serializer = ConversationSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+
+class UnreadCountView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        # Badge total: sum of the caller's per-conversation counters, no message scan
+        user_id = request.user.id
+        totals = Conversation.objects.for_user(request.user).aggregate(
+            unread=Sum(Case(
+                When(participant_one_id=user_id, then=F('unread_one')),
+                default=F('unread_two'),
+            ))
+        )
+        return Response({"unread_count": totals['unread'] or 0}, status=status.HTTP_200_OK)
     
 
 class MessageHistoryView(APIView):
     permission_classes = [IsAuthenticated]
+    default_limit = 50
+    max_limit = 200
 
     def get(self, request, room_name, *args, **kwargs):
         current_user = request.user
@@ -85,15 +84,81 @@ class MessageHistoryView(APIView):
         if current_user.id not in [user1_id, user2_id]:
             return Response({"detail": "You are not authorized to view this chat history."}, status=status.HTTP_403_FORBIDDEN)
 
-        # Fetch messages for this room, ordered by timestamp
-        messages = ChatMessage.objects.filter(
-            room_name=room_name
-        ).order_by('timestamp') # Order by timestamp ascending for history display
+        conversation = Conversation.objects.filter(room_name=room_name).first()
 
-        serializer = MessageSerializer(messages, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', self.default_limit)), self.max_limit))
+            # hot table only, unless the room has messages in the archive tier
+            messages, has_older, has_newer = room_history(
+                room_name,
+                archived_through=conversation.archived_through if conversation else None,
+                before=request.query_params.get('before'),
+                after=request.query_params.get('after'),
+                limit=limit,
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # is_read/read_at come from the participants' read watermarks
+        if conversation is not None:
+            conversation.apply_read_state(messages)
+
+        # Both profiles once in a header block; messages only carry user ids
+        participants = User.objects.filter(id__in=[user1_id, user2_id]).select_related('user_profile')
+
+        return Response({
+            "participants": {str(user.id): ChatUserSerializer(user).data for user in participants},
+            "messages": CompactMessageSerializer(messages, many=True).data,
+            "has_older": has_older,
+            "has_newer": has_newer,
+            "before": encode_cursor(messages[0]) if messages else None,
+            "after": encode_cursor(messages[-1]) if messages else None,
+        }, status=status.HTTP_200_OK)
     
 
+class MessageSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+    default_limit = 20
+    max_limit = 50
+    max_query_length = 200
+
+    def get(self, request, *args, **kwargs):
+        # GET chat/search/?q=...&room=...&cursor=... -> best matches first across the caller's rooms
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({"detail": "Query parameter 'q' is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(text) > self.max_query_length:
+            return Response({"detail": f"Search queries are limited to {self.max_query_length} characters."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', self.default_limit)), self.max_limit))
+            messages, next_cursor = search_messages(
+                request.user,
+                text,
+                room_name=request.query_params.get('room'),
+                cursor=request.query_params.get('cursor'),
+                limit=limit,
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "results": [
+                {
+                    "id": message.id,
+                    "room_name": message.room_name,
+                    "sender_id": message.sender_id,
+                    "recipient_id": message.recipient_id,
+                    "timestamp": message.timestamp.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+                    "headline": message.headline,
+                    "rank": message.rank,
+                }
+                for message in messages
+            ],
+            "next": next_cursor,
+        }, status=status.HTTP_200_OK)
+
+
 # NEW API VIEW: MarkMessagesAsReadView
 class MarkMessagesAsReadView(APIView):
     permission_classes = [IsAuthenticated]
@@ -116,24 +181,62 @@ class MarkMessagesAsReadView(APIView):
         if current_user.id not in [user1_id, user2_id]:
             return Response({"detail": "You are not authorized to mark messages in this chat."}, status=status.HTTP_403_FORBIDDEN)
 
-        # Get messages in this room that were sent TO the current user AND are not yet read
-        # This ensures a user can only mark messages as read that they received.
-        unread_messages_to_current_user = ChatMessage.objects.filter(
-            room_name=room_name,
-            recipient=current_user,
-            is_read=False
-        )
+        # Move the current user's read watermark up to the room's last message; a user can only
+        # read what was sent to them, and no ChatMessage rows are rewritten
+        updated_count, conversation = Conversation.objects.mark_read(room_name, current_user.id)
+
+        if updated_count:
+            # Same single receipt the ChatConsumer sends on connect, so an open chat updates its ticks
+            last_read_id, _, read_at = conversation.read_watermark(current_user.id)
+            frame = sequence_sync(f"chat_{room_name}", {
+                'type': 'message_read_status',
+                'reader_id': current_user.id,
+                'reader_email': current_user.email,
+                'room_name': room_name,
+                'last_read_message_id': last_read_id,
+                'timestamp': read_at.isoformat(),
+            })
+            async_to_sync(get_channel_layer().group_send)(
+                f"chat_{room_name}",
+                {'type': 'message_read_status', 'frames': encode_all(frame)}
+            )
 
-        # Update these messages
-        updated_count = unread_messages_to_current_user.update(
-            is_read=True,
-            read_at=timezone.now() # Set the read timestamp
-        )
+        return Response({"message": f"Marked {updated_count} messages as read."}, status=status.HTTP_200_OK)
 
-        # Optional: Broadcast a message read event via Channels
-        # To do this, you'd need to send a message to the channel layer
-        # which would then be picked up by the sender's consumer.
-        # We will implement this in the ChatConsumer update step.
 
-        return Response({"message": f"Marked {updated_count} messages as read."}, status=status.HTTP_200_OK)
+class PresenceView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_ids = 100
 
+    def get(self, request, *args, **kwargs):
+        # GET chat/presence/?user_ids=3,7,12 -> online flag and last-seen per conversation partner, one Redis round trip
+        try:
+            user_ids = [int(user_id) for user_id in request.query_params.get('user_ids', '').split(',') if user_id.strip()]
+        except ValueError:
+            return Response({"error": "user_ids must be a comma separated list of ids."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(user_ids) > self.max_ids:
+            return Response({"error": f"At most {self.max_ids} user ids per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # only people the caller has a conversation with; other ids are dropped without saying so
+        partners = set()
+        for one, two in Conversation.objects.for_user(request.user).filter(
+            Q(participant_one_id__in=user_ids) | Q(participant_two_id__in=user_ids)
+        ).values_list('participant_one_id', 'participant_two_id'):
+            partners.add(two if one == request.user.id else one)
+        user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id in partners]
+        if not user_ids:
+            return Response({"presence": {}}, status=status.HTTP_200_OK)
+
+        try:
+            states = presence.bulk(user_ids)
+        except redis.RedisError:
+            return Response({"error": "Presence is unavailable."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({"presence": {str(user_id): state for user_id, state in states.items()}}, status=status.HTTP_200_OK)
+
+
+class TypingStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        # typing frames received vs. group_sends made by this process, see chat/typing.py
+        return Response(typing_coalescer.stats(), status=status.HTTP_200_OK)
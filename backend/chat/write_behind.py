@@ -0,0 +1,269 @@
+# backend/chat/write_behind.py
+# Optional write-behind persistence for chat messages (CHAT_WRITE_BEHIND = True).
+#
+# A message gets its primary key (reserved in blocks from the ChatMessage id sequence) and its
+# timestamp as soon as it arrives, is broadcast straight away, and is saved later together with
+# other messages in one bulk_create. The buffer is flushed once it holds CHAT_WRITE_BEHIND_BATCH_SIZE
+# messages or CHAT_WRITE_BEHIND_FLUSH_MS after the oldest buffered message, and one last time when
+# the process exits normally (SIGTERM/SIGINT from daphne/uvicorn included).
+#
+# With CHAT_WRITE_BEHIND_AT_LEAST_ONCE every message is also appended to a per-process journal file
+# before it is broadcast, and the journal is rewritten after every successful flush. Journals left
+# behind by a process that died (kill -9, OOM) are replayed on the next startup; ids were assigned up
+# front, so messages that had in fact been saved are recognised and skipped.
+
+import asyncio
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DataError, IntegrityError, connection, transaction
+from django.utils import timezone
+from .db import chat_db
+from .models import ChatMessage, Conversation
+from .search import search_document
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_ATTEMPTS = 3
+
+
+class MessageWriteBuffer:
+    def __init__(self, batch_size=100, flush_interval=0.2, at_least_once=False, journal_dir=None):
+        if at_least_once and fcntl is None:
+            raise ImproperlyConfigured("CHAT_WRITE_BEHIND_AT_LEAST_ONCE needs fcntl file locks (POSIX only).")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.at_least_once = at_least_once
+        self.journal_dir = journal_dir
+        self._lock = threading.Lock()
+        self._pending = []
+        self._ids = deque()        # primary keys reserved from the sequence, not used yet
+        self._attempts = 0         # consecutive failed flushes of the head of the buffer
+        self._loop = None
+        self._timer = None
+        self._flush_task = None
+        self._journal = None
+        atexit.register(self.close)
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            batch_size=getattr(settings, 'CHAT_WRITE_BEHIND_BATCH_SIZE', 100),
+            flush_interval=getattr(settings, 'CHAT_WRITE_BEHIND_FLUSH_MS', 200) / 1000,
+            at_least_once=getattr(settings, 'CHAT_WRITE_BEHIND_AT_LEAST_ONCE', False),
+            journal_dir=getattr(settings, 'CHAT_WRITE_BEHIND_JOURNAL_DIR', None),
+        )
+
+    def __len__(self):
+        return len(self._pending)
+
+    # ------------------------------
+    # Buffering
+    # ------------------------------
+    @chat_db
+    def _reserve_ids(self):
+        # one round trip per batch_size messages instead of one INSERT per message
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [ChatMessage._meta.db_table, self.batch_size],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    async def add(self, sender, recipient, room_name, content):
+        """Returns the unsaved ChatMessage, with id and timestamp already set, ready to broadcast."""
+        while not self._ids:
+            self._ids.extend(await self._reserve_ids())
+
+        message = ChatMessage(
+            id=self._ids.popleft(),
+            sender=sender,
+            recipient=recipient,
+            room_name=room_name,
+            content=content,
+            timestamp=timezone.now(),
+        )
+        with self._lock:
+            if self.at_least_once:
+                self._journal_append([message])
+            self._pending.append(message)
+            size = len(self._pending)
+
+        self._loop = asyncio.get_running_loop()
+        if size >= self.batch_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(self.flush_interval, self._start_flush)
+        return message
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = self._loop.create_task(self.flush())
+
+    async def flush(self):
+        while True:
+            with self._lock:
+                batch = self._pending[:self.batch_size]
+            if not batch or not await chat_db(self._write)(batch):
+                break
+            with self._lock:
+                if len(self._pending) < self.batch_size:
+                    break
+
+        if self._pending and self._timer is None:
+            self._timer = self._loop.call_later(self.flush_interval, self._start_flush)
+
+    # ------------------------------
+    # Writing
+    # ------------------------------
+    def _write(self, batch, skip_saved=False):
+        for message in batch:
+            message.search_vector = search_document(message.content)
+        try:
+            with transaction.atomic():
+                if skip_saved:
+                    saved = set(ChatMessage.objects.filter(id__in=[m.id for m in batch]).values_list('id', flat=True))
+                    batch = [message for message in batch if message.id not in saved]
+                ChatMessage.objects.bulk_create(batch)
+                Conversation.objects.record_messages(batch)
+        except Exception as e:
+            self._attempts += 1
+            if self._attempts < MAX_BATCH_ATTEMPTS:
+                logger.warning(f"Chat write-behind flush of {len(batch)} messages failed (attempt {self._attempts}), will retry: {e}")
+                return False
+            # a bad row (e.g. a user deleted meanwhile) must not block the buffer forever
+            logger.exception(f"Chat write-behind flush failed {self._attempts} times, saving messages one by one.")
+            done = self._write_one_by_one(batch)
+            complete = len(done) == len(batch)
+            batch = done
+        else:
+            complete = True
+
+        self._attempts = 0
+        with self._lock:
+            written = {id(message) for message in batch}
+            self._pending = [message for message in self._pending if id(message) not in written]
+            if self.at_least_once:
+                self._journal_rewrite()
+        return complete
+
+    def _write_one_by_one(self, batch):
+        # returns the messages that are done with: saved, or rejected by the database for good.
+        # anything else (database unreachable, ...) stays buffered, and journaled in at-least-once mode
+        done = []
+        for message in batch:
+            try:
+                with transaction.atomic():
+                    ChatMessage.objects.bulk_create([message])
+                    Conversation.objects.record_messages([message])
+            except (IntegrityError, DataError) as e:
+                logger.error(f"Dropping chat message {message.id} in {message.room_name}: {e}")
+            except Exception:
+                continue
+            done.append(message)
+        return done
+
+    def close(self):
+        # graceful shutdown: runs at interpreter exit, after the event loop is gone
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            remaining = len(self._pending)
+            self._write(self._pending[:self.batch_size])
+            if len(self._pending) == remaining and self._attempts == 0:
+                break  # gave up on the database; the journal, if any, still has them
+        if self._journal is not None and not self._pending:
+            path = self._journal.name
+            self._journal.close()
+            self._journal = None
+            os.remove(path)
+
+    # ------------------------------
+    # Journal (at-least-once mode)
+    # ------------------------------
+    @staticmethod
+    def _encode(message):
+        return json.dumps({
+            'id': message.id,
+            'sender_id': message.sender_id,
+            'recipient_id': message.recipient_id,
+            'room_name': message.room_name,
+            'content': message.content,
+            'timestamp': message.timestamp.isoformat(),
+        }) + '\n'
+
+    @staticmethod
+    def _decode(line):
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            return None  # torn last line: the process died mid-write, before that message was broadcast
+        data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+        return ChatMessage(**data)
+
+    def _open_journal(self):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        path = os.path.join(self.journal_dir, f"chat-{os.getpid()}-{uuid.uuid4().hex[:8]}.journal")
+        journal = open(path, 'w', encoding='utf-8')
+        # held until the process exits, so recover() can tell live journals from orphaned ones
+        fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return journal
+
+    def _journal_append(self, messages):
+        if self._journal is None:
+            self._journal = self._open_journal()
+        self._journal.write(''.join(self._encode(message) for message in messages))
+        self._journal.flush()  # in the OS page cache: survives the process, not the machine
+
+    def _journal_rewrite(self):
+        if self._journal is None:
+            return
+        self._journal.seek(0)
+        self._journal.truncate()
+        self._journal_append(self._pending)
+
+    def recover(self):
+        """Replay journals of processes that died with unsaved messages. Called once at startup."""
+        if not self.at_least_once:
+            return 0
+        recovered = 0
+        for path in glob.glob(os.path.join(self.journal_dir, 'chat-*.journal')):
+            with open(path, encoding='utf-8') as journal:
+                try:
+                    fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # the owning process is still running
+                messages = [message for message in map(self._decode, journal) if message is not None]
+                replayed = all(
+                    self._write(messages[start:start + self.batch_size], skip_saved=True)
+                    for start in range(0, len(messages), self.batch_size)
+                )
+            self._attempts = 0
+            if not replayed:
+                logger.warning(f"Could not replay chat journal {path}, keeping it for the next start.")
+                continue
+            recovered += len(messages)
+            os.remove(path)
+        if recovered:
+            logger.info(f"Replayed {recovered} journaled chat messages from write-behind journals.")
+        return recovered
+
+
+message_buffer = MessageWriteBuffer.from_settings()
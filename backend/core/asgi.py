@@ -13,7 +13,6 @@ import os
 import django # <--- RE-ADD THIS IMPORT
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
 from . import routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
@@ -26,9 +25,20 @@ django.setup() # <--- RE-ADD THIS CALL
 # is populated before importing code that may import ORM models.
 django_asgi_app = get_asgi_application()
 
+# build the category autocomplete index before the first request hits it
+from courses.suggestions import suggestion_index
+suggestion_index.warm_up()
+
+# save chat messages a crashed worker had accepted but not written yet (CHAT_WRITE_BEHIND_AT_LEAST_ONCE)
+from chat.write_behind import message_buffer
+message_buffer.recover()
+
+# websockets authenticate with the access_token cookie, without sessions (see chat/auth.py)
+from chat.auth import JWTCookieAuthMiddlewareStack
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
-    "websocket": AuthMiddlewareStack(
+    "websocket": JWTCookieAuthMiddlewareStack(
         URLRouter(
             routing.websocket_urlpatterns
         )
@@ -154,6 +154,52 @@ CHANNEL_LAYERS = {
     },
 }
 
+# threads the async chat consumers may use for DB work at once (see chat/db.py)
+CHAT_DB_THREADS = config('CHAT_DB_THREADS', default=8, cast=int)
+
+# WebRTC signaling: forward SDP/ICE frames straight to the other peer, ICE candidates batched (see chat/consumers.py)
+SIGNALING_DIRECT_RELAY = config('SIGNALING_DIRECT_RELAY', default=True, cast=bool)
+SIGNALING_ICE_BATCH_MS = config('SIGNALING_ICE_BATCH_MS', default=10, cast=int)
+
+# queue the Stripe capture of a session's held payment as soon as a call ends with end-session
+SESSION_CAPTURE_ON_COMPLETE = config('SESSION_CAPTURE_ON_COMPLETE', default=False, cast=bool)
+
+# how far ahead recurring availability rules are expanded into slots (see mentorship/recurring.py)
+MENTOR_AVAILABILITY_HORIZON_DAYS = config('MENTOR_AVAILABILITY_HORIZON_DAYS', default=90, cast=int)
+
+# per-process cache of the {id, email} payloads the chat consumers broadcast (see chat/identity.py)
+CHAT_IDENTITY_CACHE_SIZE = config('CHAT_IDENTITY_CACHE_SIZE', default=10000, cast=int)
+CHAT_IDENTITY_CACHE_TTL = config('CHAT_IDENTITY_CACHE_TTL', default=300, cast=int)
+
+# online/last-seen tracking in the channel layer's Redis (see chat/presence.py)
+CHAT_PRESENCE = config('CHAT_PRESENCE', default=True, cast=bool)
+CHAT_PRESENCE_HEARTBEAT = config('CHAT_PRESENCE_HEARTBEAT', default=25, cast=int)
+CHAT_PRESENCE_TTL = config('CHAT_PRESENCE_TTL', default=60, cast=int)
+
+# typing indicator coalescing and per-connection rate limit (see chat/typing.py)
+CHAT_TYPING_STOP_DELAY_MS = config('CHAT_TYPING_STOP_DELAY_MS', default=1000, cast=int)
+CHAT_TYPING_TTL = config('CHAT_TYPING_TTL', default=6, cast=int)
+CHAT_TYPING_RATE = config('CHAT_TYPING_RATE', default=5, cast=float)
+CHAT_TYPING_BURST = config('CHAT_TYPING_BURST', default=10, cast=int)
+
+# write-behind persistence of chat messages (see chat/write_behind.py)
+CHAT_WRITE_BEHIND = config('CHAT_WRITE_BEHIND', default=False, cast=bool)
+CHAT_WRITE_BEHIND_BATCH_SIZE = config('CHAT_WRITE_BEHIND_BATCH_SIZE', default=100, cast=int)
+CHAT_WRITE_BEHIND_FLUSH_MS = config('CHAT_WRITE_BEHIND_FLUSH_MS', default=200, cast=int)
+CHAT_WRITE_BEHIND_AT_LEAST_ONCE = config('CHAT_WRITE_BEHIND_AT_LEAST_ONCE', default=False, cast=bool)
+CHAT_WRITE_BEHIND_JOURNAL_DIR = config('CHAT_WRITE_BEHIND_JOURNAL_DIR', default=str(BASE_DIR / 'chat_journal'))
+
+# text search configuration of ChatMessage.search_vector (see chat/search.py); changing it means re-running backfill_search_vectors --all
+CHAT_SEARCH_CONFIG = config('CHAT_SEARCH_CONFIG', default='english')
+
+# whole calendar months older than this are moved to the chat archive table by archive_chat_messages
+CHAT_HOT_MONTHS = config('CHAT_HOT_MONTHS', default=6, cast=int)
+
+# per-room sequence numbers and a capped Redis stream of recent chat frames, for resuming after a reconnect (see chat/delivery.py)
+CHAT_DELIVERY_LOG = config('CHAT_DELIVERY_LOG', default=True, cast=bool)
+CHAT_STREAM_MAXLEN = config('CHAT_STREAM_MAXLEN', default=500, cast=int)
+CHAT_STREAM_TTL = config('CHAT_STREAM_TTL', default=86400, cast=int)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -243,6 +289,10 @@ CORS_ALLOW_HEADERS = [
 ]
 
 
+# prebuilt category suggestion index (python manage.py build_category_index), mmap'ed by every worker at startup
+CATEGORY_INDEX_PATH = config('CATEGORY_INDEX_PATH', default='')
+
+
 # loggin config
 from .logging_config import LOGGING
 
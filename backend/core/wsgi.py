@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# build the category autocomplete index before the first request hits it
+from courses.suggestions import suggestion_index
+suggestion_index.warm_up()
@@ -0,0 +1,129 @@
+# courses/fuzzy.py
+# Typo tolerant prefix search ("pyhton", "data sceince") over the category tries.
+#
+# The trie is walked depth first while a lazily built Levenshtein automaton for the query tracks the
+# edit distance (optimal string alignment, so a swapped pair of letters costs 1). Automaton states are
+# the last two rows of the distance table capped at max_distance + 1, so every (state, char) transition
+# is computed once and then reused by the rest of the walk. A branch is dropped as soon as its state
+# can no longer get back within max_distance.
+
+import heapq
+import time
+
+
+def default_max_distance(query):
+    # short queries match almost anything with a couple of edits, so scale the tolerance with length
+    if len(query) <= 2:
+        return 0
+    if len(query) <= 5:
+        return 1
+    return 2
+
+
+class LevenshteinAutomaton:
+    """
+    States are numbered as they are discovered. `distances[state]` is the distance between the query
+    and the prefix read so far; step() returns the next state or None when nothing under the prefix
+    can match any more.
+    """
+
+    def __init__(self, query, max_distance):
+        self.query = query
+        self.max_distance = max_distance
+        self.cap = max_distance + 1
+        self._rows = []         # state -> (previous row, row, previous char)
+        self._ids = {}
+        self._transitions = []  # state -> {char: next state}
+        self.distances = []
+        self.floors = []        # state -> lowest distance any longer prefix can still reach
+        self.start = self._state_id(None, tuple(min(j, self.cap) for j in range(len(query) + 1)), None)
+
+    def _state_id(self, before, row, prev_char):
+        key = (before, row, prev_char)
+        state = self._ids.get(key)
+        if state is None:
+            state = self._ids[key] = len(self._rows)
+            self._rows.append(key)
+            self._transitions.append({})
+            self.distances.append(row[-1])
+            self.floors.append(min(row))
+        return state
+
+    def step(self, state, char):
+        transitions = self._transitions[state]
+        if char in transitions:
+            return transitions[char]
+
+        before, row, prev_char = self._rows[state]
+        query, cap = self.query, self.cap
+        new = [min(row[0] + 1, cap)]
+        for j in range(1, len(query) + 1):
+            qc = query[j - 1]
+            cost = min(new[j - 1] + 1, row[j] + 1, row[j - 1] + (qc != char))
+            if j > 1 and before is not None and qc == prev_char and query[j - 2] == char:
+                cost = min(cost, before[j - 2] + 1)
+            new.append(min(cost, cap))
+
+        if min(new) > self.max_distance:
+            next_state = None
+        else:
+            # the previous row/char only matter for transpositions, drop them when none is possible
+            keep = char in query
+            next_state = self._state_id(row if keep else None, tuple(new), char if keep else None)
+        transitions[char] = next_state
+        return next_state
+
+
+def fuzzy_search(root, query, edges, top, max_distance, limit, budget_ms=None):
+    """
+    edges(node) yields (label, child) pairs, top(node) returns the node's ranked (word, count) pairs.
+    Returns up to `limit` words ordered by (distance, popularity, word). Branches are explored best
+    first, so when `budget_ms` runs out the matches found so far are the closest ones.
+    """
+    automaton = LevenshteinAutomaton(query, max_distance)
+    deadline = time.perf_counter() + budget_ms / 1000 if budget_ms else None
+    best = {}  # word -> (distance, -count)
+
+    def collect(node, distance):
+        # the query is within reach of this prefix, so everything ranked under it is a candidate
+        for word, count in top(node)[:limit]:
+            key = (distance, -count)
+            if word not in best or key < best[word]:
+                best[word] = key
+
+    distances, floors = automaton.distances, automaton.floors
+    transitions, step = automaton._transitions, automaton.step
+    if distances[automaton.start] <= max_distance:
+        collect(root, distances[automaton.start])
+
+    # ordered by (floor, -depth, insertion order): closest branches first, deepest first among equals
+    queue = [(0, 0, 0, root, automaton.start)]
+    visited = 0
+    current_floor = 0
+    while queue:
+        floor, depth, _, node, state = heapq.heappop(queue)
+
+        if deadline and time.perf_counter() > deadline:
+            break
+        if floor > current_floor:
+            # nothing left in the queue can beat a full page of closer matches
+            current_floor = floor
+            if len(best) >= limit and sorted(distance for distance, _ in best.values())[limit - 1] < floor:
+                break
+
+        for label, child in edges(node):
+            child_state = state
+            for char in label:
+                # cached transitions are looked up inline, step() only runs for unseen ones
+                next_state = transitions[child_state].get(char, -1)
+                child_state = step(child_state, char) if next_state == -1 else next_state
+                if child_state is None:
+                    break
+                if distances[child_state] <= max_distance:
+                    collect(child, distances[child_state])
+            else:
+                visited += 1
+                heapq.heappush(queue, (floors[child_state], depth - len(label), visited, child, child_state))
+
+    ranked = sorted(best.items(), key=lambda item: (item[1], item[0]))
+    return [word for word, _ in ranked[:limit]]
@@ -0,0 +1,64 @@
+# courses/management/commands/bench_category_fuzzy.py
+# python manage.py bench_category_fuzzy --sizes 10000 100000
+
+import random
+import time
+from django.core.management.base import BaseCommand
+from courses.fuzzy import default_max_distance
+from courses.packed_trie import PackedCategoryTrie
+from courses.trie import CategoryTrie
+from .bench_category_suggestions import synthetic_categories
+
+
+def misspell(word, rng):
+    # one random edit: swap, drop, double or replace a letter
+    if len(word) < 3:
+        return word
+    i = rng.randrange(len(word) - 1)
+    edit = rng.choice(('swap', 'drop', 'double', 'replace'))
+    if edit == 'swap':
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if edit == 'drop':
+        return word[:i] + word[i + 1:]
+    if edit == 'double':
+        return word[:i] + word[i] + word[i:]
+    return word[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[i + 1:]
+
+
+class Command(BaseCommand):
+    help = "Measure typo tolerant category suggestion latency and hit rate."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000])
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--budget-ms', type=float, default=5)
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            rng = random.Random(size)
+            names = synthetic_categories(size)
+            trie = CategoryTrie.from_items((name, rng.randint(0, 500)) for name in names)
+            packed = PackedCategoryTrie.from_trie(trie)
+
+            samples = []
+            for _ in range(options['queries']):
+                name = rng.choice(names)
+                typed = name[:rng.randint(4, max(4, len(name)))]
+                samples.append((name, misspell(typed, rng)))
+
+            for label, index in (('trie', trie), ('packed', packed)):
+                for budget in (None, options['budget_ms']):
+                    timings, hits = [], 0
+                    for name, query in samples:
+                        start = time.perf_counter()
+                        found = index.fuzzy_starts_with(query, default_max_distance(query), options['limit'], budget)
+                        timings.append((time.perf_counter() - start) * 1000)
+                        hits += name in found
+                    timings.sort()
+                    p50 = timings[len(timings) // 2]
+                    p95 = timings[int(len(timings) * 0.95) - 1]
+                    self.stdout.write(
+                        f"{size:>8} categories | {label:>6} | budget {str(budget or '-'):>4} ms | "
+                        f"p50 {p50:7.2f} ms | p95 {p95:7.2f} ms | intended category found {hits * 100 / len(samples):5.1f}%"
+                    )
@@ -0,0 +1,57 @@
+# courses/management/commands/bench_category_suggestions.py
+# python manage.py bench_category_suggestions --sizes 10000 100000
+
+import random
+import string
+import time
+from django.core.management.base import BaseCommand
+from courses.trie import CategoryTrie
+from courses.suggestions import CategorySuggestionIndex
+
+
+def synthetic_categories(count, seed=42):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(rng.randint(1, 3))]
+        names.add(' '.join(words))
+    return list(names)
+
+
+class Command(BaseCommand):
+    help = "Compare per-request trie rebuild with the persistent category suggestion index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000])
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=10)
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            names = synthetic_categories(size)
+            rng = random.Random(size)
+            items = [(name, rng.randint(0, 500)) for name in names]
+            prefixes = [rng.choice(names)[:rng.randint(1, 3)] for _ in range(options['queries'])]
+
+            # old behaviour: a brand new trie for every request (DB fetch not included)
+            rebuild_runs = min(len(prefixes), 5)
+            start = time.perf_counter()
+            for prefix in prefixes[:rebuild_runs]:
+                trie = CategoryTrie.from_items(items)
+                trie.starts_with(prefix, limit=options['limit'])
+            rebuild_ms = (time.perf_counter() - start) * 1000 / rebuild_runs
+
+            index = CategorySuggestionIndex()
+            start = time.perf_counter()
+            index.build(items)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            for prefix in prefixes:
+                index.suggest(prefix, limit=options['limit'])
+            index_ms = (time.perf_counter() - start) * 1000 / len(prefixes)
+
+            self.stdout.write(
+                f"{size:>8} categories | rebuild per request: {rebuild_ms:9.2f} ms | "
+                f"index build (once): {build_ms:9.2f} ms | index query: {index_ms:7.3f} ms"
+            )
@@ -0,0 +1,67 @@
+# courses/management/commands/bench_category_trie_memory.py
+# python manage.py bench_category_trie_memory --sizes 10000 100000
+
+import os
+import tempfile
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from courses.packed_trie import PackedCategoryTrie
+from courses.trie import CategoryTrie
+from .bench_category_suggestions import synthetic_categories
+
+
+class _DictTrieNode:
+    # the node layout before __slots__, kept here only for comparison
+    def __init__(self):
+        self.children = {}
+        self.is_end = False
+        self.word = None
+        self.count = 0
+        self.top = []
+
+
+def _dict_copy(node):
+    copy = _DictTrieNode()
+    copy.is_end, copy.word, copy.count, copy.top = node.is_end, node.word, node.count, list(node.top)
+    copy.children = {char: _dict_copy(child) for char, child in node.children.items()}
+    return copy
+
+
+def _measure(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size / (1024 * 1024)
+
+
+class Command(BaseCommand):
+    help = "Compare memory use of the dict-node trie, the __slots__ trie and the packed (mmap) trie."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000])
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            items = [(name, i % 500) for i, name in enumerate(synthetic_categories(size))]
+
+            trie, slots_mb = _measure(lambda: CategoryTrie.from_items(items))
+            _, dict_mb = _measure(lambda: _dict_copy(trie.root))
+            packed, packed_mb = _measure(lambda: PackedCategoryTrie.from_trie(trie))
+
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'categories.idx')
+                packed.save(path)
+                file_mb = os.path.getsize(path) / (1024 * 1024)
+                start = time.perf_counter()
+                loaded, mapped_mb = _measure(lambda: PackedCategoryTrie.load(path))
+                load_ms = (time.perf_counter() - start) * 1000
+                loaded.starts_with('a', limit=10)
+                del loaded
+
+            self.stdout.write(
+                f"{size:>8} categories | dict nodes: {dict_mb:8.1f} MB | __slots__ nodes: {slots_mb:8.1f} MB | "
+                f"packed: {packed_mb:6.1f} MB | file: {file_mb:6.1f} MB, mmap load {load_ms:.1f} ms, "
+                f"{mapped_mb:.2f} MB private heap"
+            )
@@ -0,0 +1,25 @@
+# courses/management/commands/build_category_index.py
+# python manage.py build_category_index [--output path]
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from courses.packed_trie import PackedCategoryTrie
+from courses.suggestions import CategorySuggestionIndex
+
+
+class Command(BaseCommand):
+    help = "Build the category suggestion index from the database and write it as an mmap-able file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.CATEGORY_INDEX_PATH)
+
+    def handle(self, *args, **options):
+        path = options['output']
+        if not path:
+            raise CommandError("No output path given and CATEGORY_INDEX_PATH is not set.")
+
+        index = CategorySuggestionIndex()
+        trie = index.build()
+        packed = PackedCategoryTrie.from_trie(trie, version=index.version)
+        packed.save(path)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(packed)} categories ({len(packed.node_word)} nodes) to {path}"))
@@ -8,6 +8,14 @@ User = get_user_model()
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the name the row was loaded with, so courses/signals.py sees a rename without querying again
+        if 'name' in instance.__dict__:
+            instance._loaded_name = instance.name
+        return instance
+
     def __str__(self):
         return self.name
 
@@ -19,6 +27,14 @@ class Course(models.Model):
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the category the row was loaded with, so courses/signals.py sees a change without querying again
+        if 'category_id' in instance.__dict__:
+            instance._loaded_category_id = instance.category_id
+        return instance
+
     def __str__(self):
         return self.title
 
@@ -0,0 +1,222 @@
+# courses/packed_trie.py
+# Read-only, array-backed radix version of CategoryTrie.
+#
+# Chains of single-child nodes are merged into one edge (Patricia layout) and every node, edge label,
+# top-k list and word lives in flat arrays instead of Python objects. The arrays can be written to a
+# file once (python manage.py build_category_index) and then mmap'ed by every worker, so the pages are
+# shared through the OS page cache instead of each worker building its own copy.
+
+import mmap
+import struct
+from array import array
+from .fuzzy import fuzzy_search
+from .trie import CategoryTrie
+
+MAGIC = b'CTRI'
+FORMAT_VERSION = 1
+
+# uint32 sections, in file order
+SECTIONS = (
+    'first_child', 'child_count', 'node_word', 'label_off', 'label_len',
+    'top_off', 'top_len', 'labels', 'tops', 'word_off', 'word_count',
+)
+
+# magic, format version, top_k, index version, number of sections, then (offset, length) per section
+# plus the utf-8 word blob at the end
+HEADER = struct.Struct('<4sIIQI')
+SECTION = struct.Struct('<QQ')
+
+NO_WORD = 0xFFFFFFFF
+
+
+class PackedCategoryTrie:
+    """Immutable category trie; use CategoryTrie when the words need to change."""
+
+    def __init__(self, arrays, words_blob, top_k, version=0, buffer=None):
+        for name in SECTIONS:
+            setattr(self, name, arrays[name])
+        self.words_blob = words_blob
+        self.top_k = top_k
+        self.version = version
+        self._buffer = buffer  # keeps the mmap alive while the views are in use
+
+    def __len__(self):
+        return len(self.word_count)
+
+    # ------------------------------
+    # Building
+    # ------------------------------
+    @classmethod
+    def from_trie(cls, trie, version=0):
+        arrays = {name: array('I') for name in SECTIONS}
+        word_ids = {}
+        words = bytearray()
+
+        def word_id(leaf):
+            wid = word_ids.get(id(leaf))
+            if wid is None:
+                wid = word_ids[id(leaf)] = len(arrays['word_count'])
+                arrays['word_off'].append(len(words))
+                words.extend(leaf.word.encode('utf-8'))
+                arrays['word_count'].append(leaf.count)
+            return wid
+
+        def add_node(node, label):
+            arrays['label_off'].append(len(arrays['labels']))
+            arrays['label_len'].append(len(label))
+            arrays['labels'].extend(ord(char) for char in label)
+            arrays['node_word'].append(word_id(node) if node.is_end else NO_WORD)
+            arrays['top_off'].append(len(arrays['tops']))
+            arrays['top_len'].append(len(node.top))
+            arrays['tops'].extend(word_id(leaf) for leaf in node.top)
+            arrays['first_child'].append(0)
+            arrays['child_count'].append(0)
+            return len(arrays['node_word']) - 1
+
+        # breadth-first so the children of a node are contiguous and sorted by first character
+        queue = [(add_node(trie.root, ''), trie.root)]
+        while queue:
+            next_queue = []
+            for packed_id, node in queue:
+                children = sorted(node.children.items())
+                arrays['first_child'][packed_id] = len(arrays['node_word'])
+                arrays['child_count'][packed_id] = len(children)
+                for char, child in children:
+                    label = [char]
+                    while not child.is_end and len(child.children) == 1:
+                        (char, child), = child.children.items()
+                        label.append(char)
+                    next_queue.append((add_node(child, ''.join(label)), child))
+            queue = next_queue
+
+        arrays['word_off'].append(len(words))
+        return cls(arrays, bytes(words), trie.top_k, version)
+
+    def thaw(self):
+        # mutable copy for incremental updates
+        return CategoryTrie.from_items(self.items(), top_k=self.top_k)
+
+    # ------------------------------
+    # Serialising
+    # ------------------------------
+    def save(self, path):
+        offset = HEADER.size + SECTION.size * (len(SECTIONS) + 1)
+        table = []
+        for name in SECTIONS:
+            length = len(getattr(self, name))
+            table.append((offset, length))
+            offset += length * 4
+        table.append((offset, len(self.words_blob)))
+
+        with open(path, 'wb') as fh:
+            fh.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.top_k, self.version, len(SECTIONS) + 1))
+            for entry in table:
+                fh.write(SECTION.pack(*entry))
+            for name in SECTIONS:
+                data = getattr(self, name)
+                fh.write(data.tobytes() if isinstance(data, array) else bytes(data))
+            fh.write(self.words_blob)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as fh:
+            buffer = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, format_version, top_k, version, section_count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION or section_count != len(SECTIONS) + 1:
+            buffer.close()
+            raise ValueError(f"{path} is not a category index file (format {FORMAT_VERSION}).")
+
+        view = memoryview(buffer)
+        arrays = {}
+        for i, name in enumerate(SECTIONS):
+            offset, length = SECTION.unpack_from(buffer, HEADER.size + i * SECTION.size)
+            arrays[name] = view[offset:offset + length * 4].cast('I')
+        offset, length = SECTION.unpack_from(buffer, HEADER.size + len(SECTIONS) * SECTION.size)
+        words_blob = view[offset:offset + length]
+        return cls(arrays, words_blob, top_k, version, buffer=buffer)
+
+    # ------------------------------
+    # Queries
+    # ------------------------------
+    def _word(self, wid):
+        return bytes(self.words_blob[self.word_off[wid]:self.word_off[wid + 1]]).decode('utf-8')
+
+    def _child(self, node, code):
+        # binary search over the node's children by the first character of their edge label
+        lo = self.first_child[node]
+        hi = lo + self.child_count[node]
+        labels, label_off = self.labels, self.label_off
+        while lo < hi:
+            mid = (lo + hi) // 2
+            first = labels[label_off[mid]]
+            if first < code:
+                lo = mid + 1
+            elif first > code:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def _find(self, word):
+        # node whose subtree holds every word starting with `word`, plus whether the match ended exactly on it
+        codes = [ord(char) for char in word]
+        node, i = 0, 0
+        while i < len(codes):
+            child = self._child(node, codes[i])
+            if child is None:
+                return None, False
+            off, length = self.label_off[child], self.label_len[child]
+            for j in range(length):
+                if i + j == len(codes):
+                    return child, False
+                if self.labels[off + j] != codes[i + j]:
+                    return None, False
+            node, i = child, i + length
+        return node, True
+
+    def get_count(self, word):
+        node, exact = self._find(word.lower().strip())
+        if node is None or not exact or self.node_word[node] == NO_WORD:
+            return None
+        return self.word_count[self.node_word[node]]
+
+    def starts_with(self, prefix, limit=None):
+        node, _ = self._find(prefix.lower().strip())
+        if node is None:
+            return []
+
+        if limit is not None and limit <= self.top_k:
+            off = self.top_off[node]
+            return [self._word(wid) for wid in self.tops[off:off + min(limit, self.top_len[node])]]
+
+        wids = []
+        stack = [node]
+        while stack:
+            curr = stack.pop()
+            if self.node_word[curr] != NO_WORD:
+                wids.append(self.node_word[curr])
+            first = self.first_child[curr]
+            stack.extend(range(first, first + self.child_count[curr]))
+
+        ranked = sorted(((-self.word_count[wid], self._word(wid)) for wid in wids))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [word for _, word in ranked]
+
+    def fuzzy_starts_with(self, query, max_distance, limit=10, budget_ms=None):
+        def edges(node):
+            first = self.first_child[node]
+            for child in range(first, first + self.child_count[node]):
+                off = self.label_off[child]
+                yield ''.join(map(chr, self.labels[off:off + self.label_len[child]])), child
+
+        def top(node):
+            off = self.top_off[node]
+            return [(self._word(wid), self.word_count[wid]) for wid in self.tops[off:off + self.top_len[node]]]
+
+        return fuzzy_search(0, query.lower().strip(), edges, top, max_distance, limit, budget_ms)
+
+    def items(self):
+        for wid in range(len(self)):
+            yield self._word(wid), self.word_count[wid]
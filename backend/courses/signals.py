@@ -0,0 +1,82 @@
+# courses/signals.py
+# Keeps the in-memory category suggestion index in sync with the Category table.
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Category, Course
+from .suggestions import suggestion_index
+
+
+@receiver(pre_save, sender=Category)
+def remember_old_category_name(sender, instance, update_fields=None, **kwargs):
+    # needed so a rename can drop the old word from the index
+    instance._old_name = None
+    if not instance.pk:
+        return
+    if update_fields is not None and 'name' not in update_fields:
+        instance._old_name = instance.name  # the name isn't being written
+    elif hasattr(instance, '_loaded_name'):
+        instance._old_name = instance._loaded_name  # set by Category.from_db
+    else:
+        # built by hand with a pk, or loaded with the name deferred
+        instance._old_name = Category.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, created, update_fields=None, **kwargs):
+    old_name = getattr(instance, '_old_name', None)
+    new_name = instance.name
+    if update_fields is None or 'name' in update_fields:
+        instance._loaded_name = new_name  # what the row holds now, for the next save
+
+    if created or old_name is None:
+        transaction.on_commit(lambda: suggestion_index.add(new_name))
+    elif old_name != new_name:
+        transaction.on_commit(lambda: suggestion_index.rename(old_name, new_name))
+
+
+@receiver(post_delete, sender=Category)
+def unindex_category(sender, instance, **kwargs):
+    name = instance.name
+    transaction.on_commit(lambda: suggestion_index.remove(name))
+
+
+@receiver(pre_save, sender=Course)
+def remember_old_course_category(sender, instance, update_fields=None, **kwargs):
+    instance._old_category_id = None
+    if not instance.pk:
+        return
+    if update_fields is not None and 'category' not in update_fields and 'category_id' not in update_fields:
+        instance._old_category_id = instance.category_id  # the category isn't being written
+    elif hasattr(instance, '_loaded_category_id'):
+        instance._old_category_id = instance._loaded_category_id  # set by Course.from_db
+    else:
+        # built by hand with a pk, or loaded with the category deferred
+        instance._old_category_id = Course.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+
+
+@receiver(post_save, sender=Course)
+def count_course_in_category(sender, instance, created, update_fields=None, **kwargs):
+    # category popularity drives the ranking of suggestions
+    old_category_id = None if created else getattr(instance, '_old_category_id', None)
+    if update_fields is None or 'category' in update_fields or 'category_id' in update_fields:
+        instance._loaded_category_id = instance.category_id  # what the row holds now, for the next save
+    if old_category_id == instance.category_id:
+        return
+
+    if old_category_id:
+        old_name = Category.objects.filter(pk=old_category_id).values_list('name', flat=True).first()
+        if old_name:
+            transaction.on_commit(lambda: suggestion_index.adjust_popularity(old_name, -1))
+    if instance.category_id:
+        new_name = instance.category.name
+        transaction.on_commit(lambda: suggestion_index.adjust_popularity(new_name, 1))
+
+
+@receiver(post_delete, sender=Course)
+def uncount_course_in_category(sender, instance, **kwargs):
+    if instance.category_id:
+        name = Category.objects.filter(pk=instance.category_id).values_list('name', flat=True).first()
+        if name:
+            transaction.on_commit(lambda: suggestion_index.adjust_popularity(name, -1))
@@ -0,0 +1,147 @@
+# courses/suggestions.py
+# Process-wide category suggestion index. The trie is built once per worker and then kept in sync
+# through the Category signals in courses/signals.py, instead of being rebuilt on every keystroke.
+#
+# Only inserts, renames and deletes bump the shared version (and so make the other workers rebuild).
+# Popularity deltas from course saves are applied to this worker's trie alone; the other workers'
+# counts drift until their next rebuild (the next structural change, a restart or a fresh snapshot),
+# which only shifts the ranking of suggestions and isn't worth a full rebuild per course save.
+
+import logging
+import os
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from .packed_trie import PackedCategoryTrie
+from .trie import CategoryTrie
+
+logger = logging.getLogger(__name__)
+
+# Shared version counter. When CACHES points at a shared backend (e.g. redis) every worker can
+# tell that another worker changed the categories and rebuild its own copy on the next query.
+# With the default local-memory cache this is simply a per-process counter.
+INDEX_VERSION_KEY = 'courses:category_index_version'
+
+
+class CategorySuggestionIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._trie = None
+        self._version = None
+
+    @property
+    def version(self):
+        return self._version
+
+    def _shared_version(self):
+        return cache.get(INDEX_VERSION_KEY, 0)
+
+    def _bump_shared_version(self):
+        try:
+            return cache.incr(INDEX_VERSION_KEY)
+        except ValueError:
+            # key missing (first write or cache was flushed)
+            cache.set(INDEX_VERSION_KEY, 1, None)
+            return 1
+
+    def build(self, items=None):
+        from django.db.models import Count
+        from .models import Category
+
+        # items are (name, popularity) pairs; popularity is the number of courses in the category
+        if items is None:
+            items = Category.objects.annotate(course_count=Count('courses')).values_list('name', 'course_count').iterator()
+
+        version = self._shared_version()
+        trie = CategoryTrie.from_items(items)
+
+        with self._lock:
+            self._trie = trie
+            self._version = version
+        logger.info(f"Category suggestion index built with {len(trie)} categories (version {version}).")
+        return trie
+
+    def _current_trie(self):
+        trie = self._trie
+        if trie is None or self._version != self._shared_version():
+            trie = self.build()
+        return trie
+
+    def load_snapshot(self, path):
+        # mmap a prebuilt index (manage.py build_category_index); only used if nothing changed since it was written
+        packed = PackedCategoryTrie.load(path)
+        version = self._shared_version()
+        if packed.version != version:
+            logger.info(f"Category index snapshot {path} is stale (version {packed.version}, current {version}).")
+            return None
+
+        with self._lock:
+            self._trie = packed
+            self._version = version
+        logger.info(f"Category suggestion index loaded from {path} with {len(packed)} categories.")
+        return packed
+
+    def warm_up(self):
+        # called once at startup from core.wsgi / core.asgi so the first request doesn't pay for the build
+        try:
+            path = getattr(settings, 'CATEGORY_INDEX_PATH', '')
+            if path and os.path.exists(path) and self.load_snapshot(path):
+                return
+            self.build()
+        except Exception as e:
+            logger.warning(f"Category suggestion index warm-up skipped: {e}")
+
+    def suggest(self, prefix, limit=None):
+        trie = self._current_trie()
+        with self._lock:
+            return trie.starts_with(prefix, limit=limit)
+
+    def fuzzy_suggest(self, query, max_distance, limit=10, budget_ms=None):
+        trie = self._current_trie()
+        with self._lock:
+            return trie.fuzzy_starts_with(query, max_distance, limit=limit, budget_ms=budget_ms)
+
+    def _thawed(self):
+        if isinstance(self._trie, PackedCategoryTrie):
+            # snapshots are read-only, switch to a private mutable copy on the first change
+            self._trie = self._trie.thaw()
+        return self._trie
+
+    def _apply(self, change):
+        new_version = self._bump_shared_version()
+        with self._lock:
+            if self._trie is None:
+                return
+            if self._version == new_version - 1:
+                change(self._thawed())
+                self._version = new_version
+            else:
+                # another worker changed the categories since our last build, start over lazily
+                self._trie = None
+
+    def add(self, name):
+        self._apply(lambda trie: trie.insert(name))
+
+    def adjust_popularity(self, name, delta):
+        # local only, see the header: the shared version is left alone
+        with self._lock:
+            if self._trie is not None:
+                self._thawed().increment(name, delta)
+
+    def remove(self, name):
+        self._apply(lambda trie: trie.remove(name))
+
+    def rename(self, old_name, new_name):
+        def change(trie):
+            popularity = trie.get_count(old_name)
+            trie.remove(old_name)
+            trie.insert(new_name, popularity)
+        self._apply(change)
+
+    def reset(self):
+        with self._lock:
+            self._trie = None
+            self._version = None
+
+
+suggestion_index = CategorySuggestionIndex()
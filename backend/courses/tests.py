@@ -1,3 +1,108 @@
-from django.test import TestCase
+import os
+import tempfile
+from django.test import SimpleTestCase
+from .packed_trie import PackedCategoryTrie
+from .suggestions import CategorySuggestionIndex
+from .trie import CategoryTrie
 
-# Create your tests here.
+CATEGORIES = [
+    ('python', 5), ('pytorch', 3), ('pandas', 4), ('php', 1), ('perl', 2),
+    ('data science', 7), ('data engineering', 2), ('design', 6), ('devops', 6), ('django', 3),
+]
+
+
+class CategoryTrieTests(SimpleTestCase):
+    def test_top_k_follows_popularity_changes(self):
+        trie = CategoryTrie.from_items(CATEGORIES, top_k=3)
+        self.assertEqual(trie.starts_with('p', limit=3), ['python', 'pandas', 'pytorch'])
+
+        trie.increment('perl', 10)
+        self.assertEqual(trie.starts_with('p', limit=3), ['perl', 'python', 'pandas'])
+        trie.increment('python', -5)
+        self.assertEqual(trie.starts_with('p', limit=3), ['perl', 'pandas', 'pytorch'])
+        self.assertEqual(trie.starts_with('py', limit=3), ['pytorch', 'python'])
+
+        # the incrementally maintained lists match a trie built from scratch with the same counts
+        rebuilt = CategoryTrie.from_items(trie.items(), top_k=3)
+        for prefix in ('', 'p', 'py', 'd', 'da', 'de'):
+            self.assertEqual(trie.starts_with(prefix, limit=3), rebuilt.starts_with(prefix, limit=3))
+
+    def test_ties_are_broken_by_name(self):
+        trie = CategoryTrie.from_items(CATEGORIES, top_k=3)
+        self.assertEqual(trie.starts_with('de', limit=3), ['design', 'devops'])
+        self.assertEqual(trie.starts_with('d', limit=3), ['data science', 'design', 'devops'])
+
+    def test_fuzzy_within_one_edit(self):
+        trie = CategoryTrie.from_items(CATEGORIES)
+        self.assertEqual(trie.fuzzy_starts_with('pyhton', 1), ['python'])     # swapped pair
+        self.assertEqual(trie.fuzzy_starts_with('dajngo', 1), ['django'])
+        self.assertEqual(trie.fuzzy_starts_with('data sxience', 1), ['data science'])
+        self.assertEqual(trie.fuzzy_starts_with('pyhtn', 1), [])
+
+    def test_fuzzy_within_two_edits(self):
+        trie = CategoryTrie.from_items(CATEGORIES)
+        self.assertEqual(trie.fuzzy_starts_with('pyhtn', 2)[0], 'python')
+        self.assertIn('data science', trie.fuzzy_starts_with('dta scince', 2))
+        # closer matches come first, whatever their popularity
+        self.assertEqual(trie.fuzzy_starts_with('perl', 2)[0], 'perl')
+
+
+class PackedCategoryTrieTests(SimpleTestCase):
+    def setUp(self):
+        words = [f'{first}{second}{third}' for first in 'abcd' for second in 'aeio' for third in 'lmnrst']
+        self.items = [(word, (n * 7) % 11) for n, word in enumerate(words)] + CATEGORIES
+        self.trie = CategoryTrie.from_items(self.items)
+        self.packed = PackedCategoryTrie.from_trie(self.trie, version=3)
+
+    def assertSameAnswers(self, packed):
+        self.assertEqual(len(packed), len(self.trie))
+        self.assertEqual(sorted(packed.items()), sorted(self.trie.items()))
+        prefixes = {''} | {word[:n] for word, _ in self.items for n in range(1, 4)} | {'x', 'pyz'}
+        for prefix in sorted(prefixes):
+            for limit in (1, 5, 10, None):
+                self.assertEqual(packed.starts_with(prefix, limit=limit), self.trie.starts_with(prefix, limit=limit), prefix)
+        for word, count in self.items:
+            self.assertEqual(packed.get_count(word), count)
+        self.assertIsNone(packed.get_count('pyt'))
+        for query in ('pyhton', 'dajngo', 'bel', 'cimt', 'dta scince'):
+            for distance in (1, 2):
+                self.assertEqual(packed.fuzzy_starts_with(query, distance), self.trie.fuzzy_starts_with(query, distance), query)
+
+    def test_matches_the_trie_it_was_packed_from(self):
+        self.assertSameAnswers(self.packed)
+
+    def test_matches_after_a_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'categories.idx')
+            self.packed.save(path)
+            loaded = PackedCategoryTrie.load(path)
+        self.assertEqual(loaded.version, 3)
+        self.assertSameAnswers(loaded)
+
+    def test_thaw_gives_back_an_equivalent_mutable_trie(self):
+        thawed = self.packed.thaw()
+        self.assertEqual(sorted(thawed.items()), sorted(self.trie.items()))
+        thawed.increment('bel', 100)
+        self.assertEqual(thawed.starts_with('b', limit=1), ['bel'])
+
+
+class CategorySuggestionIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = CategorySuggestionIndex()
+        self.index.build(CATEGORIES)
+
+    def test_adjust_popularity_reorders_without_a_new_version(self):
+        version = self.index.version
+        self.index.adjust_popularity('php', 9)
+        self.assertEqual(self.index.suggest('p', limit=2), ['php', 'python'])
+        self.assertEqual(self.index.version, version)
+
+    def test_rename_keeps_the_popularity(self):
+        self.index.rename('perl', 'ruby')
+        self.assertEqual(self.index.suggest('r'), ['ruby'])
+        self.assertNotIn('perl', self.index.suggest('p'))
+        self.index.adjust_popularity('ruby', 1)
+        self.index.adjust_popularity('pytorch', -3)
+        self.assertEqual(self.index.suggest('', limit=4), ['data science', 'design', 'devops', 'python'])
+        self.index.adjust_popularity('ruby', 5)
+        self.assertEqual(self.index.suggest('', limit=2), ['ruby', 'data science'])
@@ -1,39 +1,205 @@
 # implementing Trie dsa for auto suggestion for category selection of the learner, there are alternatives, but used for learning purpose
+#
+# Every category carries a popularity count (number of courses using it) and every node keeps a
+# precomputed list of its best `top_k` completions, so a ranked prefix query is O(len(prefix) + k)
+# no matter how large the subtree under the prefix is.
+
+from .fuzzy import fuzzy_search
+
+
+def _rank(node):
+    return (-node.count, node.word)
+
 
 class TrieNode:
+    # no per-node __dict__, the trie stays resident in every worker so node size matters
+    __slots__ = ('children', 'is_end', 'word', 'count', 'top')
+
     def __init__(self):
         self.children = {}
         self.is_end = False
+        self.word = None   # full word stored on terminal nodes, so traversal never builds strings
+        self.count = 0     # popularity of the word ending here
+        self.top = []      # best terminal nodes in this subtree, ordered by _rank
 
 class CategoryTrie:
-    def __init__(self):
+    def __init__(self, top_k=10):
         self.root = TrieNode()
+        self.top_k = top_k
+        self.size = 0
+
+    def __len__(self):
+        return self.size
 
-    def insert(self, word):
+    def items(self):
+        # (word, count) pairs, in no particular order
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.is_end:
+                yield node.word, node.count
+            stack.extend(node.children.values())
+
+    @classmethod
+    def from_items(cls, items, top_k=10):
+        # bulk load (word, count) pairs and compute every node's top list in one post-order pass,
+        # much cheaper than maintaining the lists insert by insert
+        trie = cls(top_k=top_k)
+        for word, count in items:
+            word = word.lower().strip()
+            node = trie.root
+            for char in word:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = TrieNode()
+                node = child
+            if not node.is_end:
+                trie.size += 1
+            node.is_end = True
+            node.word = word
+            node.count = count or 0
+
+        order = []
+        stack = [trie.root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.children.values())
+        for node in reversed(order):
+            cls._refresh_top(node, top_k)
+        return trie
+
+    def _path(self, word):
         node = self.root
-        for char in word.lower().strip():
+        path = [node]
+        for char in word:
+            node = node.children.get(char)
+            if node is None:
+                return None
+            path.append(node)
+        return path
+
+    def insert(self, word, count=None):
+        word = word.lower().strip()
+        node = self.root
+        path = [node]
+        for char in word:
             if char not in node.children:
                 node.children[char] = TrieNode()
             node = node.children[char]
+            path.append(node)
+
+        old_count = node.count if node.is_end else None
+        if old_count is None:
+            self.size += 1
         node.is_end = True
+        node.word = word
+        if count is not None:
+            node.count = count
 
-    def starts_with(self, prefix):
-        node = self.root
-        for char in prefix.lower().strip():
-            if char not in node.children:
-                return []
-            node = node.children[char]
+        if old_count is not None and node.count < old_count:
+            self._recompute(path)
+        else:
+            self._promote(path, node)
+
+    def get_count(self, word):
+        path = self._path(word.lower().strip())
+        if path is None or not path[-1].is_end:
+            return None
+        return path[-1].count
+
+    def increment(self, word, delta=1):
+        path = self._path(word.lower().strip())
+        if path is None or not path[-1].is_end:
+            return False
+        leaf = path[-1]
+        leaf.count = max(leaf.count + delta, 0)
+        if delta >= 0:
+            self._promote(path, leaf)
+        else:
+            self._recompute(path)
+        return True
+
+    def remove(self, word):
+        word = word.lower().strip()
+        path = self._path(word)
+        if path is None or not path[-1].is_end:
+            return False
+
+        leaf = path[-1]
+        leaf.is_end = False
+        leaf.word = None
+        leaf.count = 0
+        self.size -= 1
+
+        # prune empty branches on the way back up
+        for depth in range(len(word), 0, -1):
+            child = path[depth]
+            if child.is_end or child.children:
+                break
+            del path[depth - 1].children[word[depth - 1]]
+            path.pop()
+
+        self._recompute(path)
+        return True
+
+    def _promote(self, path, leaf):
+        # the word only got better (or is new), so it can only move up in each ancestor's list.
+        # lists are replaced, never mutated, because single-child nodes share their child's list
+        for node in path:
+            top = node.top
+            if leaf in top:
+                node.top = sorted(top, key=_rank)
+            elif len(top) < self.top_k or _rank(leaf) < _rank(top[-1]):
+                node.top = sorted(top + [leaf], key=_rank)[:self.top_k]
+
+    def _recompute(self, path):
+        # the word got worse or disappeared, rebuild the lists bottom-up from the children
+        for node in reversed(path):
+            self._refresh_top(node, self.top_k)
+
+    @staticmethod
+    def _refresh_top(node, top_k):
+        if not node.is_end and len(node.children) == 1:
+            # a chain node ranks exactly like its only child
+            node.top = next(iter(node.children.values())).top
+            return
+        candidates = [node] if node.is_end else []
+        for child in node.children.values():
+            candidates.extend(child.top)
+        candidates.sort(key=_rank)
+        node.top = candidates[:top_k]
+
+    def starts_with(self, prefix, limit=None):
+        path = self._path(prefix.lower().strip())
+        if path is None:
+            return []
+        node = path[-1]
+
+        if limit is not None and limit <= self.top_k:
+            return [leaf.word for leaf in node.top[:limit]]
 
-        return self._collect_from(node, prefix.lower().strip())
+        return self._collect_from(node, limit)
 
-    def _collect_from(self, node, prefix):
-        results = []
+    def fuzzy_starts_with(self, query, max_distance, limit=10, budget_ms=None):
+        return fuzzy_search(
+            self.root, query.lower().strip(),
+            edges=lambda node: node.children.items(),
+            top=lambda node: [(leaf.word, leaf.count) for leaf in node.top],
+            max_distance=max_distance, limit=limit, budget_ms=budget_ms,
+        )
 
-        def dfs(curr, path):
+    def _collect_from(self, node, limit=None):
+        # iterative walk over the whole subtree, only used when more than top_k results are asked for
+        leaves = []
+        stack = [node]
+        while stack:
+            curr = stack.pop()
             if curr.is_end:
-                results.append(prefix + path)
-            for char, next_node in curr.children.items():
-                dfs(next_node, path + char)
+                leaves.append(curr)
+            stack.extend(curr.children.values())
 
-        dfs(node, "")
-        return results
+        leaves.sort(key=_rank)
+        if limit is not None:
+            leaves = leaves[:limit]
+        return [leaf.word for leaf in leaves]
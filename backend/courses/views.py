@@ -4,7 +4,8 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Course, Category
 from .serializers import CourseSerializer, CategorySerializer
-from .trie import CategoryTrie
+from .fuzzy import default_max_distance
+from .suggestions import suggestion_index
 
 class CourseViewSet(viewsets.ModelViewSet):
     serializer_class = CourseSerializer
@@ -23,13 +24,31 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
 
 class CategorySuggestionView(APIView):
     permission_classes = [permissions.AllowAny]
+    default_limit = 10
+    max_limit = 50
+    max_fuzzy_distance = 2
+    fuzzy_budget_ms = 5  # typo matching gives up and returns what it has after this long
 
     def get(self, request):
         query = request.GET.get('q', '')
-        trie = CategoryTrie()
-        for cat in Category.objects.all():
-            trie.insert(cat.name)
-        suggestions = trie.starts_with(query)
+        try:
+            limit = int(request.GET.get('limit', self.default_limit))
+            max_distance = int(request.GET.get('max_distance', default_max_distance(query.strip())))
+        except ValueError:
+            return Response({"detail": "limit and max_distance must be integers."}, status=400)
+        limit = max(1, min(limit, self.max_limit))
+        max_distance = max(0, min(max_distance, self.max_fuzzy_distance))
+
+        # served from the process-wide index, ranked by course count, no DB hit per keystroke
+        suggestions = suggestion_index.suggest(query, limit=limit)
+
+        # top up with close misspellings ("pyhton") so learners pick an existing category instead of creating a duplicate
+        if len(suggestions) < limit and max_distance and request.GET.get('fuzzy', 'true') != 'false':
+            for name in suggestion_index.fuzzy_suggest(query, max_distance, limit=limit, budget_ms=self.fuzzy_budget_ms):
+                if name not in suggestions:
+                    suggestions.append(name)
+            suggestions = suggestions[:limit]
+
         return Response(suggestions)
 
 
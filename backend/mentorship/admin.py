@@ -1,7 +1,9 @@
 from django.contrib import admin
-from .models import MentorAvailability, SessionBooking, Review, Feedback, Checking, PaymentTransaction, StripeAccount, MentorPayout
+from .models import MentorAvailability, AvailabilityRule, AvailabilityException, SessionBooking, Review, Feedback, Checking, PaymentTransaction, StripeAccount, MentorPayout
 # Register your models here.
 admin.site.register(MentorAvailability)
+admin.site.register(AvailabilityRule)
+admin.site.register(AvailabilityException)
 admin.site.register(SessionBooking)
 admin.site.register(Review)
 admin.site.register(Feedback)
@@ -0,0 +1,165 @@
+# backend/mentorship/directory.py
+# Filters and facet counts of the mentor directory (MentorListAPIView).
+#
+#   ?category=Data Science&category=Design   mentors listing any of them (exact, case sensitive)
+#   ?language=Hindi                          the same for languages_known
+#   ?experience_min=3&experience_max=10      years of experience, inclusive
+#   ?price_min=300&price_max=800             has an open upcoming slot priced in the range
+#   ?has_open_slot=true                      has an open upcoming slot at any price
+#
+# Category and language membership are JSON containment (@>) on the lists in UserProfile, served
+# by partial GIN indexes over approved profiles; experience by a partial btree, slots by
+# mentor_open_slot_idx. Facet counts are taken over the filtered mentors, all facets in one statement.
+#
+# search_open_slots() answers "open slots starting between T1 and T2" across all mentors in start
+# order, walking open_slot_start_idx with a keyset cursor instead of one request per mentor.
+
+from decimal import Decimal, InvalidOperation
+from django.db import connection
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from users.models import UserProfile
+from .models import MentorAvailability
+from .pagination import decode_slot_cursor, encode_slot_cursor
+
+EXPERIENCE_BUCKETS = (('0-2', 0, 2), ('3-5', 3, 5), ('6-10', 6, 10), ('11+', 11, None))
+
+
+def upcoming_slots():
+    """Slots that haven't started yet (server local time), with just the columns the directory shows."""
+    current = timezone.localtime()
+    return MentorAvailability.objects.filter(
+        Q(date__gt=current.date()) | Q(date=current.date(), start_time__gte=current.time())
+    ).only(
+        'id', 'mentor_id', 'date', 'start_time', 'end_time', 'is_booked', 'session_price'
+    ).order_by('date', 'start_time')
+
+
+def _any_of(field, values):
+    condition = Q()
+    for value in values:
+        condition |= Q(**{f'{field}__contains': [value]})
+    return condition
+
+
+def _number(params, name, cast):
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        value = cast(raw)
+    except (ValueError, InvalidOperation):
+        raise ValueError(f"{name} must be a number.")
+    if value < 0:
+        raise ValueError(f"{name} can't be negative.")
+    return value
+
+
+def filter_mentors(params):
+    """Approved mentors matching the query params; ValueError with a message for bad input."""
+    mentors = UserProfile.objects.filter(user__role__name="Mentor", is_approved=True)
+
+    categories = [value for value in params.getlist('category') if value]
+    if categories:
+        mentors = mentors.filter(_any_of('preferred_categories', categories))
+    languages = [value for value in params.getlist('language') if value]
+    if languages:
+        mentors = mentors.filter(_any_of('languages_known', languages))
+
+    experience_min = _number(params, 'experience_min', int)
+    experience_max = _number(params, 'experience_max', int)
+    if experience_min is not None:
+        mentors = mentors.filter(experience_years__gte=experience_min)
+    if experience_max is not None:
+        mentors = mentors.filter(experience_years__lte=experience_max)
+
+    open_slots = upcoming_slots().filter(mentor=OuterRef('user_id'), is_booked=False)
+    price_min = _number(params, 'price_min', Decimal)
+    price_max = _number(params, 'price_max', Decimal)
+    if price_min is not None:
+        open_slots = open_slots.filter(session_price__gte=price_min)
+    if price_max is not None:
+        open_slots = open_slots.filter(session_price__lte=price_max)
+    if price_min is not None or price_max is not None or params.get('has_open_slot') == 'true':
+        mentors = mentors.filter(Exists(open_slots))
+    return mentors
+
+
+_FACETS_SQL = """
+    WITH mentors AS ({base})
+    SELECT 'category', value, count(*) FROM mentors,
+        jsonb_array_elements_text(CASE jsonb_typeof(categories) WHEN 'array' THEN categories ELSE '[]' END) value
+        GROUP BY value
+    UNION ALL
+    SELECT 'language', value, count(*) FROM mentors,
+        jsonb_array_elements_text(CASE jsonb_typeof(languages) WHEN 'array' THEN languages ELSE '[]' END) value
+        GROUP BY value
+    UNION ALL
+    SELECT 'experience', CASE {buckets} ELSE 'unknown' END, count(*) FROM mentors GROUP BY 2
+    UNION ALL
+    SELECT 'has_open_slot', has_open::text, count(*) FROM mentors GROUP BY has_open
+"""
+
+
+def facet_counts(mentors):
+    """{'category': {name: count}, 'language': ..., 'experience': {bucket: count}, 'has_open_slot': ...}."""
+    open_slots = upcoming_slots().filter(mentor=OuterRef('user_id'), is_booked=False)
+    base, params = mentors.order_by().annotate(has_open=Exists(open_slots)).values_list(
+        'preferred_categories', 'languages_known', 'experience_years', 'has_open'
+    ).query.sql_with_params()
+    buckets = ' '.join(
+        f"WHEN experience >= {low} THEN '{label}'" if high is None
+        else f"WHEN experience BETWEEN {low} AND {high} THEN '{label}'"
+        for label, low, high in EXPERIENCE_BUCKETS
+    )
+    sql = _FACETS_SQL.format(
+        base=f"SELECT * FROM ({base}) AS filtered (categories, languages, experience, has_open)",
+        buckets=buckets,
+    )
+
+    facets = {'category': {}, 'language': {}, 'experience': {}, 'has_open_slot': {}}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    for facet, value, count in sorted(rows, key=lambda row: -row[2]):
+        facets[facet][value] = count
+    # buckets in their natural order rather than by count
+    facets['experience'] = {
+        label: facets['experience'][label]
+        for label in [bucket[0] for bucket in EXPERIENCE_BUCKETS] + ['unknown'] if label in facets['experience']
+    }
+    return facets
+
+
+def search_open_slots(start, end, categories=(), max_price=None, cursor=None, limit=20):
+    """
+    Open slots of approved mentors starting in [start, end) (aware datetimes, compared in server local
+    time like the slots themselves), ordered by (date, start_time, id). Returns (slots, next_cursor).
+    """
+    start, end = timezone.localtime(max(start, timezone.now())), timezone.localtime(end)
+    slots = MentorAvailability.objects.filter(
+        Q(date__gt=start.date()) | Q(date=start.date(), start_time__gte=start.time()),
+        Q(date__lt=end.date()) | Q(date=end.date(), start_time__lt=end.time()),
+        date__range=(start.date(), end.date()),  # the index range, the two conditions above trim its ends
+        is_booked=False,
+        mentor__role__name="Mentor",
+        mentor__user_profile__is_approved=True,
+    )
+    if categories:
+        slots = slots.filter(_any_of('mentor__user_profile__preferred_categories', categories))
+    if max_price is not None:
+        slots = slots.filter(session_price__lte=max_price)
+    if cursor:
+        day, start_time, slot_id = decode_slot_cursor(cursor)
+        slots = slots.filter(
+            Q(date__gt=day) | Q(date=day, start_time__gt=start_time) | Q(date=day, start_time=start_time, id__gt=slot_id)
+        )
+
+    rows = list(
+        slots.select_related('mentor__user_profile').only(
+            'id', 'date', 'start_time', 'end_time', 'is_booked', 'session_price', 'mentor__id',
+            'mentor__user_profile__full_name', 'mentor__user_profile__profile_picture',
+        ).order_by('date', 'start_time', 'id')[:limit + 1]
+    )
+    next_cursor = encode_slot_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,153 @@
+# mentorship/management/commands/bench_mentor_directory.py
+# python manage.py bench_mentor_directory [--mentors 1000] [--slots 50] [--page-sizes 10 50] [--keep] [--cleanup]
+#
+# Creates `mentors` approved mentors (bench_mentor_<n>@example.com) with `slots` upcoming slots each,
+# then times MentorListAPIView and counts its queries for the first and the last page at every page
+# size. --legacy also times the old response once: every mentor unpaginated, a slot query per mentor
+# and the full MentorAvailabilitySerializer per slot, which loads slot.mentor and its profile again
+# (minutes at the default size). Synthetic mentors are deleted at the end unless --keep; --cleanup
+# only deletes leftovers.
+
+import statistics
+import time
+from datetime import time as time_of_day, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from mentorship.models import MentorAvailability
+from mentorship.serializers import MentorAvailabilitySerializer
+from mentorship.views import MentorListAPIView
+from users.models import Role, UserProfile
+
+User = get_user_model()
+
+EMAIL_PREFIX = 'bench_mentor_'
+CATEGORIES = ['Data Science', 'Web Development', 'Machine Learning', 'Design', 'Cloud', 'Mobile', 'DevOps']
+LANGUAGES = ['English', 'Hindi', 'Malayalam', 'Tamil', 'Arabic']
+
+
+class Command(BaseCommand):
+    help = "Query count and latency of the mentor directory with many mentors and slots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mentors', type=int, default=1000)
+        parser.add_argument('--slots', type=int, default=50, help="Upcoming slots per mentor.")
+        parser.add_argument('--page-sizes', nargs='+', type=int, default=[10, 50])
+        parser.add_argument('--runs', type=int, default=20, help="Timed runs per case.")
+        parser.add_argument('--legacy', action='store_true', help="Also time the old N+1 response once.")
+        parser.add_argument('--keep', action='store_true', help="Leave the mentors in place for another run.")
+        parser.add_argument('--cleanup', action='store_true', help="Only delete mentors left by --keep.")
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            self.cleanup()
+            return
+        if not User.objects.filter(email__startswith=EMAIL_PREFIX).exists():
+            self.generate(options['mentors'], options['slots'])
+        viewer = User.objects.filter(email__startswith=EMAIL_PREFIX).first()
+        total = UserProfile.objects.filter(user__role__name="Mentor", is_approved=True).count()
+        self.stdout.write(f"Directory: {total} approved mentors")
+
+        view = MentorListAPIView.as_view()
+        factory = APIRequestFactory()
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'testserver'
+
+        def call(page, page_size):
+            request = factory.get('/mentorship/mentors/', {'page': page, 'page_size': page_size}, HTTP_HOST=host)
+            force_authenticate(request, user=viewer)
+            response = view(request)
+            response.render()
+            return response
+
+        for page_size in options['page_sizes']:
+            last = max(1, -(-total // page_size))
+            for page in sorted({1, last}):
+                self.report(f"page {page:>4} of {page_size:>3}", lambda: call(page, page_size), options['runs'])
+
+        if options['legacy']:
+            self.report("old endpoint, all", self.legacy, 1)
+
+        if not options['keep']:
+            self.cleanup()
+
+    def legacy(self):
+        today = timezone.now().date()
+        data = []
+        for profile in UserProfile.objects.filter(user__role__name="Mentor", is_approved=True):
+            upcoming = MentorAvailability.objects.filter(mentor=profile.user, date__gte=today).order_by('date', 'start_time')
+            data.append({'user_id': profile.user.id, 'email': profile.user.email,
+                         'slots': MentorAvailabilitySerializer(upcoming, many=True).data})
+        return data
+
+    def report(self, label, run, runs):
+        queries = []  # counted with a wrapper, CaptureQueriesContext keeps only the last 9000
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            run()
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{label:<22} | {len(queries):>4} queries | median {statistics.median(timings) * 1000:8.1f} ms | "
+            f"p95 {p95 * 1000:8.1f} ms"
+        )
+
+    def generate(self, mentors, slots):
+        self.stdout.write(f"Generating {mentors} mentors with {slots} slots each...")
+        start = time.perf_counter()
+        role, _ = Role.objects.get_or_create(name='Mentor')
+        today = timezone.localdate()
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(email=f"{EMAIL_PREFIX}{i}@example.com", password='!', role=role, is_active=True)
+                for i in range(mentors)
+            ])
+            UserProfile.objects.bulk_create([
+                UserProfile(
+                    user=user,
+                    full_name=f"Bench Mentor {i}",
+                    bio="Synthetic mentor for bench_mentor_directory.",
+                    preferred_categories=[CATEGORIES[i % len(CATEGORIES)], CATEGORIES[(i * 3 + 1) % len(CATEGORIES)]],
+                    languages_known=[LANGUAGES[i % len(LANGUAGES)]],
+                    experience_years=i % 20,
+                    is_approved=True,
+                )
+                for i, user in enumerate(users)
+            ])
+            # spread over the coming days, eight one-hour slots a day from 09:00
+            MentorAvailability.objects.bulk_create([
+                MentorAvailability(
+                    mentor=user,
+                    date=today + timedelta(days=1 + n // 8),
+                    start_time=time_of_day(9 + n % 8),
+                    end_time=time_of_day(10 + n % 8),
+                    is_booked=n % 7 == 0,
+                    session_price=Decimal(300 + (i % 10) * 50),
+                )
+                for i, user in enumerate(users) for n in range(slots)
+            ], batch_size=5000)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {MentorAvailability._meta.db_table}")
+                cursor.execute(f"ANALYZE {UserProfile._meta.db_table}")
+        self.stdout.write(f"Generated in {time.perf_counter() - start:.1f}s")
+
+    def cleanup(self):
+        bench = User.objects.filter(email__startswith=EMAIL_PREFIX)
+        with transaction.atomic():
+            MentorAvailability.objects.filter(mentor__in=bench).delete()
+            UserProfile.objects.filter(user__in=bench).delete()
+            deleted, _ = bench.delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted the synthetic mentors ({deleted} rows with their dependents)."))
@@ -0,0 +1,102 @@
+# mentorship/management/commands/bench_slot_overlaps.py
+# python manage.py bench_slot_overlaps [--mentors 50] [--days 30] [--per-day 8]
+#
+# Creates `mentors` synthetic mentors (bench_slots_<n>@example.com) and gives each a month of slots
+# (`days` x `per-day` one-hour slots): half of them through MentorAvailability.objects.add_slots(),
+# which locks the mentor and checks every slot for overlaps, half with a plain bulk_create() for
+# comparison. Then it re-submits every checked month shifted by 30 minutes (all of it clashes) with
+# skip_conflicts, and times the single-slot check the slot serializer runs. Everything is deleted
+# at the end.
+
+import statistics
+import time
+from datetime import datetime, time as time_of_day, timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from mentorship.models import MentorAvailability
+from users.models import Role
+
+User = get_user_model()
+
+EMAIL_PREFIX = 'bench_slots_'
+
+
+def month_of_slots(mentor, days, per_day, shift=0):
+    start = timezone.localdate() + timedelta(days=1)
+    slots = []
+    for day in range(days):
+        for n in range(per_day):
+            begin = datetime.combine(start + timedelta(days=day), time_of_day(8 + n)) + timedelta(minutes=shift)
+            slots.append(MentorAvailability(
+                mentor=mentor,
+                date=begin.date(),
+                start_time=begin.time(),
+                end_time=(begin + timedelta(hours=1)).time(),
+                session_price=Decimal(500),
+            ))
+    return slots
+
+
+class Command(BaseCommand):
+    help = "Cost of the overlap check when mentors create a month of slots at once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mentors', type=int, default=50)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--per-day', type=int, default=8, help="One-hour slots per day, from 08:00 (at most 15).")
+
+    def handle(self, *args, **options):
+        self.cleanup()
+        days, per_day = options['days'], min(options['per_day'], 15)
+        role, _ = Role.objects.get_or_create(name='Mentor')
+        mentors = User.objects.bulk_create([
+            User(email=f"{EMAIL_PREFIX}{i}@example.com", password='!', role=role, is_active=True)
+            for i in range(options['mentors'])
+        ])
+        checked, plain = mentors[::2], mentors[1::2]
+        try:
+            self.report("bulk_create, no check", plain, lambda mentor: MentorAvailability.objects.bulk_create(
+                month_of_slots(mentor, days, per_day), batch_size=1000))
+            self.report("add_slots", checked, lambda mentor: MentorAvailability.objects.add_slots(
+                mentor.id, month_of_slots(mentor, days, per_day)))
+            self.report("add_slots, all clash", checked, lambda mentor: MentorAvailability.objects.add_slots(
+                mentor.id, month_of_slots(mentor, days, per_day, shift=30), skip_conflicts=True))
+
+            mentor = checked[0]
+            one = month_of_slots(mentor, 1, 1, shift=30)
+            timings = []
+            for _ in range(200):
+                begin = time.perf_counter()
+                clashes = MentorAvailability.objects.conflicts(mentor.id, one)
+                timings.append(time.perf_counter() - begin)
+            self.stdout.write(f"{'one slot (serializer)':<24} | median {statistics.median(timings) * 1000:7.2f} ms | {len(clashes)} clash found")
+
+            try:
+                MentorAvailability.objects.add_slots(mentor.id, one)
+                self.stdout.write(self.style.ERROR("An overlapping slot was accepted!"))
+            except ValidationError as e:
+                self.stdout.write(f"Rejected as expected: {e.messages[0]}")
+        finally:
+            self.cleanup()
+
+    def report(self, label, mentors, create):
+        timings = []
+        slots = 0
+        for mentor in mentors:
+            begin = time.perf_counter()
+            with transaction.atomic():
+                slots += len(create(mentor))
+            timings.append(time.perf_counter() - begin)
+        self.stdout.write(
+            f"{label:<24} | {slots:>6} slots inserted | per mentor-month median {statistics.median(timings) * 1000:7.1f} ms, "
+            f"max {max(timings) * 1000:7.1f} ms"
+        )
+
+    def cleanup(self):
+        bench = User.objects.filter(email__startswith=EMAIL_PREFIX)
+        MentorAvailability.objects.filter(mentor__in=bench).delete()
+        bench.delete()
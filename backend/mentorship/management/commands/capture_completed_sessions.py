@@ -0,0 +1,38 @@
+# mentorship/management/commands/capture_completed_sessions.py
+# python manage.py capture_completed_sessions  (run periodically, e.g. from cron)
+
+from django.core.management.base import BaseCommand
+from mentorship.models import SessionBooking
+from mentorship.utils import capture_session_payment
+import logging
+import stripe
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Capture the held payment of every completed session that hasn't been captured yet."
+
+    def handle(self, *args, **options):
+        pending = SessionBooking.objects.filter(
+            status=SessionBooking.Status.COMPLETED,
+            # CAPTURING: claimed by an attempt that didn't get to record its result
+            payment_status__in=[SessionBooking.PaymentStatus.HOLDING, SessionBooking.PaymentStatus.CAPTURING],
+            stripe_payment_intent_id__isnull=False,
+        ).values_list('id', flat=True)
+
+        captured = failed = 0
+        for booking_id in list(pending):
+            # one failing session mustn't stop the sweep
+            try:
+                if capture_session_payment(booking_id):
+                    captured += 1
+            except stripe.error.StripeError as e:
+                failed += 1
+                self.stderr.write(f"Booking {booking_id}: {e}")
+            except Exception as e:
+                failed += 1
+                logger.exception(f"Payment capture for booking {booking_id} failed: {e}")
+                self.stderr.write(f"Booking {booking_id}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Captured {captured} payments, {failed} failed."))
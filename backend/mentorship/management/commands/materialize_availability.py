@@ -0,0 +1,45 @@
+# mentorship/management/commands/materialize_availability.py
+# python manage.py materialize_availability [--horizon 90] [--mentor <id>]  (run daily, e.g. from cron)
+#
+# Extends every active AvailabilityRule that is behind today + horizon days (MENTOR_AVAILABILITY_HORIZON_DAYS
+# by default) from the day after its materialized_through, one mentor per transaction. Run daily, each
+# rule gets a day of slots; a rule that was missed for a while catches up in one go.
+
+from datetime import timedelta
+from itertools import groupby
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.utils import timezone
+from mentorship.models import AvailabilityRule
+from mentorship.recurring import extend
+
+
+class Command(BaseCommand):
+    help = "Expand recurring availability rules into slots up to the rolling horizon."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon', type=int, default=settings.MENTOR_AVAILABILITY_HORIZON_DAYS,
+                            help="Days ahead of today to expand to.")
+        parser.add_argument('--mentor', type=int, help="Only this mentor's rules.")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        through = today + timedelta(days=options['horizon'])
+        behind = AvailabilityRule.objects.filter(
+            Q(materialized_through__isnull=True) | Q(materialized_through__lt=through),
+            is_active=True,
+        ).exclude(
+            valid_until__lt=today
+        ).exclude(
+            materialized_through__gte=F('valid_until')  # expanded to its last day already
+        )
+        if options['mentor']:
+            behind = behind.filter(mentor_id=options['mentor'])
+
+        mentors = slots = 0
+        for mentor_id, rules in groupby(behind.order_by('mentor_id', 'id').iterator(chunk_size=2000), key=lambda rule: rule.mentor_id):
+            slots += extend(mentor_id, list(rules), through=through)
+            mentors += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Extended the rules of {mentors} mentors to {through}: {slots} slots created."))
@@ -1,10 +1,172 @@
-from django.db import models
+from collections import defaultdict
+from django.db import connection, models, transaction
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from cloudinary.models import CloudinaryField
 
 User = get_user_model()
 
+# ----------------------
+# Overlap checks
+# ----------------------
+# Slots and bookings are half-open [start_time, end_time) intervals on one date; two of them overlap
+# when each starts before the other ends (10:00-11:00 and 11:00-12:00 don't). Writes for a mentor
+# take a transaction-scoped advisory lock first, so two requests can't both pass the check.
+SLOT_LOCK = 1
+BOOKING_LOCK = 2
+
+
+def lock_mentor(namespace, mentor_id):
+    """Serialize the slot (or booking) writes of one mentor until the transaction ends. Call inside atomic()."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", [namespace, mentor_id])
+
+
+def overlapping(intervals):
+    """
+    (earlier, later) pairs of overlapping intervals among objects with start_time/end_time on the same
+    date: one sort and a sweep that remembers the interval reaching furthest so far.
+    """
+    pairs = []
+    reach = None
+    for interval in sorted(intervals, key=lambda interval: (interval.start_time, interval.end_time)):
+        if reach is not None and interval.start_time < reach.end_time:
+            pairs.append((reach, interval))
+        if reach is None or interval.end_time > reach.end_time:
+            reach = interval
+    return pairs
+
+
+def describe(interval):
+    return f"{interval.date} {interval.start_time:%H:%M}-{interval.end_time:%H:%M}"
+
+
+class MentorAvailabilityManager(models.Manager):
+    def conflicts(self, mentor_id, slots, exclude_id=None):
+        """(new slot, clashing slot) pairs for unsaved `slots` of one mentor, against each other and the saved ones."""
+        new = {id(slot) for slot in slots}
+        by_day = defaultdict(list)
+        saved = self.filter(mentor_id=mentor_id, date__in={slot.date for slot in slots})
+        if exclude_id is not None:
+            saved = saved.exclude(id=exclude_id)
+        for slot in saved.only('id', 'date', 'start_time', 'end_time'):
+            by_day[slot.date].append(slot)
+        for slot in slots:
+            by_day[slot.date].append(slot)
+
+        clashes = []
+        for day in by_day.values():
+            for earlier, later in overlapping(day):
+                if id(later) in new:
+                    clashes.append((later, earlier))
+                elif id(earlier) in new:
+                    clashes.append((earlier, later))
+                # two saved slots overlapping each other predate the check, they don't block new ones
+        return clashes
+
+    def add_slots(self, mentor_id, slots, skip_conflicts=False, batch_size=1000):
+        """
+        Insert unsaved slots of one mentor in bulk after checking them for overlaps. Raises ValidationError
+        listing the clashes, or with skip_conflicts leaves the clashing new slots out. Returns the inserted slots.
+        """
+        for slot in slots:
+            if slot.end_time <= slot.start_time:
+                raise ValidationError(f"Slot {describe(slot)} must end after it starts.")
+        with transaction.atomic():
+            lock_mentor(SLOT_LOCK, mentor_id)
+            clashes = self.conflicts(mentor_id, slots)
+            if clashes and not skip_conflicts:
+                raise ValidationError([
+                    f"Slot {describe(new)} overlaps {'your slot' if other.pk else 'another new slot'} {describe(other)}."
+                    for new, other in clashes
+                ])
+            skipped = {id(new) for new, _ in clashes}
+            slots = [slot for slot in slots if id(slot) not in skipped]
+            return self.bulk_create(slots, batch_size=batch_size, ignore_conflicts=skip_conflicts)
+
+
+class SessionBookingManager(models.Manager):
+    def conflicts(self, mentor_id, date, start_time, end_time, exclude_id=None):
+        """Pending or confirmed bookings of the mentor overlapping [start_time, end_time) on `date`."""
+        clashing = self.filter(
+            mentor_id=mentor_id,
+            date=date,
+            start_time__lt=end_time,
+            end_time__gt=start_time,
+            status__in=[self.model.Status.PENDING, self.model.Status.CONFIRMED],
+        )
+        if exclude_id is not None:
+            clashing = clashing.exclude(id=exclude_id)
+        return clashing
+
+    def book(self, **fields):
+        """create() after the overlap check, under the mentor's booking lock; ValidationError on a clash."""
+        with transaction.atomic():
+            lock_mentor(BOOKING_LOCK, fields['mentor'].id)
+            clash = self.conflicts(
+                fields['mentor'].id, fields['date'], fields['start_time'], fields['end_time']
+            ).only('date', 'start_time', 'end_time').first()
+            if clash is not None:
+                raise ValidationError(f"The mentor already has a session booked at {describe(clash)}.")
+            return self.create(**fields)
+
+
+# ----------------------
+# Recurring Availability
+# ----------------------
+# Weekly patterns expanded into MentorAvailability rows up to a rolling horizon, see mentorship/recurring.py
+class AvailabilityRule(models.Model):
+    mentor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        limit_choices_to={'role__name': 'Mentor'},
+        related_name='availability_rules'
+    )
+    weekdays = models.JSONField(default=list, help_text="Days of the week, 0 = Monday ... 6 = Sunday")
+    start_time = models.TimeField(help_text="Start of the daily window")
+    end_time = models.TimeField(help_text="End of the daily window")
+    slot_minutes = models.PositiveSmallIntegerField(default=60, help_text="The window is cut into slots this long")
+    session_price = models.DecimalField(max_digits=6, decimal_places=2, help_text="Price in INR")
+    valid_from = models.DateField(default=timezone.localdate)
+    valid_until = models.DateField(blank=True, null=True)
+    is_active = models.BooleanField(default=True)
+    materialized_through = models.DateField(blank=True, null=True, help_text="Slots exist up to this date")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # rules behind the horizon, for materialize_availability
+            models.Index(
+                fields=['materialized_through'], condition=models.Q(is_active=True),
+                name='active_rule_horizon_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.mentor.email} - {self.weekdays} {self.start_time}-{self.end_time}"
+
+
+class AvailabilityException(models.Model):
+    # a day (or, with start_time/end_time, part of one) the mentor's rules skip
+    mentor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='availability_exceptions')
+    date = models.DateField()
+    start_time = models.TimeField(blank=True, null=True)
+    end_time = models.TimeField(blank=True, null=True)
+    reason = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        ordering = ['date', 'start_time']
+        indexes = [models.Index(fields=['mentor', 'date'])]
+
+    def __str__(self):
+        window = f" {self.start_time}-{self.end_time}" if self.start_time else ""
+        return f"{self.mentor.email} - off {self.date}{window}"
+
+
 # ----------------------
 # Mentor Availability
 # ----------------------
@@ -20,10 +182,32 @@ class MentorAvailability(models.Model):
     end_time = models.TimeField()
     is_booked = models.BooleanField(default=False)
     session_price = models.DecimalField(max_digits=6, decimal_places=2, help_text="Price in INR")
+    rule = models.ForeignKey(
+        AvailabilityRule,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='slots',
+        help_text="The recurring rule this slot was materialized from"
+    )
+
+    objects = MentorAvailabilityManager()
 
     class Meta:
         unique_together = ('mentor', 'date', 'start_time')
         ordering = ['date', 'start_time']
+        indexes = [
+            # "has an open slot (in a price range)" for the mentor directory, see mentorship/directory.py
+            models.Index(
+                fields=['mentor', 'date', 'session_price'], condition=models.Q(is_booked=False),
+                name='mentor_open_slot_idx',
+            ),
+            # open slots across all mentors in start order (slot search, search_open_slots())
+            models.Index(
+                fields=['date', 'start_time', 'id'], condition=models.Q(is_booked=False),
+                name='open_slot_start_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.mentor.email} - {self.date} {self.start_time}-{self.end_time}"
@@ -42,6 +226,7 @@ class SessionBooking(models.Model):
 
     class PaymentStatus(models.TextChoices):
         HOLDING = 'holding', 'Holding'
+        CAPTURING = 'capturing', 'Capturing'  # claimed by capture_session_payment, Stripe call in flight
         RELEASED = 'released', 'Released to Mentor'
         REFUNDED = 'refunded', 'Refunded'
 
@@ -64,6 +249,8 @@ class SessionBooking(models.Model):
     captured_at = models.DateTimeField(blank=True, null=True)
     is_payment_captured = models.BooleanField(default=False)
 
+    objects = SessionBookingManager()
+
     class Meta:
         unique_together = ('mentor', 'date', 'start_time')
         ordering = ['-created_at']
@@ -0,0 +1,33 @@
+# backend/mentorship/pagination.py
+
+import base64
+import binascii
+from django.utils.dateparse import parse_date, parse_time
+from rest_framework.pagination import PageNumberPagination
+
+
+class MentorDirectoryPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+
+# ----------------------------
+# Keyset (date, start_time, id) cursors for slot search
+# ----------------------------
+def encode_slot_cursor(slot):
+    raw = f"{slot.date.isoformat()}|{slot.start_time.isoformat()}|{slot.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_slot_cursor(cursor):
+    """Returns (date, start_time, id); raises ValueError for anything that isn't a cursor we issued."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        day, start, slot_id = raw.split('|')
+        day, start = parse_date(day), parse_time(start)
+        if day is None or start is None:
+            raise ValueError
+        return day, start, int(slot_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError("Invalid cursor.")
@@ -0,0 +1,153 @@
+# backend/mentorship/recurring.py
+# Recurring availability: an AvailabilityRule (weekdays, a daily window cut into slot_minutes slots,
+# a price, valid_from/valid_until) is expanded into MentorAvailability rows up to a rolling horizon,
+# MENTOR_AVAILABILITY_HORIZON_DAYS after today.
+#
+# Each rule remembers the last day it has been expanded to (materialized_through), so extending is
+# incremental: the daily materialize_availability run only adds the days that came into the horizon.
+# All new slots of a mentor go through MentorAvailability.objects.add_slots(skip_conflicts=True), i.e.
+# one lock, one overlap query over the saved slots of those dates and a bulk_create(ignore_conflicts=True)
+# per 1000 rows; an occurrence clashing with a saved slot (a manual one, a booked one, another rule's)
+# is left out instead of failing the batch, which is why the number inserted is counted over the window
+# (before and after, under the mentor's slot lock) rather than taken from bulk_create. AvailabilityException days or windows are skipped, and
+# adding one withdraws the open rule slots it covers.
+#
+# Only open slots that haven't started are ever withdrawn; booked and past ones stay, and when a rule
+# is deleted they keep existing without it (rule = NULL). A rule slot the mentor deletes by hand isn't
+# put back, its day is behind the rule's materialized_through.
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .directory import upcoming_slots
+from .models import SLOT_LOCK, AvailabilityException, AvailabilityRule, MentorAvailability, lock_mentor
+
+
+def horizon():
+    """The last day rules are expanded to."""
+    return timezone.localdate() + timedelta(days=settings.MENTOR_AVAILABILITY_HORIZON_DAYS)
+
+
+def occurrences(rule, first, last):
+    """Unsaved slots of the rule on the days in [first, last] within its validity."""
+    first = max(first, rule.valid_from)
+    if rule.valid_until is not None:
+        last = min(last, rule.valid_until)
+    weekdays = set(rule.weekdays)
+    length = timedelta(minutes=rule.slot_minutes)
+    day = first
+    while day <= last:
+        if day.weekday() in weekdays:
+            begin = datetime.combine(day, rule.start_time)
+            close = datetime.combine(day, rule.end_time)
+            while begin + length <= close:
+                yield MentorAvailability(
+                    mentor_id=rule.mentor_id,
+                    rule=rule,
+                    date=day,
+                    start_time=begin.time(),
+                    end_time=(begin + length).time(),
+                    session_price=rule.session_price,
+                )
+                begin += length
+        day += timedelta(days=1)
+
+
+def _blocked(slot, exceptions):
+    for exception in exceptions.get(slot.date, ()):
+        if exception.start_time is None:
+            return True
+        if slot.start_time < exception.end_time and exception.start_time < slot.end_time:
+            return True
+    return False
+
+
+def materialize(mentor_id, windows):
+    """
+    Insert the occurrences of (rule, first day, last day) windows of one mentor that aren't excepted,
+    haven't started and don't clash with a saved slot. Returns how many were inserted.
+    """
+    windows = [(rule, first, last) for rule, first, last in windows if first <= last]
+    if not windows:
+        return 0
+    current = timezone.localtime()
+    window = (min(first for _, first, _ in windows), max(last for _, _, last in windows))
+    exceptions = defaultdict(list)
+    for exception in AvailabilityException.objects.filter(mentor_id=mentor_id, date__range=window):
+        exceptions[exception.date].append(exception)
+
+    slots = [
+        slot
+        for rule, first, last in windows
+        for slot in occurrences(rule, max(first, current.date()), last)
+        if not _blocked(slot, exceptions)
+        and (slot.date > current.date() or slot.start_time > current.time())
+    ]
+    if not slots:
+        return 0
+    saved = MentorAvailability.objects.filter(mentor_id=mentor_id, date__range=window)
+    with transaction.atomic():
+        # the same advisory lock add_slots takes (it's re-entrant), so no other write lands between the counts
+        lock_mentor(SLOT_LOCK, mentor_id)
+        before = saved.count()
+        MentorAvailability.objects.add_slots(mentor_id, slots, skip_conflicts=True)
+        return saved.count() - before
+
+
+def extend(mentor_id, rules, through=None):
+    """
+    Expand the active rules of one mentor up to `through` (the horizon by default) from where each stopped.
+    Returns how many slots were inserted.
+    """
+    through = through or horizon()
+    today = timezone.localdate()
+    rules = [
+        rule for rule in rules
+        if rule.is_active and (rule.materialized_through is None or rule.materialized_through < through)
+    ]
+    if not rules:
+        return 0
+    windows = [
+        (rule, today if rule.materialized_through is None else max(today, rule.materialized_through + timedelta(days=1)), through)
+        for rule in rules
+    ]
+    with transaction.atomic():
+        inserted = materialize(mentor_id, windows)
+        AvailabilityRule.objects.filter(id__in=[rule.id for rule in rules]).update(materialized_through=through)
+    for rule in rules:
+        rule.materialized_through = through
+    return inserted
+
+
+def withdraw(rule):
+    """Delete the open slots of the rule that haven't started. Returns how many."""
+    return upcoming_slots().filter(rule=rule, is_booked=False).delete()[0]
+
+
+def republish(rule):
+    """After the rule changed: swap its open upcoming slots for freshly expanded ones."""
+    with transaction.atomic():
+        withdraw(rule)
+        rule.materialized_through = None
+        rule.save(update_fields=['materialized_through'])
+        return extend(rule.mentor_id, [rule])
+
+
+def apply_exception(exception):
+    """Withdraw the open upcoming rule slots a new exception covers. Returns how many."""
+    slots = upcoming_slots().filter(
+        mentor_id=exception.mentor_id, date=exception.date, rule__isnull=False, is_booked=False
+    )
+    if exception.start_time is not None:
+        slots = slots.filter(start_time__lt=exception.end_time, end_time__gt=exception.start_time)
+    return slots.delete()[0]
+
+
+def lift_exception(exception):
+    """Once an exception is deleted, put back the slots of the rules already expanded past its day."""
+    rules = AvailabilityRule.objects.filter(
+        mentor_id=exception.mentor_id, is_active=True, materialized_through__gte=exception.date
+    )
+    return materialize(exception.mentor_id, [(rule, exception.date, exception.date) for rule in rules])
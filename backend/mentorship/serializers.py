@@ -1,8 +1,15 @@
 from rest_framework import serializers
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from users.models import UserProfile
 from .models import (
+    AvailabilityException,
+    AvailabilityRule,
     MentorAvailability,
-    SessionBooking
+    SessionBooking,
+    SLOT_LOCK,
+    describe,
+    lock_mentor,
 )
 from django.contrib.auth import get_user_model
 from datetime import datetime, time
@@ -50,10 +57,11 @@ class MentorAvailabilitySerializer(serializers.ModelSerializer):
             'time_slot_duration',
             'is_booked',
             'session_price',
+            'rule',
         ]
         read_only_fields = [
             'id', 'mentor', 'mentor_email', 'mentor_name', 'mentor_profile_picture',
-            'is_booked', 'time_slot_duration',
+            'is_booked', 'time_slot_duration', 'rule',
             'start_time_iso', 'end_time_iso',
             'start_time_ampm', 'end_time_ampm'
         ]
@@ -88,15 +96,33 @@ class MentorAvailabilitySerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         request = self.context.get('request')
         validated_data['mentor'] = request.user
-        return super().create(validated_data)
+        # the overlap check again, under the mentor's lock, in case another request got in since validate()
+        try:
+            return MentorAvailability.objects.add_slots(request.user.id, [MentorAvailability(**validated_data)])[0]
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'non_field_errors': e.messages})
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            lock_mentor(SLOT_LOCK, instance.mentor_id)
+            slot = MentorAvailability(
+                mentor_id=instance.mentor_id,
+                date=validated_data.get('date', instance.date),
+                start_time=validated_data.get('start_time', instance.start_time),
+                end_time=validated_data.get('end_time', instance.end_time),
+            )
+            if MentorAvailability.objects.conflicts(instance.mentor_id, [slot], exclude_id=instance.id):
+                raise serializers.ValidationError("This slot overlaps another of your slots.")
+            return super().update(instance, validated_data)
     
     def validate_date(self, value):
         if value < date.today():
             raise serializers.ValidationError("You cannot create a slot for a past date.")
         return value
     def validate(self, attrs):
-        selected_date = attrs.get("date")
-        start_time = attrs.get("start_time")
+        selected_date = attrs.get("date", getattr(self.instance, 'date', None))
+        start_time = attrs.get("start_time", getattr(self.instance, 'start_time', None))
+        end_time = attrs.get("end_time", getattr(self.instance, 'end_time', None))
 
         if selected_date == date.today():
             # Get current local time (timezone-aware)
@@ -107,15 +133,107 @@ class MentorAvailabilitySerializer(serializers.ModelSerializer):
                     "start_time": "Start time must be in the future for today's date."
                 })
 
+        if start_time and end_time and end_time <= start_time:
+            raise serializers.ValidationError({"end_time": "End time must be after the start time."})
+
+        # early, friendly answer; create()/update() repeat the check under the lock
+        request = self.context.get('request')
+        if self.instance is not None:
+            mentor_id = self.instance.mentor_id
+        else:
+            mentor_id = request.user.id if request else None
+        if mentor_id and selected_date and start_time and end_time:
+            slot = MentorAvailability(date=selected_date, start_time=start_time, end_time=end_time)
+            clashes = MentorAvailability.objects.conflicts(mentor_id, [slot], exclude_id=getattr(self.instance, 'id', None))
+            if clashes:
+                raise serializers.ValidationError(
+                    f"This slot overlaps your slot {describe(clashes[0][1])}."
+                )
+
         return attrs
-    
+
+
+# ------------------------------
+# Recurring Availability Serializers
+# ------------------------------
+class AvailabilityRuleSerializer(serializers.ModelSerializer):
+    MIN_SLOT_MINUTES = 15
+    MAX_SLOT_MINUTES = 240
+
+    class Meta:
+        model = AvailabilityRule
+        fields = [
+            'id',
+            'weekdays',
+            'start_time',
+            'end_time',
+            'slot_minutes',
+            'session_price',
+            'valid_from',
+            'valid_until',
+            'is_active',
+            'materialized_through',
+            'created_at',
+        ]
+        read_only_fields = ['id', 'materialized_through', 'created_at']
+
+    def validate_weekdays(self, value):
+        if not isinstance(value, list) or not value:
+            raise serializers.ValidationError("Pick at least one day of the week.")
+        if any(not isinstance(day, int) or isinstance(day, bool) or not 0 <= day <= 6 for day in value):
+            raise serializers.ValidationError("Days of the week are numbers from 0 (Monday) to 6 (Sunday).")
+        return sorted(set(value))
+
+    def validate_slot_minutes(self, value):
+        if not self.MIN_SLOT_MINUTES <= value <= self.MAX_SLOT_MINUTES:
+            raise serializers.ValidationError(
+                f"Slots last between {self.MIN_SLOT_MINUTES} and {self.MAX_SLOT_MINUTES} minutes."
+            )
+        return value
+
+    def validate(self, attrs):
+        start_time = attrs.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = attrs.get('end_time', getattr(self.instance, 'end_time', None))
+        slot_minutes = attrs.get('slot_minutes', getattr(self.instance, 'slot_minutes', 60))
+        valid_from = attrs.get('valid_from', getattr(self.instance, 'valid_from', None))
+        valid_until = attrs.get('valid_until', getattr(self.instance, 'valid_until', None))
+
+        if start_time and end_time:
+            if end_time <= start_time:
+                raise serializers.ValidationError({"end_time": "End time must be after the start time."})
+            window = datetime.combine(date.min, end_time) - datetime.combine(date.min, start_time)
+            if window.total_seconds() < slot_minutes * 60:
+                raise serializers.ValidationError({"slot_minutes": "The daily window is shorter than one slot."})
+        if valid_from and valid_until and valid_until < valid_from:
+            raise serializers.ValidationError({"valid_until": "The rule must end on or after the day it starts."})
+        return attrs
+
+
+class AvailabilityExceptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AvailabilityException
+        fields = ['id', 'date', 'start_time', 'end_time', 'reason']
+        read_only_fields = ['id']
+
+    def validate_date(self, value):
+        if value < date.today():
+            raise serializers.ValidationError("You cannot add an exception for a past date.")
+        return value
+
+    def validate(self, attrs):
+        start_time, end_time = attrs.get('start_time'), attrs.get('end_time')
+        if (start_time is None) != (end_time is None):
+            raise serializers.ValidationError("Give both a start and an end time, or neither for the whole day.")
+        if start_time and end_time <= start_time:
+            raise serializers.ValidationError({"end_time": "End time must be after the start time."})
+        return attrs
+
 
 # ------------------------------
 # Mentor Public Profile Serializer
 # ------------------------------
 from rest_framework import serializers
 from mentorship.models import MentorAvailability
-from mentorship.serializers import MentorAvailabilitySerializer 
 from django.utils.timezone import now
 
 class MentorPublicProfileSerializer(serializers.ModelSerializer):
@@ -139,11 +257,26 @@ class MentorPublicProfileSerializer(serializers.ModelSerializer):
         ]
 
     def get_slots(self, obj):
-        upcoming = MentorAvailability.objects.filter(
-            mentor=obj.user,
-            date__gte=now().date()
-        ).order_by('date', 'start_time')
-        return MentorAvailabilitySerializer(upcoming, many=True).data
+        # MentorListAPIView prefetches these for the whole page (to_attr='upcoming_slots')
+        upcoming = getattr(obj.user, 'upcoming_slots', None)
+        if upcoming is None:
+            upcoming = MentorAvailability.objects.filter(
+                mentor=obj.user,
+                date__gte=now().date()
+            ).order_by('date', 'start_time')
+        return [self.slot_summary(slot) for slot in upcoming]
+
+    @staticmethod
+    def slot_summary(slot):
+        # the directory only needs when and how much; the booking page loads full slots by mentor
+        return {
+            'id': slot.id,
+            'date': slot.date.isoformat(),
+            'start_time': slot.start_time.isoformat(),
+            'end_time': slot.end_time.isoformat(),
+            'is_booked': slot.is_booked,
+            'session_price': str(slot.session_price),
+        }
 
 
 
@@ -214,16 +347,12 @@ class SessionBookingSerializer(serializers.ModelSerializer):
         if not all([mentor, date, start_time]):
             raise serializers.ValidationError("Missing required booking fields.")
 
-        # Prevent duplicate slot
-        if SessionBooking.objects.filter(
-            mentor=mentor,
-            date=date,
-            start_time=start_time,
-            status__in=[
-                SessionBooking.Status.PENDING,
-                SessionBooking.Status.CONFIRMED
-            ]
-        ).exists():
+        end_time = data.get('end_time')
+        if not end_time or end_time <= start_time:
+            raise serializers.ValidationError("End time must be after the start time.")
+
+        # Prevent overlapping sessions with the mentor (not just the same start time)
+        if SessionBooking.objects.conflicts(mentor.id, date, start_time, end_time).exists():
             raise serializers.ValidationError("This time slot is already booked.")
         return data
 
@@ -236,7 +365,10 @@ class SessionBookingSerializer(serializers.ModelSerializer):
             f"date={validated_data.get('date')}, start={validated_data.get('start_time')}"
         )
 
-        return super().create(validated_data)
+        try:
+            return SessionBooking.objects.book(**validated_data)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
 
     def get_is_completed_and_paid(self, obj):
         return obj.status == "completed" and obj.payment_status == "released"
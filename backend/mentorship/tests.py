@@ -1,3 +1,62 @@
+from datetime import time, timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import Role, UserProfile
+from .models import MentorAvailability
 
-# Create your tests here.
+User = get_user_model()
+
+
+class MentorDirectoryQueryTests(TestCase):
+    """
+    A page of the mentor directory costs the same few queries whatever the number of mentors and slots:
+    the count, the page of profiles joined to their users, the page's upcoming slots and the facet counts.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor_role = Role.objects.create(name='Mentor')
+        cls.viewer = User.objects.create_user(email='viewer@example.com', password='pass', is_active=True)
+
+    def add_mentors(self, count, slots=3):
+        first = User.objects.count()
+        mentors = User.objects.bulk_create([
+            User(email=f'mentor{first + n}@example.com', password='!', role=self.mentor_role, is_active=True)
+            for n in range(count)
+        ])
+        UserProfile.objects.bulk_create([
+            UserProfile(
+                user=mentor, full_name=mentor.email, preferred_categories=['Design'], languages_known=['English'],
+                experience_years=n, is_approved=True,
+            )
+            for n, mentor in enumerate(mentors)
+        ])
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        MentorAvailability.objects.bulk_create([
+            MentorAvailability(
+                mentor=mentor, date=tomorrow, start_time=time(9 + n), end_time=time(10 + n), session_price=Decimal(500),
+            )
+            for mentor in mentors for n in range(slots)
+        ])
+
+    def fetch(self, **params):
+        client = APIClient()
+        client.force_authenticate(user=self.viewer)
+        return client.get(reverse('mentor-list'), params)
+
+    def test_query_count_does_not_grow_with_mentors(self):
+        self.add_mentors(3)
+        with self.assertNumQueries(4):
+            response = self.fetch()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results'][0]['slots']), 3)
+
+        self.add_mentors(40, slots=8)
+        with self.assertNumQueries(4):
+            response = self.fetch(page_size=50)
+        self.assertEqual(len(response.data['results']), 43)
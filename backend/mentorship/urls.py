@@ -2,9 +2,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     MentorAvailabilityViewSet,
+    AvailabilityRuleViewSet,
+    AvailabilityExceptionViewSet,
     SessionBookingViewSet,
     MySessionsAPIView,
     MentorListAPIView,
+    SlotSearchAPIView,
     ReviewCreateAPIView, ReviewDetailAPIView,
     FeedbackUploadAPIView, 
     FeedbackBySessionAPIView, FeedbackRetrieveAPIView,
@@ -16,6 +19,8 @@ from .views import handle_mentor_session_booking, capture_mentor_session_payment
 
 router = DefaultRouter()
 router.register(r'availability', MentorAvailabilityViewSet, basename='availability')
+router.register(r'availability-rules', AvailabilityRuleViewSet, basename='availability-rules')
+router.register(r'availability-exceptions', AvailabilityExceptionViewSet, basename='availability-exceptions')
 router.register(r'session-bookings', SessionBookingViewSet, basename='session-bookings')
 
 
@@ -24,6 +29,7 @@ urlpatterns = [
 
     # Custom API views
     path('mentors/', MentorListAPIView.as_view(), name='mentor-list'),
+    path('slots/search/', SlotSearchAPIView.as_view(), name='slot-search'),
     path('my-sessions/', MySessionsAPIView.as_view(), name='my-sessions'),
 
     path('book-session/', handle_mentor_session_booking, name='book-mentor-session'),
@@ -1,6 +1,13 @@
+import logging
 import stripe
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
-from .models import StripeAccount
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import SessionBooking, StripeAccount
+
+logger = logging.getLogger(__name__)
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
@@ -35,4 +42,88 @@ def create_stripe_customer(user):
     customer = stripe.Customer.create(email=user.email)
     user.stripe_customer_id = customer.id
     user.save()
-    return customer.id
\ No newline at end of file
+    return customer.id
+
+
+# completing a session ----------------------------------------------
+def complete_session(session_id):
+    # single conditional UPDATE: only a confirmed session that has started (server local time, like
+    # can_join) is completed, and when both peers hang up only the first call changes anything
+    current = timezone.localtime()
+    updated = SessionBooking.objects.filter(
+        Q(date__lt=current.date()) | Q(date=current.date(), start_time__lte=current.time()),
+        id=session_id,
+        status=SessionBooking.Status.CONFIRMED,
+    ).update(status=SessionBooking.Status.COMPLETED)
+    return updated == 1
+
+
+# capturing the held payment of a completed session ----------------------------------------------
+# Three steps, so no row lock is held during the Stripe call: claim the booking (HOLDING -> CAPTURING)
+# and commit, capture with an idempotency key, then record the result (CAPTURING -> RELEASED plus the
+# wallet credit) with a conditional UPDATE that only one caller can win. A booking left in CAPTURING
+# by a crash is retried by capture_completed_sessions; Stripe answers the same key with the same result.
+def _capture_key(booking_id):
+    return f"capture-session-{booking_id}"
+
+
+def capture_session_payment(booking_id):
+    with transaction.atomic():
+        booking = SessionBooking.objects.select_for_update().filter(id=booking_id).first()
+        if booking is None or booking.payment_status not in (
+            SessionBooking.PaymentStatus.HOLDING, SessionBooking.PaymentStatus.CAPTURING
+        ):
+            return False
+        if not booking.stripe_payment_intent_id:
+            logger.warning(f"Booking {booking_id} has no payment intent to capture.")
+            return False
+        if booking.payment_status == SessionBooking.PaymentStatus.HOLDING:
+            SessionBooking.objects.filter(id=booking_id).update(payment_status=SessionBooking.PaymentStatus.CAPTURING)
+
+    try:
+        stripe.PaymentIntent.capture(booking.stripe_payment_intent_id, idempotency_key=_capture_key(booking_id))
+    except stripe.error.StripeError:
+        # captured already (e.g. by an earlier attempt whose key has expired)? then only the bookkeeping is missing
+        intent = stripe.PaymentIntent.retrieve(booking.stripe_payment_intent_id)
+        if intent.status != 'succeeded':
+            SessionBooking.objects.filter(
+                id=booking_id, payment_status=SessionBooking.PaymentStatus.CAPTURING
+            ).update(payment_status=SessionBooking.PaymentStatus.HOLDING)
+            raise
+
+    with transaction.atomic():
+        recorded = SessionBooking.objects.filter(
+            id=booking_id, payment_status=SessionBooking.PaymentStatus.CAPTURING
+        ).update(
+            payment_status=SessionBooking.PaymentStatus.RELEASED,
+            is_payment_captured=True,
+            captured_at=timezone.now(),
+        )
+        if not recorded:
+            return False  # a concurrent attempt recorded it
+        StripeAccount.objects.filter(user_id=booking.mentor_id, account_type="mentor").update(
+            wallet_balance=F('wallet_balance') + booking.mentor_payout
+        )
+    logger.info(f"Payment for booking {booking_id} captured.")
+    return True
+
+
+# one background worker: captures run one at a time and never on a request or websocket thread
+_capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='payment-capture')
+
+
+def _run_payment_capture(booking_id):
+    close_old_connections()
+    try:
+        capture_session_payment(booking_id)
+    except stripe.error.StripeError as e:
+        logger.error(f"Stripe capture error for booking {booking_id}: {str(e)}")
+    except Exception as e:
+        logger.exception(f"Payment capture for booking {booking_id} failed: {e}")
+    finally:
+        close_old_connections()
+
+
+def queue_payment_capture(booking_id):
+    # in-process hand-off; `manage.py capture_completed_sessions` picks up anything lost on a restart
+    return _capture_executor.submit(_run_payment_capture, booking_id)
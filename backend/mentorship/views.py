@@ -4,11 +4,15 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 import stripe.error
-from users.models import UserProfile
-from .models import MentorAvailability, SessionBooking, Review, Feedback, StripeAccount
+from .models import AvailabilityException, AvailabilityRule, MentorAvailability, SessionBooking, Review, Feedback, StripeAccount
+from .directory import facet_counts, filter_mentors, search_open_slots, upcoming_slots
+from .recurring import apply_exception, extend, lift_exception, republish, withdraw
+from .pagination import MentorDirectoryPagination
 from .serializers import (
     MentorPublicProfileSerializer,
     MentorAvailabilitySerializer,
+    AvailabilityRuleSerializer,
+    AvailabilityExceptionSerializer,
     SessionBookingSerializer,
     ReviewSerializer,
     FeedbackSerializer
@@ -25,8 +29,12 @@ from . serializers import StripeAccountSerializer
 from . models import MentorPayout
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Prefetch, Q
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.dateparse import parse_date, parse_datetime
 from .models import SessionBooking
 from .serializers import SessionBookingSerializer
 from rest_framework import status, permissions
@@ -50,17 +58,85 @@ logger = logging.getLogger(__name__)
 # Mentor Publicly Listing API View 
 # ----------------------------
 class MentorListAPIView(APIView):
+    # One page of mentors in four queries whatever its size: the count, the profiles joined to their
+    # users, the upcoming slots of the whole page (served by the (mentor, date, start_time) index) and
+    # the facet counts. Filters are listed in mentorship/directory.py.
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        category = request.query_params.get('category')  # e.g. "Data Science"
-        mentors = UserProfile.objects.filter(user__role__name="Mentor", is_approved=True)
+        try:
+            mentors = filter_mentors(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        facets = facet_counts(mentors)
+        mentors = mentors.select_related('user').prefetch_related(
+            Prefetch('user__available_slots', queryset=upcoming_slots(), to_attr='upcoming_slots')
+        ).order_by('-created_at', 'id')
+
+        paginator = MentorDirectoryPagination()
+        page = paginator.paginate_queryset(mentors, request, view=self)
+        serializer = MentorPublicProfileSerializer(page, many=True, context={'request': request})
+        response = paginator.get_paginated_response(serializer.data)
+        response.data['facets'] = facets
+        return response
+
+
+class SlotSearchAPIView(APIView):
+    # GET mentorship/slots/search/?from=<iso>&to=<iso>&category=...&max_price=...&cursor=...
+    # -> open slots of every mentor in the window, soonest first, see search_open_slots()
+    permission_classes = [IsAuthenticated]
+    default_limit = 20
+    max_limit = 50
+    max_window = timedelta(days=62)
+
+    @staticmethod
+    def parse_moment(value):
+        moment = parse_datetime(value) if 'T' in value else None
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(f"Invalid date/time: {value}")
+            moment = datetime.combine(day, datetime.min.time())
+        return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+    def get(self, request):
+        try:
+            start = self.parse_moment(request.query_params.get('from') or timezone.now().isoformat())
+            end = self.parse_moment(request.query_params['to']) if request.query_params.get('to') else start + timedelta(days=7)
+            if end <= start:
+                raise ValueError("'to' must be after 'from'.")
+            if end - start > self.max_window:
+                raise ValueError(f"The search window is limited to {self.max_window.days} days.")
+            max_price = request.query_params.get('max_price')
+            try:
+                max_price = Decimal(max_price) if max_price else None
+            except InvalidOperation:
+                raise ValueError("max_price must be a number.")
+            limit = max(1, min(int(request.query_params.get('limit', self.default_limit)), self.max_limit))
+            slots, next_cursor = search_open_slots(
+                start,
+                end,
+                categories=[value for value in request.query_params.getlist('category') if value],
+                max_price=max_price,
+                cursor=request.query_params.get('cursor'),
+                limit=limit,
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        results = []
+        for slot in slots:
+            profile = getattr(slot.mentor, 'user_profile', None)
+            results.append({
+                **MentorPublicProfileSerializer.slot_summary(slot),
+                'mentor_id': slot.mentor_id,
+                'mentor_name': profile.full_name if profile else None,
+                'mentor_profile_picture': profile.profile_picture.url if profile and profile.profile_picture else None,
+            })
+        return Response({'results': results, 'next': next_cursor})
 
-        if category:
-            mentors = mentors.filter(preferred_categories__icontains=category)
 
-        serializer = MentorPublicProfileSerializer(mentors, many=True, context={'request': request})
-        return Response(serializer.data)
 # ----------------------------
 # Mentor Availability (ViewSet)
 # ----------------------------
@@ -95,6 +171,66 @@ class MentorAvailabilityViewSet(viewsets.ModelViewSet):
         serializer.save(mentor=self.request.user)
 
 
+# ----------------------------
+# Recurring Availability (ViewSets)
+# ----------------------------
+class AvailabilityRuleViewSet(viewsets.ModelViewSet):
+    # POST one rule or a list of them -> their slots up to MENTOR_AVAILABILITY_HORIZON_DAYS ahead in a
+    # handful of queries whatever the count (see mentorship/recurring.py); materialize_availability
+    # keeps extending them. Editing a rule replaces its open upcoming slots, deleting it removes them.
+    serializer_class = AvailabilityRuleSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return AvailabilityRule.objects.filter(mentor=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        if request.user.role.name != 'Mentor':
+            return Response({'error': 'Only mentors can publish availability.'}, status=403)
+        many = isinstance(request.data, list)
+        serializer = self.get_serializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            rules = serializer.save(mentor=request.user)
+            inserted = extend(request.user.id, rules if many else [rules])
+        return Response({
+            'rules': serializer.data if many else [serializer.data],
+            'slots_created': inserted,
+        }, status=status.HTTP_201_CREATED)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            rule = serializer.save()
+            if rule.is_active:
+                republish(rule)
+            else:
+                withdraw(rule)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            withdraw(instance)
+            instance.delete()
+
+
+class AvailabilityExceptionViewSet(viewsets.ModelViewSet):
+    # days off (or hours off) the mentor's rules skip; adding one withdraws the open rule slots it covers
+    serializer_class = AvailabilityExceptionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+
+    def get_queryset(self):
+        return AvailabilityException.objects.filter(mentor=self.request.user)
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            apply_exception(serializer.save(mentor=self.request.user))
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            lift_exception(instance)
+
+
 # ----------------------------
 # create a stripe customer for payment
 # ----------------------------
@@ -162,6 +298,10 @@ def handle_mentor_session_booking(request):
             'onboarding_url': onboarding_link.url
         }, status=400)
 
+    # before charging anything: the mentor must be free for the whole session, book() checks again under a lock
+    if SessionBooking.objects.conflicts(mentor.id, date, start_time, end_time).exists():
+        return Response({'error': 'The mentor already has a session booked at this time.'}, status=400)
+
     stripe_customer_id = create_stripe_customer(user)
 
     platform_fee = round(amount * 0.2, 2)
@@ -189,19 +329,28 @@ def handle_mentor_session_booking(request):
         logger.error(f"Stripe error during PaymentIntent creation: {str(e)}")
         return Response({'error': str(e)}, status=400)
 
-    booking = SessionBooking.objects.create(
-        learner=user,
-        mentor=mentor,
-        date=date,
-        start_time=start_time,
-        end_time=end_time,
-        amount=amount,
-        platform_fee=platform_fee,
-        mentor_payout=mentor_payout,
-        status=SessionBooking.Status.CONFIRMED,  # ✅ UPDATED: Set status as CONFIRMED by default
-        payment_status=SessionBooking.PaymentStatus.HOLDING,
-        stripe_payment_intent_id=intent.id,
-    )
+    try:
+        booking = SessionBooking.objects.book(
+            learner=user,
+            mentor=mentor,
+            date=date,
+            start_time=start_time,
+            end_time=end_time,
+            amount=amount,
+            platform_fee=platform_fee,
+            mentor_payout=mentor_payout,
+            status=SessionBooking.Status.CONFIRMED,  # ✅ UPDATED: Set status as CONFIRMED by default
+            payment_status=SessionBooking.PaymentStatus.HOLDING,
+            stripe_payment_intent_id=intent.id,
+        )
+    except DjangoValidationError as e:
+        # someone else booked the time meanwhile: release the authorization we just made
+        logger.warning(f"Booking clash for mentor {mentor.email} on {date} {start_time}: {e.messages}")
+        try:
+            stripe.PaymentIntent.cancel(intent.id)
+        except stripe.error.StripeError as cancel_error:
+            logger.error(f"Failed to cancel PaymentIntent {intent.id}: {cancel_error}")
+        return Response({'error': e.messages[0]}, status=400)
     logger.info(f"Session booking created successfully: ID {booking.id}")
 
     return Response({
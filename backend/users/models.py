@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from cloudinary.models import CloudinaryField
 import random
@@ -76,6 +78,18 @@ class UserProfile(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "User Profiles"
+        indexes = [
+            # mentor directory facets (mentorship/directory.py): list membership through @> containment
+            GinIndex(
+                fields=['preferred_categories'], opclasses=['jsonb_path_ops'],
+                condition=Q(is_approved=True), name='profile_approved_category_idx',
+            ),
+            GinIndex(
+                fields=['languages_known'], opclasses=['jsonb_path_ops'],
+                condition=Q(is_approved=True), name='profile_approved_language_idx',
+            ),
+            models.Index(fields=['experience_years'], condition=Q(is_approved=True), name='profile_approved_exp_idx'),
+        ]
 
 
 class OTP(models.Model):
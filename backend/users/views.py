@@ -30,7 +30,6 @@ from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings    
 from rest_framework.response import Response
-from django.contrib.auth import login 
 
 logger = logging.getLogger("users") 
 
@@ -44,10 +43,9 @@ class CookieTokenObtainPairView(TokenObtainPairView):
         # Get the authenticated user from the serializer's validated data
         user = serializer.user # SimpleJWT's serializer makes the user available here
 
-  
-        # This will set the 'sessionid' cookie which AuthMiddlewareStack expects
-        login(request, user)
-        logger.info(f"User {user.email} successfully logged in and session established.")
+
+        # no Django session: websockets authenticate with the access_token cookie (chat/auth.py)
+        logger.info(f"User {user.email} successfully logged in.")
 
         response = super().post(request, *args, **kwargs) # This generates the tokens and data
 
@@ -345,10 +343,7 @@ class OTPVerifyView(APIView):
             user.is_active = True
             user.save()
 
-            # It creates the 'sessionid' cookie
-            # that AuthMiddlewareStack relies on for WebSocket authentication.
-            login(request, user)
-            logger.info(f"User {user.email} successfully verified OTP and logged into session.")
+            logger.info(f"User {user.email} successfully verified OTP.")
 
             # Issue tokens
             refresh = RefreshToken.for_user(user)
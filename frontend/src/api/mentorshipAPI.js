@@ -1,6 +1,6 @@
 import axiosInstance from '../axios';
 
-export const fetchMentors = () => axiosInstance.get("mentorship/mentors/");
+export const fetchMentors = (page = 1) => axiosInstance.get("mentorship/mentors/", { params: { page } });
 
 
 export const bookSession = (mentorId, date, start_time, end_time) => {
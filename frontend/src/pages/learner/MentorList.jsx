@@ -10,12 +10,15 @@ const ITEMS_PER_PAGE = 10;
 const MentorList = () => {
   const [mentors, setMentors] = useState([]);
   const [page, setPage] = useState(1);
+  const [totalCount, setTotalCount] = useState(0);
   const navigate = useNavigate();
 
-  const fetchData = async () => {
+  const fetchData = async (pageNumber) => {
     try {
-      const res = await fetchMentors();
-      const data = Array.isArray(res.data) ? res.data : [];
+      // the server paginates (ITEMS_PER_PAGE mentors per page) and only sends upcoming slots
+      const res = await fetchMentors(pageNumber);
+      const data = Array.isArray(res.data?.results) ? res.data.results : [];
+      setTotalCount(res.data?.count || 0);
 
       const now = new Date();
 
@@ -37,11 +40,11 @@ const MentorList = () => {
   };
 
   useEffect(() => {
-    fetchData();
-  }, []);
+    fetchData(page);
+  }, [page]);
 
-  const totalPages = Math.ceil(mentors.length / ITEMS_PER_PAGE);
-  const paginatedMentors = mentors.slice((page - 1) * ITEMS_PER_PAGE, page * ITEMS_PER_PAGE);
+  const totalPages = Math.ceil(totalCount / ITEMS_PER_PAGE);
+  const paginatedMentors = mentors;
 
   // Handler for the Message button
   const handleMessageClick = (mentorId) => {
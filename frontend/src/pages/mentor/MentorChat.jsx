@@ -26,11 +26,15 @@ function MentorChat() {
   const [messages, setMessages] = useState([]);
   const [messageInput, setMessageInput] = useState('');
   const [loadingHistory, setLoadingHistory] = useState(true);
+  const [olderCursor, setOlderCursor] = useState(null); // `before` cursor of the history, null once the oldest page is loaded
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const [isConnected, setIsConnected] = useState(false);
   const [typingUser, setTypingUser] = useState(null); // NEW: State for typing user
   const typingTimeoutRef = useRef(null); // NEW: Ref for typing debounce
   const ws = useRef(null);
   const messagesEndRef = useRef(null);
+  const messagesContainerRef = useRef(null);
+  const keepScrollRef = useRef(null); // scroll height before older messages were prepended
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -49,6 +53,16 @@ function MentorChat() {
 
   const wsUrl = roomName ? `ws://localhost:8000/ws/chat/${roomName}/` : null;
 
+  // history is paginated: users come once in `participants`, messages only carry sender_id
+  const toHistoryMessages = (participants, page) => page.map(msg => ({
+    type: (user && msg.sender_id === user.user_id) ? 'my' : 'other',
+    text: msg.content,
+    sender: participants[msg.sender_id]?.email,
+    timestamp: msg.timestamp,
+    isRead: msg.is_read,
+    readAt: msg.read_at,
+  }));
+
   useEffect(() => {
     if (authLoading || !isValidChat) {
       if (!authLoading && !user) {
@@ -69,15 +83,10 @@ function MentorChat() {
       setLoadingHistory(true);
       try {
         const response = await axiosInstance.get(`chat/history/${roomName}/`);
-        const historyMessages = response.data.map(msg => ({
-          type: (user && msg.sender.id === user.user_id) ? 'my' : 'other',
-          text: msg.content,
-          sender: msg.sender.email,
-          timestamp: msg.timestamp,
-          isRead: msg.is_read, // <--- NEW: Include is_read from history
-          readAt: msg.read_at, // <--- NEW: Include read_at from history
-        }));
-        setMessages(historyMessages);
+        // the newest page; older ones are fetched on demand with its `before` cursor
+        const { participants, messages: page, has_older, before } = response.data;
+        setMessages(toHistoryMessages(participants, page));
+        setOlderCursor(has_older ? before : null);
       } catch (error) {
         console.error('Failed to fetch chat history:', error);
         setMessages(prev => [...prev, {type: 'system', text: 'Failed to load chat history.'}]);
@@ -169,9 +178,39 @@ function MentorChat() {
   }, [authLoading, isValidChat, wsUrl, user, targetLearnerId]);
 
   useEffect(() => {
+    // after older messages were prepended keep the view where it was instead of jumping to the bottom
+    if (keepScrollRef.current !== null && messagesContainerRef.current) {
+      const container = messagesContainerRef.current;
+      container.scrollTop = container.scrollHeight - keepScrollRef.current;
+      keepScrollRef.current = null;
+      return;
+    }
     scrollToBottom();
   }, [messages]);
 
+  // --- Load Older History ---
+  const loadOlderMessages = async () => {
+    if (!olderCursor || loadingOlder) return;
+    setLoadingOlder(true);
+    try {
+      const response = await axiosInstance.get(`chat/history/${roomName}/`, { params: { before: olderCursor } });
+      const { participants, messages: page, has_older, before } = response.data;
+      keepScrollRef.current = messagesContainerRef.current?.scrollHeight ?? null;
+      setMessages(prev => [...toHistoryMessages(participants, page), ...prev]);
+      setOlderCursor(has_older ? before : null);
+    } catch (error) {
+      console.error('Failed to fetch older messages:', error);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
+  const handleMessagesScroll = (e) => {
+    if (e.currentTarget.scrollTop === 0) {
+      loadOlderMessages();
+    }
+  };
+
   // NEW: Function to send typing status (re-introduced)
   const sendTypingStatus = useCallback((isTyping) => {
     if (isConnected && user && user.user_id && ws.current && ws.current.readyState === WebSocket.OPEN) {
@@ -263,7 +302,18 @@ function MentorChat() {
         </div>
 
         {/* Message Display Area */}
-        <div className="flex-1 p-4 overflow-y-auto custom-scrollbar">
+        <div ref={messagesContainerRef} onScroll={handleMessagesScroll} className="flex-1 p-4 overflow-y-auto custom-scrollbar">
+          {olderCursor && (
+            <div className="text-center mb-2">
+              <button
+                onClick={loadOlderMessages}
+                disabled={loadingOlder}
+                className={`text-sm underline ${mentorTheme.text} opacity-75`}
+              >
+                {loadingOlder ? 'Loading...' : 'Load older messages'}
+              </button>
+            </div>
+          )}
           {messages.length === 0 && !loadingHistory ? (
             <div className="text-center text-gray-500 py-10">Start your conversation!</div>
           ) : (
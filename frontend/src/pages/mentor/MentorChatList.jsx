@@ -37,7 +37,7 @@ function MentorChatList() {
         // If the absolute path works, it means your axiosInstance.baseURL might be misconfigured or not applied.
         // But based on your VITE_API_URL, this relative path should be correct.
         // --- END FIX ---
-        setConversations(response.data);
+        setConversations(response.data.results); // cursor paginated: { next, previous, results }
       } catch (error) {
         console.error('Failed to fetch conversations:', error);
         toast.error('Failed to load conversations.');